@@ -0,0 +1,142 @@
+"""Cheap change detection for screenshots and camera frames.
+
+Every capture is reduced to a small grayscale thumbnail and a 64-bit difference hash.
+Comparing those against the previous capture is a few microseconds of NumPy work,
+so a static screen can be reported as unchanged before anything is encoded or stored.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = (160, 90)  # (width, height) used for the pixel diff and the changed regions
+HASH_SIZE = 8  # a HASH_SIZE x HASH_SIZE difference hash, i.e. 64 bits
+
+
+@dataclass
+class FrameSignature:
+    """Compact fingerprint of a single frame."""
+
+    dhash: int
+    thumbnail: np.ndarray
+    width: int
+    height: int
+
+
+@dataclass
+class ChangeResult:
+    """Outcome of comparing a frame with the previously stored one."""
+
+    unchanged: bool
+    difference: float
+    hash_distance: int
+    previous_path: str | None = None
+    regions: list[dict[str, int]] = field(default_factory=list)
+
+
+def compute_signature(frame: np.ndarray, *, rgb: bool = False) -> FrameSignature:
+    """Reduce a BGR (or RGB) frame to its thumbnail and difference hash."""
+    if frame.ndim == 3:  # noqa: PLR2004
+        code = cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY
+        gray = cv2.cvtColor(frame, code)
+    else:
+        gray = frame
+    height, width = gray.shape[:2]
+    thumbnail = cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+    # dHash: compare every pixel with its right neighbour on a (HASH_SIZE + 1) x HASH_SIZE image
+    tiny = cv2.resize(thumbnail, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (tiny[:, 1:] > tiny[:, :-1]).flatten()
+    dhash = int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    return FrameSignature(dhash=dhash, thumbnail=thumbnail, width=width, height=height)
+
+
+def changed_regions(
+    previous: np.ndarray,
+    current: np.ndarray,
+    width: int,
+    height: int,
+    pixel_threshold: int = 16,
+) -> list[dict[str, int]]:
+    """Bounding boxes (in full-resolution pixels) of the areas that differ between two thumbnails."""
+    mask = (cv2.absdiff(previous, current) > pixel_threshold).astype(np.uint8)
+    # Merge neighbouring changed pixels so a changed line of text becomes one box
+    mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    scale_x = width / THUMBNAIL_SIZE[0]
+    scale_y = height / THUMBNAIL_SIZE[1]
+    regions = []
+    for x, y, w, h, _ in stats[1:count]:  # label 0 is the background
+        regions.append(
+            {
+                "x": int(x * scale_x),
+                "y": int(y * scale_y),
+                "width": int(np.ceil(w * scale_x)),
+                "height": int(np.ceil(h * scale_y)),
+            },
+        )
+    return regions
+
+
+class FrameChangeDetector:
+    """Remember the last stored frame of one source and decide whether a new frame differs from it.
+
+    A frame counts as unchanged when the mean absolute thumbnail difference (0-255 scale)
+    is at most ``threshold`` and the difference hashes are at most ``max_hash_distance`` bits apart.
+    """
+
+    def __init__(self, threshold: float, max_hash_distance: int = 2) -> None:
+        """Create a detector with the default thresholds for its source."""
+        self.threshold = threshold
+        self.max_hash_distance = max_hash_distance
+        self._lock = Lock()
+        self._signature: FrameSignature | None = None
+        self._path: str | None = None
+
+    def compare(
+        self,
+        signature: FrameSignature,
+        threshold: float | None = None,
+        *,
+        with_regions: bool = False,
+    ) -> ChangeResult:
+        """Compare a signature with the previously remembered frame."""
+        with self._lock:
+            previous, previous_path = self._signature, self._path
+
+        # Nothing to compare with, the resolution changed, or the old image is gone
+        if (
+            previous is None
+            or previous_path is None
+            or (previous.width, previous.height) != (signature.width, signature.height)
+            or not Path(previous_path).exists()
+        ):
+            return ChangeResult(unchanged=False, difference=255.0, hash_distance=HASH_SIZE * HASH_SIZE)
+
+        difference = float(cv2.absdiff(previous.thumbnail, signature.thumbnail).mean())
+        hash_distance = (previous.dhash ^ signature.dhash).bit_count()
+        limit = self.threshold if threshold is None else threshold
+        unchanged = difference <= limit and hash_distance <= self.max_hash_distance
+
+        regions = []
+        if with_regions and not unchanged:
+            regions = changed_regions(previous.thumbnail, signature.thumbnail, signature.width, signature.height)
+
+        return ChangeResult(
+            unchanged=unchanged,
+            difference=round(difference, 3),
+            hash_distance=hash_distance,
+            previous_path=previous_path,
+            regions=regions,
+        )
+
+    def remember(self, signature: FrameSignature, path: str) -> None:
+        """Store the signature of a frame that was saved to ``path``."""
+        with self._lock:
+            self._signature = signature
+            self._path = path
@@ -1,31 +1,37 @@
 """Hardware."""
 
 import asyncio
-import platform
-import shutil
+import os
 import sys
+import time
 import uuid
 from collections.abc import Awaitable, Callable
 from pathlib import Path
 from threading import Lock
+from typing import Any
 
-import cpuinfo
 import cv2
-import psutil
+import numpy as np
+import orjson
 import pyautogui
+from change_detection import ChangeResult, FrameChangeDetector, compute_signature
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from history import HistoryQueryError, MetricsHistory
 from loguru import logger
+from metrics import SystemSample, SystemSampler, detect_cpu_identity
+from processes import SORT_KEYS, ProcessSampler, ProcessTable
 from starlette.responses import Response as StarletteResponse
 
 parent_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(parent_dir))
 
+from serving.sockets import serve  # noqa: E402
 from unified_logging.config_types import LoggingConfigs  # noqa: E402
 from unified_logging.logging_client import setup_network_logger_client  # noqa: E402
 
-LOGGING_CONFIG_PATH = Path("..", "unified_logging/logging_config.toml")
+LOGGING_CONFIG_PATH = parent_dir / "unified_logging" / "logging_config.toml"
 if LOGGING_CONFIG_PATH.exists():
     logging_configs = LoggingConfigs.load_from_path(str(LOGGING_CONFIG_PATH))
     setup_network_logger_client(logging_configs, logger)
@@ -42,17 +48,53 @@ Path("camera_images").mkdir(exist_ok=True)
 # Mount the directory for direct access to the images
 app.mount("/images", StaticFiles(directory="camera_images"), name="images")
 
+# Mean absolute thumbnail difference (0-255) under which a capture counts as unchanged.
+# Cameras get a higher default because sensor noise never gives two identical frames.
+SCREEN_CHANGE_THRESHOLD = 1.0
+CAMERA_CHANGE_THRESHOLD = 6.0
+
+screen_detector = FrameChangeDetector(threshold=SCREEN_CHANGE_THRESHOLD)
+camera_detector = FrameChangeDetector(threshold=CAMERA_CHANGE_THRESHOLD, max_hash_distance=6)
+
+# Seconds between two readings of the background metrics sampler
+SAMPLE_INTERVAL = 1.0
+
+# Seconds between two passes over the process table for /processes/top
+PROCESS_SAMPLE_INTERVAL = 2.0
+MAX_TOP_PROCESSES = 100
+
+# Hours of per-second samples kept in memory for /metrics/history
+HISTORY_HOURS = 6
+# Upper bound on the buckets one history query may return
+MAX_HISTORY_BUCKETS = 720
+
+system_sampler = SystemSampler(interval=SAMPLE_INTERVAL, disk_path="/")
+process_sampler = ProcessSampler(interval=PROCESS_SAMPLE_INTERVAL)
+cpu_identity: dict = {}
+metrics_history = MetricsHistory(capacity=int(HISTORY_HOURS * 3600 / SAMPLE_INTERVAL), cores=os.cpu_count() or 1)
+
 
 @app.middleware("http")
 async def add_cors_header(
     request: Request,
     call_next: Callable[[Request], Awaitable[StarletteResponse]],
 ) -> StarletteResponse:
-    """Middleware to add CORS header to each response."""
-    logger.info(f"Processing request: {request.method} {request.url}")
-    response: StarletteResponse = await call_next(request)
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    logger.info(f"Response status: {response.status_code}")
+    """Middleware to add CORS header to each response.
+
+    Logs one DEBUG line per request with the route bound, so ``route_levels`` in the
+    logging config can raise or lower it per route.
+    """
+    started = time.perf_counter()
+    with logger.contextualize(route=request.url.path):
+        response: StarletteResponse = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        logger.debug(
+            "{} {} -> {} in {:.1f} ms",
+            request.method,
+            request.url.path,
+            response.status_code,
+            (time.perf_counter() - started) * 1000,
+        )
     return response
 
 
@@ -60,6 +102,18 @@ class CustomError(Exception):
     """Custom error class for handling exceptions."""
 
 
+@app.on_event("startup")
+async def start_sampling() -> None:
+    """Detect the static CPU identity once and start the background metrics samplers."""
+    logger.info("Detecting CPU identity and starting the metrics samplers...")
+    cpu_identity.update(await asyncio.to_thread(detect_cpu_identity))
+    logger.info(f"Metrics history holds {metrics_history.capacity} samples in {metrics_history.nbytes} bytes.")
+    system_sampler.listeners.append(metrics_history.append)
+    system_sampler.start()
+    process_sampler.start()
+    logger.info("Metrics samplers started.")
+
+
 @app.on_event("startup")
 async def startup_event() -> None:
     """On startup, open the camera and perform a warmup.
@@ -91,14 +145,37 @@ async def startup_event() -> None:
 def shutdown_event() -> None:
     """On shutdown, release the camera resource if it exists."""
     logger.info("Shutting down hardware service...")
+    system_sampler.stop()
+    process_sampler.stop()
     if camera is not None:
         camera.release()
         logger.info("Camera resource released successfully.")
 
 
+def unchanged_response(message: str, result: ChangeResult) -> dict:
+    """Build the response for a capture that matches the previously stored image."""
+    previous_path = str(result.previous_path)
+    return {
+        "message": message,
+        "unchanged": True,
+        "difference": result.difference,
+        "image_path": previous_path,
+        "filename": Path(previous_path).name,
+    }
+
+
 @app.get("/capture")
-async def capture() -> dict[str, str]:
-    """Take a photo with the camera and return it as base64."""
+async def capture(
+    skip_unchanged: bool = True,  # noqa: FBT001, FBT002
+    threshold: float | None = None,
+    regions: bool = False,  # noqa: FBT001, FBT002
+) -> dict:
+    """Take a photo with the camera and return where it was saved.
+
+    When ``skip_unchanged`` is set and the frame matches the previous photo within ``threshold``,
+    nothing is written and the previous image is returned with ``unchanged: true``.
+    ``regions`` adds the bounding boxes of the areas that changed.
+    """
     logger.info("Received request to capture an image.")
     try:
         import time
@@ -122,6 +199,12 @@ async def capture() -> dict[str, str]:
         if not ret:
             return {"error": "Could not capture image"}
 
+        signature = compute_signature(frame)
+        change = camera_detector.compare(signature, threshold, with_regions=regions)
+        if skip_unchanged and change.unchanged:
+            logger.info(f"Camera frame unchanged (difference {change.difference}), reusing {change.previous_path}.")
+            return unchanged_response("Camera view unchanged since the previous photo", change)
+
         # Create directory if it doesn't exist
         Path("camera_images").mkdir(exist_ok=True)
 
@@ -129,26 +212,37 @@ async def capture() -> dict[str, str]:
         filename = f"camera_{int(time.time())}.jpg"
         filepath = Path("camera_images") / filename
         cv2.imwrite(str(filepath), frame)
-        # Convert to base64 properly
-        _, buffer = cv2.imencode(".jpg", frame)
+        camera_detector.remember(signature, str(filepath))
 
         logger.info(f"Image captured and saved as {filename}.")
-        return {
+        response = {
             "message": "Camera image captured successfully",
+            "unchanged": False,
+            "difference": change.difference,
             "image_path": str(filepath),
             "filename": filename,  # Add just the filename for easier access
         }
+        if regions:
+            response["regions"] = change.regions
 
     except (Exception, BaseException) as e:
         logger.error(f"Camera capture failed: {e!s}")
         return {"error": f"Camera capture failed: {e!s}"}
 
+    return response
+
 
 @app.get("/screenshot")
-async def screenshot() -> dict[str, str]:
+async def screenshot(
+    skip_unchanged: bool = True,  # noqa: FBT001, FBT002
+    threshold: float | None = None,
+    regions: bool = False,  # noqa: FBT001, FBT002
+) -> dict:
     """Take a screenshot of the current screen.
 
-    Returns information about the saved image.
+    Returns information about the saved image. When ``skip_unchanged`` is set and the screen
+    matches the previous screenshot within ``threshold``, nothing is encoded or written and the
+    previous image is returned with ``unchanged: true``. ``regions`` adds the changed bounding boxes.
     """
     logger.info("Received request to take a screenshot.")
 
@@ -165,16 +259,29 @@ async def screenshot() -> dict[str, str]:
         logger.info("Attempting to capture screenshot...")
         try:
             image = pyautogui.screenshot()
+
+            signature = compute_signature(np.asarray(image), rgb=True)
+            change = screen_detector.compare(signature, threshold, with_regions=regions)
+            if skip_unchanged and change.unchanged:
+                logger.info(f"Screen unchanged (difference {change.difference}), reusing {change.previous_path}.")
+                return unchanged_response("Screen unchanged since the previous screenshot", change)
+
             logger.info("Screenshot captured, attempting to save...")
             image.save(str(filepath))
+            screen_detector.remember(signature, str(filepath))
             logger.info(f"Screenshot saved as {filepath}.")
 
             # Return the same pattern of response as open_camera
-            return {
+            response = {
                 "message": "Screenshot captured successfully",
+                "unchanged": False,
+                "difference": change.difference,
                 "image_path": str(filepath),
                 "filename": filename,
             }
+            if regions:
+                response["regions"] = change.regions
+            return response  # noqa: TRY300
         except (Exception, BaseException) as screenshot_error:
             logger.error(f"Error during screenshot capture or save: {screenshot_error!s}")
             return {"error": f"Screenshot operation failed: {screenshot_error!s}."}
@@ -184,19 +291,36 @@ async def screenshot() -> dict[str, str]:
         return {"error": f"Screenshot failed with unexpected error: {e!s}."}
 
 
+def latest_sample() -> SystemSample | None:
+    """Return the most recent metrics sample, or None if the sampler has not produced one yet."""
+    sample: SystemSample | None = system_sampler.latest
+    if sample is None:
+        logger.warning("Metrics requested before the first sample was taken.")
+    return sample
+
+
+def not_sampled_response() -> JSONResponse:
+    """Response for metric requests that arrive before the first sample."""
+    return JSONResponse(status_code=503, content={"error": "Metrics are not sampled yet, retry shortly."})
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """Report whether startup finished and the first metrics sample is taken, with status 503 until then."""
+    if latest_sample() is None:
+        return not_sampled_response()
+    return JSONResponse(content={"ready": True})
+
+
 @app.get("/cpu")
 def cpu() -> JSONResponse:
     """Return the current CPU usage percentage."""
     logger.info("Received request for CPU usage.")
-    cpu_percent = psutil.cpu_percent(interval=0.5)
-    logger.info(f"CPU usage: {cpu_percent}%")
-    return JSONResponse(content={"cpu_percent": cpu_percent})
-
-
-def get_disk_usage() -> tuple[int, int, int]:
-    """Return disk usage (total, used, free) in bytes for the root path."""
-    total, used, free = shutil.disk_usage("/")
-    return total, used, free
+    sample = latest_sample()
+    if sample is None:
+        return not_sampled_response()
+    logger.info(f"CPU usage: {sample.cpu_percent}%")
+    return JSONResponse(content={"cpu_percent": sample.cpu_percent, "sample_age_s": round(sample.age, 3)})
 
 
 def format_size(byte_size: float) -> str:
@@ -216,7 +340,10 @@ def format_size(byte_size: float) -> str:
 def disk() -> JSONResponse:
     """Disk usage information (total, used, free) in a formatted string."""
     logger.info("Received request for disk usage.")
-    total, used, free = get_disk_usage()
+    sample = latest_sample()
+    if sample is None:
+        return not_sampled_response()
+    total, used, free = sample.disk_total, sample.disk_used, sample.disk_free
     logger.info(
         f"Disk usage - Total: {format_size(total)}, Used: {format_size(used)}, Free: {format_size(free)}",
     )
@@ -225,6 +352,10 @@ def disk() -> JSONResponse:
             "total": format_size(total),
             "used": format_size(used),
             "free": format_size(free),
+            "total_bytes": total,
+            "used_bytes": used,
+            "free_bytes": free,
+            "sample_age_s": round(sample.age, 3),
         },
     )
 
@@ -233,9 +364,10 @@ def disk() -> JSONResponse:
 def ram() -> JSONResponse:
     """Total, used, and available RAM in a formatted string."""
     logger.info("Received request for RAM usage.")
-    total = psutil.virtual_memory().total
-    available = psutil.virtual_memory().available
-    used = total - available
+    sample = latest_sample()
+    if sample is None:
+        return not_sampled_response()
+    total, used, available = sample.ram_total, sample.ram_used, sample.ram_available
     logger.info(
         f"RAM usage - Total: {format_size(total)}, Used: {format_size(used)}, Available: {format_size(available)}",
     )
@@ -244,6 +376,10 @@ def ram() -> JSONResponse:
             "total": format_size(total),
             "used": format_size(used),
             "available": format_size(available),
+            "total_bytes": total,
+            "used_bytes": used,
+            "available_bytes": available,
+            "sample_age_s": round(sample.age, 3),
         },
     )
 
@@ -251,77 +387,163 @@ def ram() -> JSONResponse:
 # get for no of cores, cpu arc, name
 @app.get("/cpuinfo")
 async def get_cpuinfo() -> JSONResponse:
-    """Detailed CPU information."""
-    cpu_data = {}
+    """Detailed CPU information.
 
-    try:
-        # --- Using cpuinfo for reliable name ---
-        info = cpuinfo.get_cpu_info()
-        cpu_data["cpu_name"] = info.get("brand_raw", "N/A")
-        cpu_data["architecture"] = info.get("arch_string_raw", platform.machine())
-        cpu_data["bits"] = info.get("bits", "N/A")
-        cpu_data["vendor_id"] = info.get("vendor_id_raw", "N/A")
-
-        # --- Using psutil for counts, frequencies, and usage ---
-        cpu_data["physical_cores"] = psutil.cpu_count(logical=False)
-        cpu_data["logical_cores"] = psutil.cpu_count(logical=True)
-
-        # CPU Frequency
-        try:
-            cpufreq = psutil.cpu_freq()
-            if cpufreq:
-                cpu_data["max_frequency_mhz"] = cpufreq.max
-                cpu_data["min_frequency_mhz"] = cpufreq.min
-                cpu_data["current_frequency_mhz"] = cpufreq.current
-            else:
-                cpu_data["max_frequency_mhz"] = "N/A (Not Supported)"
-                cpu_data["min_frequency_mhz"] = "N/A (Not Supported)"
-                cpu_data["current_frequency_mhz"] = "N/A (Not Supported)"
-        except NotImplementedError:
-            cpu_data["max_frequency_mhz"] = "N/A (Not Supported)"
-            cpu_data["min_frequency_mhz"] = "N/A (Not Supported)"
-            cpu_data["current_frequency_mhz"] = "N/A (Not Supported)"
-        except (AttributeError, ValueError, TypeError) as e:
-            # Catch specific potential errors during frequency fetching
-            logger.error(f"Error fetching CPU frequency: {e!s}")
-            cpu_data["max_frequency_mhz"] = f"Error ({type(e).__name__})"
-            cpu_data["min_frequency_mhz"] = f"Error ({type(e).__name__})"
-            cpu_data["current_frequency_mhz"] = f"Error ({type(e).__name__})"
-
-        # CPU Usage (snapshot over a short interval)
-        # Using a small interval gives a more "current" snapshot but blocks for that duration.
-        # interval=None is non-blocking but compares CPU times since the last call *by this process*,
-        # which might not be what you want for a single API request. 0.1 to 0.5 is often reasonable.
-        interval = 0.2
-        cpu_data["total_cpu_usage_percent"] = psutil.cpu_percent(interval=interval)
-        cpu_data["per_cpu_usage_percent"] = psutil.cpu_percent(interval=interval, percpu=True)
-
-        # Detailed CPU times percentage
-        cpu_times = psutil.cpu_times_percent(interval=interval)
-        cpu_data["cpu_usage_breakdown_percent"] = {
-            "user": getattr(cpu_times, "user", "N/A"),
-            "system": getattr(cpu_times, "system", "N/A"),
-            "idle": getattr(cpu_times, "idle", "N/A"),
-            "interrupt": getattr(cpu_times, "interrupt", "N/A"),  # May not be available on all OS
-            "dpc": getattr(cpu_times, "dpc", "N/A"),  # May not be available on all OS (Windows)
-        }
+    Static facts are detected once at startup, usage figures come from the latest background sample.
+    """
+    sample = latest_sample()
+    if sample is None:
+        return not_sampled_response()
+
+    cpu_data = dict(cpu_identity)
+    cpu_data["current_frequency_mhz"] = sample.current_frequency_mhz
+    cpu_data["total_cpu_usage_percent"] = sample.cpu_percent
+    cpu_data["per_cpu_usage_percent"] = sample.per_cpu_percent
+    cpu_data["cpu_usage_breakdown_percent"] = sample.cpu_times_percent
+    cpu_data["sample_age_s"] = round(sample.age, 3)
+    return JSONResponse(content=cpu_data)
 
-        # --- Basic Platform Info ---
-        cpu_data["os_platform"] = platform.system()
-        cpu_data["os_release"] = platform.release()
-        cpu_data["os_version"] = platform.version()
 
-    except AttributeError as e:
-        # General error handling
-        return JSONResponse(status_code=500, content={"error": f"Failed to retrieve CPU info: {e!s}"})
+def with_sizes(values: dict[str, Any], keys: tuple[str, ...]) -> dict[str, Any]:
+    """Put raw byte counts under ``<key>_bytes`` next to the human-readable ``<key>`` strings."""
+    result = {key: value for key, value in values.items() if key not in keys}
+    for key in keys:
+        result[f"{key}_bytes"] = values[key]
+        result[key] = format_size(values[key])
+    return result
 
-    return JSONResponse(content=cpu_data)
+
+def system_cpu(sample: SystemSample) -> dict[str, Any]:
+    """CPU section of /system."""
+    return cpu_identity | {
+        "current_frequency_mhz": sample.current_frequency_mhz,
+        "total_cpu_usage_percent": sample.cpu_percent,
+        "per_cpu_usage_percent": sample.per_cpu_percent,
+        "cpu_usage_breakdown_percent": sample.cpu_times_percent,
+    }
+
+
+def system_ram(sample: SystemSample) -> dict[str, Any]:
+    """RAM section of /system."""
+    ram_usage = {"total": sample.ram_total, "used": sample.ram_used, "available": sample.ram_available}
+    return with_sizes(ram_usage, ("total", "used", "available")) | {"percent": sample.ram_percent}
+
+
+def system_disk(sample: SystemSample) -> dict[str, Any]:
+    """Disk section of /system, for the root path."""
+    disk_usage = {"total": sample.disk_total, "used": sample.disk_used, "free": sample.disk_free}
+    return with_sizes(disk_usage, ("total", "used", "free"))
+
+
+def system_mounts(sample: SystemSample) -> list[dict[str, Any]]:
+    """Per-mount section of /system."""
+    return [with_sizes(mount, ("total", "used", "free")) for mount in sample.mounts]
+
+
+def system_network(sample: SystemSample) -> dict[str, Any]:
+    """Network section of /system."""
+    return sample.network
+
+
+SYSTEM_FIELDS: dict[str, Callable[[SystemSample], Any]] = {
+    "cpu": system_cpu,
+    "ram": system_ram,
+    "disk": system_disk,
+    "mounts": system_mounts,
+    "network": system_network,
+}
+
+
+def orjson_response(content: Any, status_code: int = 200) -> Response:  # noqa: ANN401
+    """Serialize with orjson, which is several times faster than the stdlib encoder on large payloads."""
+    return Response(content=orjson.dumps(content), status_code=status_code, media_type="application/json")
+
+
+@app.get("/system")
+def system(fields: str = "cpu,ram,disk") -> Response:
+    """CPU, RAM, disk, mount and network information from one metrics sample.
+
+    ``fields`` is a comma separated subset of cpu, ram, disk, mounts and network.
+    Sizes are given both as raw ``*_bytes`` integers and as formatted strings.
+    """
+    logger.info(f"Received request for system information: fields={fields}")
+    sample = latest_sample()
+    if sample is None:
+        return orjson_response({"error": "Metrics are not sampled yet, retry shortly."}, status_code=503)
+
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SYSTEM_FIELDS]
+    if unknown:
+        error = f"Unknown fields {unknown}, available: {list(SYSTEM_FIELDS)}"
+        return orjson_response({"error": error}, status_code=400)
+
+    content: dict[str, Any] = {"timestamp": sample.timestamp, "sample_age_s": round(sample.age, 3)}
+    for name in selected:
+        content[name] = SYSTEM_FIELDS[name](sample)
+    return orjson_response(content)
+
+
+@app.get("/processes/top")
+def top_processes(n: int = 10, sort: str = "cpu") -> Response:
+    """List the ``n`` processes using the most CPU (``sort=cpu``) or resident memory (``sort=rss``).
+
+    CPU usage is measured between the last two passes of the process sampler and is given
+    per core, like ``top``: a process keeping two cores busy shows 200%.
+    """
+    logger.info(f"Received request for top processes: n={n} sort={sort}")
+    if sort not in SORT_KEYS:
+        return orjson_response({"error": f"sort must be one of {list(SORT_KEYS)}"}, status_code=400)
+    table: ProcessTable | None = process_sampler.latest
+    if table is None:
+        return orjson_response({"error": "Processes are not sampled yet, retry shortly."}, status_code=503)
+
+    processes = table.top(max(1, min(n, MAX_TOP_PROCESSES)), sort)
+    for process in processes:
+        process["rss"] = format_size(process["rss_bytes"])
+    return orjson_response(
+        {
+            "sort": sort,
+            "process_count": len(table),
+            "sample_age_s": round(table.age, 3),
+            "processes": processes,
+        },
+    )
+
+
+@app.get("/metrics/history")
+def get_metrics_history(
+    window: float = 600,
+    resolution: float = 60,
+    metrics: str | None = None,
+    per_core: bool = False,  # noqa: FBT001, FBT002
+) -> JSONResponse:
+    """Downsampled history of the sampled metrics.
+
+    Covers the last ``window`` seconds in buckets of ``resolution`` seconds, with the min, mean,
+    max and 95th percentile of every bucket. ``metrics`` is a comma separated subset of the
+    metric names, ``per_core`` adds the per-core CPU usage.
+    """
+    logger.info(f"Received request for metrics history: window={window}s resolution={resolution}s")
+    resolution = max(resolution, SAMPLE_INTERVAL)
+    # Nothing older than the buffers is held, so a longer window only adds empty buckets
+    window = min(window, metrics_history.capacity * SAMPLE_INTERVAL)
+    if window / resolution > MAX_HISTORY_BUCKETS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"window / resolution must be at most {MAX_HISTORY_BUCKETS} buckets"},
+        )
+    names = [name.strip() for name in metrics.split(",") if name.strip()] if metrics else None
+    try:
+        history = metrics_history.query(window, resolution, now=time.time(), metrics=names, per_core=per_core)
+    except HistoryQueryError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    history["samples_held"] = len(metrics_history)
+    return JSONResponse(content=history)
 
 
 ###############################################################################
 # 6. Run the Application
 ###############################################################################
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(app, host="127.0.0.1", port=8003)
+    # TCP on the configured port, and the Unix domain socket too if config.yaml gives one
+    serve(app, "hardware_service", host="127.0.0.1")
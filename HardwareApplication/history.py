@@ -0,0 +1,166 @@
+"""Fixed-memory history of the sampled system metrics.
+
+Every metric lives in its own preallocated NumPy ring buffer, so hours of 1 Hz samples
+take a constant amount of memory and range queries are answered with vectorized
+aggregation instead of Python loops.
+"""
+
+from threading import Lock
+
+import numpy as np
+from metrics import SystemSample
+
+# Scalar metrics kept in history, with the function that reads each one from a sample
+SCALAR_METRICS = {
+    "cpu_percent": lambda s: s.cpu_percent,
+    "cpu_user_percent": lambda s: s.cpu_times_percent.get("user", np.nan),
+    "cpu_system_percent": lambda s: s.cpu_times_percent.get("system", np.nan),
+    "ram_percent": lambda s: s.ram_percent,
+    "ram_used_bytes": lambda s: s.ram_used,
+    "disk_used_bytes": lambda s: s.disk_used,
+}
+PER_CORE_METRIC = "per_cpu_percent"
+AGGREGATES = ("min", "mean", "max", "p95")
+
+
+class HistoryQueryError(ValueError):
+    """Raised when a history query asks for an invalid window or resolution."""
+
+
+class MetricsHistory:
+    """Ring buffers holding the last ``capacity`` samples of every metric."""
+
+    def __init__(self, capacity: int, cores: int) -> None:
+        """Preallocate the buffers for ``capacity`` samples of ``cores`` CPU cores."""
+        self.capacity = capacity
+        self.cores = cores
+        self._timestamps = np.full(capacity, np.nan, dtype=np.float64)
+        # float64 keeps byte counts exact, percentages would fit in float32
+        self._scalars = {
+            name: np.full(capacity, np.nan, dtype=np.float64 if name.endswith("_bytes") else np.float32)
+            for name in SCALAR_METRICS
+        }
+        self._per_core = np.full((capacity, cores), np.nan, dtype=np.float32)
+        self._next = 0
+        self._count = 0
+        self._lock = Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the buffers."""
+        return self._timestamps.nbytes + self._per_core.nbytes + sum(a.nbytes for a in self._scalars.values())
+
+    def __len__(self) -> int:
+        """Return the number of samples currently held."""
+        return self._count
+
+    def append(self, sample: SystemSample) -> None:
+        """Store one sample, overwriting the oldest one once the buffers are full."""
+        with self._lock:
+            i = self._next
+            self._timestamps[i] = sample.timestamp
+            for name, read in SCALAR_METRICS.items():
+                value = read(sample)
+                self._scalars[name][i] = value if isinstance(value, (int, float)) else np.nan
+            cores = sample.per_cpu_percent[: self.cores]
+            self._per_core[i, : len(cores)] = cores
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _ordered(self, names: list[str], *, per_core: bool) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Copy the stored samples out of the ring, oldest first."""
+        with self._lock:
+            order = (self._next - self._count + np.arange(self._count)) % self.capacity
+            timestamps = self._timestamps[order]
+            columns = {name: self._scalars[name][order] for name in names}
+            if per_core:
+                columns[PER_CORE_METRIC] = self._per_core[order]
+        return timestamps, columns
+
+    def query(
+        self,
+        window: float,
+        resolution: float,
+        now: float,
+        metrics: list[str] | None = None,
+        *,
+        per_core: bool = False,
+    ) -> dict:
+        """Aggregate the last ``window`` seconds into buckets of ``resolution`` seconds.
+
+        Returns column-oriented data: the bucket start times and sample counts, and for each
+        metric the min, mean, max and 95th percentile of every bucket. Empty buckets are left out.
+        """
+        names = list(SCALAR_METRICS) if metrics is None else metrics
+        unknown = [name for name in names if name not in SCALAR_METRICS]
+        if unknown:
+            msg = f"Unknown metrics {unknown}, available: {[*SCALAR_METRICS, PER_CORE_METRIC]}"
+            raise HistoryQueryError(msg)
+        if window <= 0 or resolution <= 0:
+            msg = "window and resolution must be positive"
+            raise HistoryQueryError(msg)
+
+        start = now - window
+        timestamps, columns = self._ordered(names, per_core=per_core)
+        first = int(np.searchsorted(timestamps, start, side="left"))
+        timestamps = timestamps[first:]
+
+        buckets = int(np.ceil(window / resolution))
+        ids = np.minimum(((timestamps - start) // resolution).astype(np.int64), buckets - 1)
+        # Samples are in time order unless the clock stepped back, so this is usually the identity
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        counts = np.bincount(ids, minlength=buckets)
+        occupied = np.flatnonzero(counts)
+
+        result: dict = {
+            "window_s": window,
+            "resolution_s": resolution,
+            "bucket_start": (start + occupied * resolution).round(3).tolist(),
+            "count": counts[occupied].tolist(),
+        }
+        if len(timestamps) == 0:
+            return result | {name: {key: [] for key in AGGREGATES} for name in columns}
+
+        # Every occupied bucket is a contiguous run of samples, reduced in place without padding
+        starts = np.concatenate(([0], np.cumsum(counts[occupied])[:-1]))
+        for name, column in columns.items():
+            values = column[first:][order].astype(np.float64)
+            aggregates = _aggregate(values, ids, starts)
+            result[name] = {key: _to_json(value) for key, value in aggregates.items()}
+        return result
+
+
+def _aggregate(values: np.ndarray, ids: np.ndarray, starts: np.ndarray) -> dict[str, np.ndarray]:
+    """Min, mean, max and 95th percentile of the runs of ``values`` beginning at ``starts``, ignoring NaN."""
+    valid = ~np.isnan(values)
+    present = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Cores that were never reported make all-NaN runs, which are fine to return as null
+        mean = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0) / present
+
+    # p95 with the linear interpolation of np.percentile, on every run sorted with its NaNs last
+    flat = values.reshape(len(values), -1)
+    ordered = np.empty_like(flat)
+    for column in range(flat.shape[1]):
+        ordered[:, column] = flat[np.lexsort((flat[:, column], ids)), column]
+    rank = 0.95 * np.maximum(present.reshape(len(starts), -1) - 1, 0)
+    low, high = np.floor(rank).astype(np.int64), np.ceil(rank).astype(np.int64)
+    columns = np.arange(flat.shape[1])
+    below, above = ordered[starts[:, None] + low, columns], ordered[starts[:, None] + high, columns]
+    p95 = below + (above - below) * (rank - low)
+    p95[present.reshape(p95.shape) == 0] = np.nan
+
+    return {
+        "min": np.fmin.reduceat(values, starts, axis=0),
+        "mean": mean,
+        "max": np.fmax.reduceat(values, starts, axis=0),
+        "p95": p95.reshape(present.shape),
+    }
+
+
+def _to_json(values: np.ndarray) -> list:
+    """Round the aggregates and turn NaN into None so the result is valid JSON."""
+    rounded = np.round(values, 2).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
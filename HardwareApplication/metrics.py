@@ -0,0 +1,232 @@
+"""Background sampling of system metrics.
+
+psutil's usage figures need two readings some time apart. Instead of blocking a request
+for that interval, a daemon thread takes a reading at a fixed cadence and the endpoints
+only hand out the latest sample.
+"""
+
+import platform
+import shutil
+import time
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Any
+
+import cpuinfo
+import psutil
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+NOT_SUPPORTED = "N/A (Not Supported)"
+
+
+def detect_cpu_identity() -> dict[str, Any]:
+    """Detect the static CPU and platform facts once, they do not change while the service runs."""
+    info = cpuinfo.get_cpu_info()
+    identity: dict[str, Any] = {
+        "cpu_name": info.get("brand_raw", "N/A"),
+        "architecture": info.get("arch_string_raw", platform.machine()),
+        "bits": info.get("bits", "N/A"),
+        "vendor_id": info.get("vendor_id_raw", "N/A"),
+        "physical_cores": psutil.cpu_count(logical=False),
+        "logical_cores": psutil.cpu_count(logical=True),
+        "os_platform": platform.system(),
+        "os_release": platform.release(),
+        "os_version": platform.version(),
+    }
+    try:
+        cpufreq = psutil.cpu_freq()
+    except (NotImplementedError, AttributeError, ValueError, TypeError) as e:
+        logger.error(f"Error fetching CPU frequency: {e!s}")
+        cpufreq = None
+    identity["max_frequency_mhz"] = cpufreq.max if cpufreq else NOT_SUPPORTED
+    identity["min_frequency_mhz"] = cpufreq.min if cpufreq else NOT_SUPPORTED
+    return identity
+
+
+@dataclass
+class SystemSample:
+    """One reading of the system metrics."""
+
+    timestamp: float
+    monotonic: float
+    cpu_percent: float
+    per_cpu_percent: list[float]
+    cpu_times_percent: dict[str, float | str]
+    current_frequency_mhz: float | str
+    ram_total: int
+    ram_available: int
+    ram_used: int
+    ram_percent: float
+    disk_total: int
+    disk_used: int
+    disk_free: int
+    network: dict[str, float] = field(default_factory=dict)
+    mounts: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the sample was taken."""
+        return time.monotonic() - self.monotonic
+
+
+class BackgroundSampler:
+    """Call ``sample`` every ``interval`` seconds on a daemon thread and keep the latest result."""
+
+    def __init__(self, interval: float, name: str) -> None:
+        """Create a stopped sampler, call ``start`` to begin sampling."""
+        self.interval = interval
+        self.name = name
+        self._latest: Any = None
+        self.listeners: list[Callable[[Any], None]] = []  # called on the sampler thread with every new sample
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def prime(self) -> None:
+        """Take any baseline readings needed before the first real sample."""
+
+    def sample(self) -> Any:  # noqa: ANN401
+        """Take one reading."""
+        raise NotImplementedError
+
+    @property
+    def latest(self) -> Any:  # noqa: ANN401
+        """The most recent sample, or None before the first one is taken."""
+        with self._lock:
+            return self._latest
+
+    def start(self) -> None:
+        """Start the sampling thread."""
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the sampling thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        self.prime()
+        # First sample after a short delay so usage figures are meaningful quickly
+        delay = min(self.interval, 0.2)
+        while not self._stop.wait(delay):
+            started = time.monotonic()
+            try:
+                value = self.sample()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"{self.name} failed to take a sample: {e!s}")
+            else:
+                with self._lock:
+                    self._latest = value
+                for listener in self.listeners:
+                    try:
+                        listener(value)
+                    except Exception as e:  # noqa: BLE001
+                        logger.error(f"{self.name} listener failed: {e!s}")
+            # Keep a fixed cadence regardless of how long the sample took
+            delay = max(0.0, self.interval - (time.monotonic() - started))
+
+
+def read_mounts() -> list[dict[str, Any]]:
+    """Usage of every mounted physical partition, skipping the ones that cannot be read."""
+    mounts = []
+    for partition in psutil.disk_partitions(all=False):
+        try:
+            usage = psutil.disk_usage(partition.mountpoint)
+        except OSError:
+            continue
+        mounts.append(
+            {
+                "mountpoint": partition.mountpoint,
+                "device": partition.device,
+                "fstype": partition.fstype,
+                "total": usage.total,
+                "used": usage.used,
+                "free": usage.free,
+                "percent": usage.percent,
+            },
+        )
+    return mounts
+
+
+class SystemSampler(BackgroundSampler):
+    """Sample CPU usage, CPU time breakdown, RAM, disk, mount and network usage."""
+
+    def __init__(self, interval: float = 1.0, disk_path: str = "/", *, collect_mounts: bool = True) -> None:
+        """Create a stopped sampler that reads usage every ``interval`` seconds."""
+        super().__init__(interval, "system-sampler")
+        self.disk_path = disk_path
+        self.collect_mounts = collect_mounts
+        self._last_net: tuple[float, Any] | None = None
+
+    def read_network(self, now: float) -> dict[str, float]:
+        """Network counters since boot plus the transfer rates since the previous reading."""
+        counters = psutil.net_io_counters()
+        if counters is None:
+            return {}
+        network: dict[str, float] = {
+            "bytes_sent": counters.bytes_sent,
+            "bytes_recv": counters.bytes_recv,
+            "packets_sent": counters.packets_sent,
+            "packets_recv": counters.packets_recv,
+            "errors_in": counters.errin,
+            "errors_out": counters.errout,
+            "drops_in": counters.dropin,
+            "drops_out": counters.dropout,
+        }
+        if self._last_net is not None:
+            last_time, last = self._last_net
+            elapsed = max(now - last_time, 1e-6)
+            network["sent_bytes_per_s"] = round((counters.bytes_sent - last.bytes_sent) / elapsed, 1)
+            network["recv_bytes_per_s"] = round((counters.bytes_recv - last.bytes_recv) / elapsed, 1)
+        self._last_net = (now, counters)
+        return network
+
+    def prime(self) -> None:
+        """Take the baseline CPU time readings that the first percentages are computed against."""
+        psutil.cpu_percent(interval=None)
+        psutil.cpu_percent(interval=None, percpu=True)
+        psutil.cpu_times_percent(interval=None)
+        self.read_network(time.monotonic())
+
+    def sample(self) -> SystemSample:
+        """Take one reading of every system metric."""
+        cpu_times = psutil.cpu_times_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk_total, disk_used, disk_free = shutil.disk_usage(self.disk_path)
+        try:
+            cpufreq = psutil.cpu_freq()
+            current_frequency: float | str = cpufreq.current if cpufreq else NOT_SUPPORTED
+        except (NotImplementedError, AttributeError, ValueError, TypeError) as e:
+            current_frequency = f"Error ({type(e).__name__})"
+        now = time.monotonic()
+
+        return SystemSample(
+            timestamp=time.time(),
+            monotonic=now,
+            cpu_percent=psutil.cpu_percent(interval=None),
+            per_cpu_percent=psutil.cpu_percent(interval=None, percpu=True),
+            cpu_times_percent={
+                "user": getattr(cpu_times, "user", "N/A"),
+                "system": getattr(cpu_times, "system", "N/A"),
+                "idle": getattr(cpu_times, "idle", "N/A"),
+                "interrupt": getattr(cpu_times, "interrupt", "N/A"),  # May not be available on all OS
+                "dpc": getattr(cpu_times, "dpc", "N/A"),  # May not be available on all OS (Windows)
+            },
+            current_frequency_mhz=current_frequency,
+            ram_total=memory.total,
+            ram_available=memory.available,
+            ram_used=memory.total - memory.available,
+            ram_percent=memory.percent,
+            disk_total=disk_total,
+            disk_used=disk_used,
+            disk_free=disk_free,
+            network=self.read_network(now),
+            mounts=read_mounts() if self.collect_mounts else [],
+        )
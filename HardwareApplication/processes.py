@@ -0,0 +1,120 @@
+"""Background sampling of the process table for top-N queries.
+
+``psutil.Process.cpu_percent`` needs a blocking interval or per-process state between
+calls. Instead, the sampler reads the cumulative CPU time of every process at a fixed
+cadence and derives usage from the difference with the previous pass, so a query only
+has to rank the arrays of the latest pass.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import psutil
+from metrics import BackgroundSampler
+
+# Only the attributes needed for ranking, psutil reads them in a single oneshot() per process
+PROCESS_ATTRS = ["pid", "name", "username", "create_time", "cpu_times", "memory_info"]
+SORT_KEYS = ("cpu", "rss")
+
+
+@dataclass
+class ProcessTable:
+    """One pass over the process table, stored column-wise."""
+
+    timestamp: float
+    monotonic: float
+    pids: np.ndarray
+    cpu_percent: np.ndarray
+    rss: np.ndarray
+    names: list[str]
+    usernames: list[str | None]
+
+    @property
+    def age(self) -> float:
+        """Seconds since the pass was taken."""
+        return time.monotonic() - self.monotonic
+
+    def __len__(self) -> int:
+        """Return the number of processes in the pass."""
+        return len(self.pids)
+
+    def top(self, n: int, sort: str = "cpu") -> list[dict[str, Any]]:
+        """Return the ``n`` processes using the most CPU or resident memory, largest first."""
+        values = self.cpu_percent if sort == "cpu" else self.rss
+        n = min(n, len(values))
+        if n == 0:
+            return []
+        # argpartition finds the n largest in linear time, only those n get sorted
+        candidates = np.argpartition(values, len(values) - n)[-n:]
+        ranked = candidates[np.argsort(values[candidates])[::-1]]
+        return [
+            {
+                "pid": int(self.pids[i]),
+                "name": self.names[i],
+                "username": self.usernames[i],
+                "cpu_percent": round(float(self.cpu_percent[i]), 1),
+                "rss_bytes": int(self.rss[i]),
+            }
+            for i in ranked
+        ]
+
+
+class ProcessSampler(BackgroundSampler):
+    """Keep per-process CPU time deltas between passes to report CPU usage without blocking."""
+
+    def __init__(self, interval: float = 2.0) -> None:
+        """Create a stopped sampler that walks the process table every ``interval`` seconds."""
+        super().__init__(interval, "process-sampler")
+        # (pid, create_time) -> cumulative CPU seconds, create_time guards against reused pids
+        self._cpu_seconds: dict[tuple[int, float], float] = {}
+        self._last_pass: float | None = None
+
+    def prime(self) -> None:
+        """Record the baseline CPU times that the first pass is compared against."""
+        self.sample()
+
+    def sample(self) -> ProcessTable:
+        """Walk the process table once."""
+        now = time.monotonic()
+        elapsed = None if self._last_pass is None else max(now - self._last_pass, 1e-6)
+
+        pids: list[int] = []
+        cpu_percent: list[float] = []
+        rss: list[int] = []
+        names: list[str] = []
+        usernames: list[str | None] = []
+        cpu_seconds: dict[tuple[int, float], float] = {}
+
+        for process in psutil.process_iter(PROCESS_ATTRS, ad_value=None):
+            info = process.info
+            cpu_times = info["cpu_times"]
+            memory_info = info["memory_info"]
+            percent = 0.0
+            if cpu_times is not None:
+                key = (info["pid"], info["create_time"] or 0.0)
+                total = cpu_times.user + cpu_times.system
+                cpu_seconds[key] = total
+                previous = self._cpu_seconds.get(key)
+                if previous is not None and elapsed is not None:
+                    percent = max(total - previous, 0.0) / elapsed * 100
+
+            pids.append(info["pid"])
+            cpu_percent.append(percent)
+            rss.append(memory_info.rss if memory_info is not None else 0)
+            names.append(info["name"] or "")
+            usernames.append(info["username"])
+
+        # Dropping the old mapping also forgets processes that exited
+        self._cpu_seconds = cpu_seconds
+        self._last_pass = now
+        return ProcessTable(
+            timestamp=time.time(),
+            monotonic=now,
+            pids=np.array(pids, dtype=np.int64),
+            cpu_percent=np.array(cpu_percent, dtype=np.float32),
+            rss=np.array(rss, dtype=np.int64),
+            names=names,
+            usernames=usernames,
+        )
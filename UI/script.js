@@ -8,6 +8,8 @@ document.addEventListener("DOMContentLoaded", () => {
   // IMPORTANT: Use http:// for localhost unless you have explicitly set up HTTPS.
   // Update port if your backend runs elsewhere.
   const apiUrl = "http://localhost:8000/ask";
+  // Session the server keeps the conversation under, set by its first answer
+  let sessionId = null;
 
   // --- Function to add a message to the chat window ---
   function addMessage(text, sender) {
@@ -110,7 +112,7 @@ document.addEventListener("DOMContentLoaded", () => {
           // Add any other headers like 'Accept: application/json' or Authorization if needed
           Accept: "application/json",
         },
-        body: JSON.stringify({ prompt: promptText }), // Send prompt in correct format
+        body: JSON.stringify({ prompt: promptText, session_id: sessionId }), // Send prompt in correct format
       });
 
       // --- Remove Typing Indicator ---
@@ -141,6 +143,9 @@ document.addEventListener("DOMContentLoaded", () => {
 
       // --- Process Successful Response ---
       const data = await response.json();
+      if (data && data.session_id) {
+        sessionId = data.session_id;
+      }
 
       // Check if the expected 'result' field exists
       if (data && data.result !== undefined) {
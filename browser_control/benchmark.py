@@ -0,0 +1,245 @@
+"""Benchmarks of the browser service against the offline result page server.
+
+``instances`` starts serp_fixture_server.py and measures search throughput of the
+browser pool alone against it for different numbers of browser instances. Every run
+keeps the total number of pages equal to the concurrency and spreads them over the
+given number of browser processes, so the runs differ only in how many processes share
+the work.
+
+``service`` starts serp_fixture_server.py and, for every page pool size, a browser
+service configured to search it. It then drives ``/browser/search`` at every
+concurrency and reports navigation, extraction and end-to-end latency percentiles.
+
+    uv run ./benchmark.py instances --instances 1 2 4 --concurrency 8 --searches 200
+    uv run ./benchmark.py service --pool_sizes 1 4 8 --concurrency 1 4 16 --searches 100
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+from playwright.async_api import async_playwright
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+
+from browser_configs import BrowserConfigs  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+from engines import SearchEngine, local_engine  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+# Launching the browsers of a service can take a while on a cold start
+STARTUP_TIMEOUT_S = 60.0
+BROWSER_CONFIG_PATH = HERE / "browser_config.toml"
+BROWSER_CONFIGS = (
+    BrowserConfigs.load_from_path(BROWSER_CONFIG_PATH) if BROWSER_CONFIG_PATH.exists() else BrowserConfigs()
+)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """p50, p95 and p99 of ``values`` in milliseconds."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+    return {"p50": round(statistics.median(ordered) * 1000, 1), "p95": at(0.95), "p99": at(0.99)}
+
+
+async def search_once(pool: BrowserPool, engine: SearchEngine, query: str) -> float:
+    """Run one search on a leased page and return its latency in seconds."""
+    started = time.monotonic()
+    async with pool.lease() as page:
+        await page.goto(engine.url(query), wait_until="domcontentloaded")
+        await page.evaluate(engine.extract_script, 3)
+    return time.monotonic() - started
+
+
+async def run_instances(instances: int, concurrency: int, searches: int, engine: SearchEngine) -> dict:
+    """Run ``searches`` searches with ``concurrency`` workers on a pool of ``instances`` browsers."""
+    async with async_playwright() as playwright:
+        pool = BrowserPool(
+            lambda: playwright.firefox.launch(headless=True),
+            instances=instances,
+            contexts_per_instance=1,
+            pages_per_context=math.ceil(concurrency / instances),
+            max_uses=BROWSER_CONFIGS.page_max_uses,
+            lease_timeout=BROWSER_CONFIGS.lease_timeout_s,
+        )
+        await pool.start()
+        queries = iter(range(searches))
+        latencies: list[float] = []
+
+        async def worker() -> None:
+            for i in queries:
+                latencies.append(await search_once(pool, engine, f"benchmark query {i}"))  # noqa: PERF401
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+        await pool.close()
+
+    return {"instances": instances, "searches_per_s": round(searches / elapsed, 1)} | percentiles(latencies)
+
+
+@contextmanager
+def server(args: list[str], env: dict[str, str] | None = None) -> Iterator[subprocess.Popen]:
+    """Run a server process from the browser_control directory for the duration of the block."""
+    process = subprocess.Popen([sys.executable, *args], cwd=HERE, env=env)  # noqa: S603
+    try:
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def wait_until_up(url: str) -> None:
+    """Poll ``url`` until it answers with success, wrap the call in ``asyncio.timeout`` to bound the wait."""
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).is_success:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+
+
+def write_config(path: Path, configs: BrowserConfigs) -> None:
+    """Write ``configs`` as TOML, every value is a string, number, boolean or list of strings."""
+    lines = [f"{key} = {json.dumps(value)}" for key, value in configs.model_dump(exclude_none=True).items()]
+    path.write_text("\n".join(lines) + "\n", encoding="utf8")
+
+
+async def drive(base_url: str, concurrency: int, searches: int, run_id: str) -> dict:
+    """Send ``searches`` distinct queries to ``/browser/search`` with ``concurrency`` in flight."""
+    queries = iter(range(searches))
+    total: list[float] = []
+    navigation: list[float] = []
+    extraction: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+
+        async def worker() -> None:
+            nonlocal errors
+            for i in queries:
+                started = time.monotonic()
+                response = await client.post("/browser/search", json={"query": f"{run_id} query {i}"})
+                total.append(time.monotonic() - started)
+                metrics = response.json().get("metrics")
+                if not metrics:
+                    errors += 1
+                    continue
+                navigation.append(metrics["navigation_ms"] / 1000)
+                extraction.append(metrics["extraction_ms"] / 1000)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "concurrency": concurrency,
+        "searches_per_s": round(searches / elapsed, 1),
+        "errors": errors,
+        "navigation_ms": percentiles(navigation),
+        "extraction_ms": percentiles(extraction),
+        "end_to_end_ms": percentiles(total),
+    }
+
+
+@contextmanager
+def fixture_server(args: argparse.Namespace) -> Iterator[str]:
+    """Run serp_fixture_server.py for the duration of the block, yielding its search URL template."""
+    fixture = [
+        "serp_fixture_server.py",
+        f"--port={args.fixture_port}",
+        f"--latency_ms={args.latency_ms}",
+        f"--page_kb={args.page_kb}",
+    ]
+    with server(fixture):
+        yield f"http://127.0.0.1:{args.fixture_port}/search?q={{query}}"
+
+
+async def run_instance_counts(args: argparse.Namespace) -> None:
+    """Benchmark the browser pool against the fixture server for every instance count."""
+    with fixture_server(args) as fixture_url:
+        async with asyncio.timeout(STARTUP_TIMEOUT_S):
+            await wait_until_up(fixture_url.format(query="up"))
+        engine = local_engine(fixture_url)
+        for count in args.instances:
+            result = await run_instances(count, args.concurrency, args.searches, engine)
+            print(json.dumps(result))  # noqa: T201
+
+
+async def run_service(args: argparse.Namespace) -> None:
+    """Benchmark ``/browser/search`` for every pool size and concurrency."""
+    with fixture_server(args) as fixture_url, tempfile.TemporaryDirectory() as scratch:
+        async with asyncio.timeout(STARTUP_TIMEOUT_S):
+            await wait_until_up(fixture_url.format(query="up"))
+        for pool_size in args.pool_sizes:
+            # Every query is new and the cache is off, so every search navigates
+            configs = BROWSER_CONFIGS.model_copy(
+                update={
+                    "pool_size": pool_size,
+                    "cache_ttl_s": 0.0,
+                    "cache_path": None,
+                    "default_engine": "local",
+                    "local_engine_url": fixture_url,
+                },
+            )
+            config_path = Path(scratch, f"browser_{pool_size}.toml")
+            write_config(config_path, configs)
+            service = ["-m", "uvicorn", "browser:APP", f"--port={args.service_port}", "--log-level=warning"]
+            with server(service, env=os.environ | {"BROWSER_CONFIG_PATH": str(config_path)}):
+                base_url = f"http://127.0.0.1:{args.service_port}"
+                async with asyncio.timeout(STARTUP_TIMEOUT_S):
+                    await wait_until_up(f"{base_url}/ready")
+                for concurrency in args.concurrency:
+                    result = await drive(base_url, concurrency, args.searches, f"p{pool_size}c{concurrency}")
+                    print(json.dumps({"pool_size": pool_size} | result))  # noqa: T201
+
+
+async def main() -> None:
+    """Run the benchmark selected on the command line and print one JSON line per run."""
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    instances = commands.add_parser("instances", help="Throughput of the browser pool per instance count")
+    instances.add_argument("--instances", type=int, nargs="+", default=[1, 2, 4])
+    instances.add_argument("--concurrency", type=int, default=8)
+    instances.add_argument("--searches", type=int, default=200)
+
+    service = commands.add_parser("service", help="Latency of /browser/search per pool size and concurrency")
+    service.add_argument("--pool_sizes", type=int, nargs="+", default=[1, 4, 8])
+    service.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    service.add_argument("--searches", type=int, default=100)
+    service.add_argument("--service_port", type=int, default=8011)
+
+    for command in (instances, service):
+        command.add_argument("--fixture_port", type=int, default=8765)
+        command.add_argument("--latency_ms", type=float, default=100.0)
+        command.add_argument("--page_kb", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.command == "instances":
+        await run_instance_counts(args)
+    else:
+        await run_service(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,54 @@
 """Browser control service using Playwright."""
 
+import asyncio
+import json
+import os
 import sys
+import time
+import weakref
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from urllib.parse import urlsplit
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from loguru import logger
-from models import SearchQuery
+from models import ReadQuery, SearchBatchQuery, SearchQuery
 from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
 parent_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(parent_dir))
 
+from browser_configs import BrowserConfigs  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+from engines import SearchEngine, build_engines  # noqa: E402
+from lean import MODE_STATS, PageTraffic  # noqa: E402
+from page_pool import PoolExhaustedError  # noqa: E402
+from reader import EXTRACT_SCRIPT, Chunk, chunk_blocks, select_chunks  # noqa: E402
+from search_cache import SearchCache  # noqa: E402
+
+from serving.sockets import serve  # noqa: E402
 from unified_logging.config_types import LoggingConfigs  # noqa: E402
 from unified_logging.logging_client import setup_network_logger_client  # noqa: E402
 
-LOGGING_CONFIG_PATH = Path("..", "unified_logging/logging_config.toml")
+LOGGING_CONFIG_PATH = parent_dir / "unified_logging" / "logging_config.toml"
 if LOGGING_CONFIG_PATH.exists():
     logging_configs = LoggingConfigs.load_from_path(str(LOGGING_CONFIG_PATH))
     setup_network_logger_client(logging_configs, logger)
     logger.info("Browser service started with unified logging")
 
+# The benchmark points BROWSER_CONFIG_PATH at its own configuration to try different pool sizes
+BROWSER_CONFIG_PATH = Path(
+    os.environ.get("BROWSER_CONFIG_PATH", Path(__file__).resolve().parent / "browser_config.toml"),
+)
+BROWSER_CONFIGS = (
+    BrowserConfigs.load_from_path(BROWSER_CONFIG_PATH) if BROWSER_CONFIG_PATH.exists() else BrowserConfigs()
+)
+
 
 class BrowserWindowLimitReachedError(Exception):
     """Exception raised when the browser window limit is reached."""
@@ -40,43 +68,145 @@ APP.add_middleware(
 PLAYWRIGHT: Playwright | None = None
 BROWSER: Browser | None = None
 CONTEXT: BrowserContext | None = None
+POOL: BrowserPool | None = None
 
-SEARCH_URL = "https://www.bing.com/search?q="
+ENGINES = build_engines(BROWSER_CONFIGS.local_engine_url)
 MAX_WINDOWS = 5
 
+# Traffic meter of every page that ran a search, dropped together with the page
+TRAFFIC: weakref.WeakKeyDictionary[Page, PageTraffic] = weakref.WeakKeyDictionary()
+
+SEARCH_CACHE = SearchCache(
+    ttl=BROWSER_CONFIGS.cache_ttl_s,
+    max_entries=BROWSER_CONFIGS.cache_max_entries,
+    persist_path=Path(__file__).resolve().parent / BROWSER_CONFIGS.cache_path if BROWSER_CONFIGS.cache_path else None,
+)
+STORAGE_STATE_PATH = (
+    Path(__file__).resolve().parent / BROWSER_CONFIGS.storage_state_path if BROWSER_CONFIGS.storage_state_path else None
+)
+
+
+@dataclass
+class Readiness:
+    """Warm-up progress and how fast the first search was, reported by /ready."""
+
+    ready: bool = False
+    storage_restored: bool = False
+    warmed_pages: int = 0
+    warmup_s: float = 0.0
+    first_search_ms: float | None = None
+    # "warm" if the first search ran after a successful warm-up, "cold" otherwise
+    first_search_start: str | None = None
+
+
+READINESS = Readiness()
+WARMUP_TASK: asyncio.Task[None] | None = None
+
 
 @APP.on_event("startup")
 async def startup() -> None:
     """On application startup.
 
     1. Launch async Playwright.
-    2. Launch a Firefox browser (change to chromium or webkit if desired).
+    2. Launch a Firefox browser (change to chromium or webkit if desired) for the user windows.
     3. Create a new browser context.
+    4. Launch the browser instances, contexts and pages that searches lease.
+    5. Warm up pages on the search engine origin in the background, /ready reports when it is done.
     """
-    global PLAYWRIGHT, BROWSER, CONTEXT
+    global PLAYWRIGHT, BROWSER, CONTEXT, POOL, WARMUP_TASK
     logger.info("Starting up browser service...")
+    SEARCH_CACHE.load()
     PLAYWRIGHT = await async_playwright().start()
-    # NOTE: set `headless=False` to see the browser window, or True to run in the background
-    BROWSER = await PLAYWRIGHT.firefox.launch(headless=False)
+    # NOTE: set `headless = false` in browser_config.toml to see the browser window, or true to run in the background
+    BROWSER = await PLAYWRIGHT.firefox.launch(headless=BROWSER_CONFIGS.headless)
     CONTEXT = await BROWSER.new_context()
+    playwright = PLAYWRIGHT
+    POOL = BrowserPool(
+        lambda: playwright.firefox.launch(headless=BROWSER_CONFIGS.headless),
+        instances=BROWSER_CONFIGS.browser_instances,
+        contexts_per_instance=BROWSER_CONFIGS.contexts_per_instance,
+        pages_per_context=BROWSER_CONFIGS.pool_size,
+        max_uses=BROWSER_CONFIGS.page_max_uses,
+        lease_timeout=BROWSER_CONFIGS.lease_timeout_s,
+        max_sessions=BROWSER_CONFIGS.max_session_contexts,
+        session_pages=BROWSER_CONFIGS.session_pages,
+        restart_backoff=BROWSER_CONFIGS.restart_backoff_s,
+        max_restart_backoff=BROWSER_CONFIGS.max_restart_backoff_s,
+        storage_state=STORAGE_STATE_PATH,
+    )
+    READINESS.storage_restored = STORAGE_STATE_PATH is not None and STORAGE_STATE_PATH.exists()
+    await POOL.start()
+    WARMUP_TASK = asyncio.ensure_future(warm_up(POOL))
     logger.info("Browser service started successfully.")
 
 
+async def warm_up(pool: BrowserPool) -> None:
+    """Load the origin of the default engine in ``warmup_pages`` pages, then mark the service ready."""
+    started = time.monotonic()
+    engine = ENGINES.get(BROWSER_CONFIGS.default_engine)
+    if BROWSER_CONFIGS.warmup_pages and engine is not None:
+        parts = urlsplit(engine.url(""))
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        READINESS.warmed_pages = await pool.warm_up(
+            origin,
+            BROWSER_CONFIGS.warmup_pages,
+            BROWSER_CONFIGS.warmup_timeout_s,
+        )
+        # Keep the cookies the warm-up collected even if the service does not shut down cleanly
+        await pool.save_storage_state()
+    READINESS.warmup_s = round(time.monotonic() - started, 2)
+    READINESS.ready = True
+    logger.info(
+        f"Browser service ready after warming {READINESS.warmed_pages} pages in {READINESS.warmup_s}s "
+        f"(storage state restored: {READINESS.storage_restored}).",
+    )
+
+
+@APP.get("/ready", response_model=None)
+async def ready() -> dict | JSONResponse:
+    """Report whether the browser pool is started and warmed up, with status 503 until it is."""
+    state = asdict(READINESS)
+    if not READINESS.ready:
+        return JSONResponse(status_code=503, content=state)
+    return state
+
+
 @APP.on_event("shutdown")
 async def shutdown() -> None:
-    """On application shutdown, close Playwright properly."""
+    """On application shutdown, persist the search cache and storage state and close Playwright properly."""
+    SEARCH_CACHE.save()
     if PLAYWRIGHT:
         logger.info("Shutting down browser service...")
+        if WARMUP_TASK is not None:
+            WARMUP_TASK.cancel()
+        if POOL is not None:
+            await POOL.save_storage_state()
+            await POOL.close()
         await PLAYWRIGHT.stop()
         logger.info("Browser service shut down successfully.")
 
 
 @APP.post("/browser/new_window_and_search")
 async def new_window_and_search(query: SearchQuery) -> dict:
-    """Open a new window and perform a search."""
+    """Open a new window and perform a search in it."""
     logger.info(f"Received request to open a new window and search for: {query.query}")
-    await open_new_window()
-    return await search(query)
+    opened = await open_new_window()
+    windows = user_windows()
+    if opened.get("response") != "Opened a new window." or not windows:
+        return opened
+    engine = ENGINES.get(query.engine or BROWSER_CONFIGS.default_engine)
+    if engine is None:
+        return {"response": f"Unknown search engine: {query.engine}. Available: {list(ENGINES)}"}
+    lean = BROWSER_CONFIGS.lean_mode if query.lean is None else query.lean
+    results, metrics = await run_search(windows[-1], query.query, engine, query.max_results, lean=lean)
+    return {"response": f"Searching for {query.query}", "results": results, "metrics": metrics}
+
+
+def user_windows() -> list[Page]:
+    """Pages opened through the window endpoints, the pooled search pages live in their own browsers."""
+    if CONTEXT is None:
+        return []
+    return list(CONTEXT.pages)
 
 
 def raise_window_limit_error() -> None:
@@ -104,7 +234,7 @@ async def open_new_window() -> dict:
         return {"response": "Browser context is not initialized."}
 
     try:
-        if len(CONTEXT.pages) >= MAX_WINDOWS:
+        if len(user_windows()) >= MAX_WINDOWS:
             logger.warning("Maximum browser window limit reached.")
             raise_window_limit_error()
         else:
@@ -116,45 +246,282 @@ async def open_new_window() -> dict:
         return {"response": str(e)}
 
 
+def traffic_of(page: Page) -> PageTraffic:
+    """Return the traffic meter of ``page``, attaching one on first use."""
+    traffic = TRAFFIC.get(page)
+    if traffic is None:
+        traffic = PageTraffic(
+            page,
+            blocked_types=frozenset(BROWSER_CONFIGS.blocked_resource_types),
+            block_third_party_scripts=BROWSER_CONFIGS.block_third_party_scripts,
+        )
+        traffic.attach()
+        TRAFFIC[page] = traffic
+    return traffic
+
+
+async def run_search(
+    page: Page,
+    query: str,
+    engine: SearchEngine,
+    limit: int,
+    *,
+    lean: bool,
+) -> tuple[list[dict], dict]:
+    """Navigate ``page`` to the ``engine`` results for ``query`` and extract the top ``limit`` results.
+
+    In lean mode heavy resources are blocked and only DOMContentLoaded (or the configured
+    ``wait_until``) and the result selector are awaited instead of the full page load.
+    Titles, URLs and snippets are extracted by one in-page script.
+    Returns the results and the navigation metrics.
+    """
+    url = engine.url(query)
+    traffic = traffic_of(page)
+    await traffic.begin(url, lean=lean)
+    if lean:
+        await page.goto(url, wait_until=BROWSER_CONFIGS.wait_until)
+        try:
+            await page.wait_for_selector(
+                engine.result_selector,
+                state="attached",
+                timeout=BROWSER_CONFIGS.result_wait_timeout_s * 1000,
+            )
+        except PlaywrightTimeoutError:
+            logger.warning(f"No search results appeared for: {query}")
+    else:
+        await page.goto(url)
+    logger.info(f"Navigated to search URL: {url}")
+
+    navigated = time.monotonic()
+    results = await page.evaluate(engine.extract_script, limit)
+    extraction = time.monotonic() - navigated
+    for i, result in enumerate(results):
+        logger.info(f"Result {i + 1}: Title: {result['title']}, URL: {result['url']}")
+
+    metrics = traffic.finish()
+    metrics["navigation_ms"] = round((navigated - traffic.started) * 1000, 1)
+    metrics["extraction_ms"] = round(extraction * 1000, 1)
+    if READINESS.first_search_ms is None:
+        READINESS.first_search_ms = metrics["latency_ms"]
+        READINESS.first_search_start = "warm" if READINESS.ready and READINESS.warmed_pages else "cold"
+        logger.info(
+            f"First search took {metrics['latency_ms']} ms after a {READINESS.first_search_start} start "
+            f"(storage state restored: {READINESS.storage_restored}).",
+        )
+    logger.info(f"Search metrics for {query}: {metrics}")
+    return results, metrics
+
+
 @APP.post("/browser/search")
 async def search(query: SearchQuery) -> dict:
-    """Perform a search on the most recently opened page.
+    """Perform a search on a page leased from the pool.
+
+    Each request gets a page to itself, on the least loaded browser instance or in the
+    context of its session, so concurrent searches do not interfere.
+    When all pages are busy the request waits for one to be released.
+    Recent results are served from the cache, and identical concurrent queries
+    share a single navigation.
 
     Args:
         query (SearchQuery): The search query to be performed.
 
     Returns:
-        dict: A dictionary containing the response message, including search results and their URLs.
+        dict: A dictionary containing the response message, including search results with their URLs
+            and snippets, whether they came from the cache and how old they are.
 
     """
     logger.info(f"Received search request for query: {query.query}")
-    if CONTEXT is None:
+    pool = POOL
+    if pool is None:
         logger.warning("Browser context is not initialized.")
         return {"response": "Browser context is not initialized."}
+    engine = ENGINES.get(query.engine or BROWSER_CONFIGS.default_engine)
+    if engine is None:
+        return {"response": f"Unknown search engine: {query.engine}. Available: {list(ENGINES)}"}
 
-    if len(CONTEXT.pages) == 0:
-        logger.info("No open pages found. Opening a new window.")
-        # If no pages exist, open a new window automatically
-        await open_new_window()
+    lean = BROWSER_CONFIGS.lean_mode if query.lean is None else query.lean
+    # Only the request that actually navigates gets navigation metrics
+    metrics: dict = {}
 
-    # Get the last page in the context
-    page: Page = CONTEXT.pages[-1]
-    await page.goto(SEARCH_URL + query.query)
-    logger.info(f"Navigated to search URL: {SEARCH_URL + query.query}")
+    async def fetch() -> list[dict]:
+        async with pool.lease(query.session_id) as page:
+            results, navigation = await run_search(page, query.query, engine, query.max_results, lean=lean)
+        metrics.update(navigation)
+        return results
 
-    # Get all result elements
-    result_elements = await page.query_selector_all("h2 a")
+    try:
+        if BROWSER_CONFIGS.cache_ttl_s > 0:
+            key = SEARCH_CACHE.key(engine.name, query.query, query.max_results, query.session_id)
+            lookup = await SEARCH_CACHE.get_or_fetch(key, fetch)
+            results, cached, shared, age = lookup.results, lookup.cached, lookup.shared, lookup.age
+        else:
+            results, cached, shared, age = await fetch(), False, False, 0.0
+    except PoolExhaustedError as e:
+        logger.error(f"Error: {e!s}")
+        return {"response": str(e)}
 
-    # Extract titles and links
-    results = []
-    for i, element in enumerate(result_elements[:3]):  # Limit to top 5 results
-        title = await element.text_content()
-        href = await element.get_attribute("href")
-        results.append({"title": title, "url": href})
-        logger.info(f"Result {i + 1}: Title: {title}, URL: {href}")
+    logger.info(f"Search completed for query: {query.query} (cached={cached}, shared={shared})")
+    return {
+        "response": f"Searching for {query.query}",
+        "results": results,
+        "cached": cached,
+        "shared": shared,
+        "cache_age_s": round(age, 1),
+        "metrics": metrics or None,
+    }
 
-    logger.info(f"Search completed for query: {query.query}")
-    return {"response": f"Searching for {query.query}", "results": results}
+
+@APP.post("/browser/search_batch")
+async def search_batch(batch: SearchBatchQuery) -> dict:
+    """Run several searches concurrently on pooled pages.
+
+    At most ``batch_parallelism`` queries of the batch run at the same time, the pool
+    bounds the total across all requests. Results are returned in the order of the queries.
+    """
+    logger.info(f"Received batch search request for {len(batch.queries)} queries: {batch.queries}")
+    semaphore = asyncio.Semaphore(BROWSER_CONFIGS.batch_parallelism)
+
+    async def run(query: str) -> dict:
+        async with semaphore:
+            single = SearchQuery(
+                query=query,
+                engine=batch.engine,
+                max_results=batch.max_results,
+                lean=batch.lean,
+                session_id=batch.session_id,
+            )
+            try:
+                return {"query": query} | await search(single)
+            except PlaywrightError as e:
+                # One failed navigation should not discard the results of the other queries
+                logger.error(f"Batch search failed for {query}: {e!s}")
+                return {"query": query, "response": f"Search failed: {e!s}", "results": []}
+
+    results = await asyncio.gather(*(run(query) for query in batch.queries))
+    logger.info(f"Batch search completed for {len(batch.queries)} queries")
+    return {"response": f"Searched for {len(batch.queries)} queries", "results": results}
+
+
+async def load_page(page: Page, request: ReadQuery) -> PageTraffic:
+    """Load ``request.url`` in ``page``, returning the meter counting its traffic."""
+    lean = BROWSER_CONFIGS.lean_mode if request.lean is None else request.lean
+    traffic = traffic_of(page)
+    await traffic.begin(request.url, lean=lean)
+    try:
+        await page.goto(request.url, wait_until="domcontentloaded", timeout=request.timeout_s * 1000)
+    except PlaywrightTimeoutError:
+        # Whatever has been parsed so far is still worth reading
+        logger.warning(f"Page load timed out after {request.timeout_s}s, reading what is there: {request.url}")
+    return traffic
+
+
+async def extract_page(page: Page, request: ReadQuery, traffic: PageTraffic) -> dict:
+    """Extract the readable text blocks of the loaded page within the byte cap."""
+    # Text is capped in characters, a UTF-8 character is at least one byte
+    extracted = await page.evaluate(EXTRACT_SCRIPT, request.max_bytes)
+    extracted["metrics"] = traffic.finish(record=False)
+    return extracted
+
+
+def select_read(request: ReadQuery, extracted: dict, started: float) -> tuple[list[Chunk], dict]:
+    """Chunks of the extracted text to return for ``request``, and the summary of the read."""
+    # Chunks never exceed the budget, so a small budget still gets the best chunk
+    chunks = chunk_blocks(extracted["blocks"], min(BROWSER_CONFIGS.read_chunk_tokens, request.token_budget))
+    selected = select_chunks(chunks, request.token_budget, request.question)
+    summary = {
+        "total_tokens": sum(chunk.tokens for chunk in chunks),
+        "returned_tokens": sum(chunk.tokens for chunk in selected),
+        "chunks_total": len(chunks),
+        "chunks_returned": len(selected),
+        # Either the page hit the byte cap, or chunks were dropped to fit the token budget
+        "truncated": extracted["truncated"] or len(selected) < len(chunks),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "metrics": extracted["metrics"],
+    }
+    logger.info(f"Read {request.url}: {summary}")
+    return selected, summary
+
+
+async def read_lines(request: ReadQuery, started: float) -> AsyncIterator[str]:
+    """Read ``request.url`` as newline-delimited JSON, each line sent as soon as it is known."""
+    try:
+        async with POOL.lease(request.session_id) as page:
+            traffic = await load_page(page, request)
+            # The header goes out once the page is loaded, before its text is extracted and ranked
+            yield json.dumps({"url": request.url, "title": await page.title()}) + "\n"
+            extracted = await extract_page(page, request, traffic)
+    except (PoolExhaustedError, PlaywrightError) as e:
+        logger.error(f"Reading {request.url} failed: {e!s}")
+        yield json.dumps({"done": True, "error": f"Could not read the page: {e!s}"}) + "\n"
+        return
+    selected, summary = select_read(request, extracted, started)
+    for chunk in selected:
+        yield json.dumps({"index": chunk.index, "score": round(chunk.score, 3), "text": chunk.text}) + "\n"
+    yield json.dumps({"done": True} | summary) + "\n"
+
+
+@APP.post("/browser/read", response_model=None)
+async def read(request: ReadQuery) -> dict | StreamingResponse:
+    """Open a URL on a pooled page and return its main readable text.
+
+    Scripts, styles, navigation and other boilerplate are stripped inside the page.
+    The text is split into chunks, and the chunks most relevant to ``question`` are
+    returned in document order within ``token_budget``. With ``stream`` set, the read
+    is streamed back as newline-delimited JSON: a header line as soon as the page has
+    loaded, then one line per chunk and a closing summary line once the text is
+    extracted; a failure ends the stream with a line carrying ``error``.
+    """
+    logger.info(f"Received read request for: {request.url}")
+    if POOL is None:
+        logger.warning("Browser context is not initialized.")
+        return {"response": "Browser context is not initialized."}
+
+    started = time.monotonic()
+    if request.stream:
+        return StreamingResponse(read_lines(request, started), media_type="application/x-ndjson")
+
+    try:
+        async with POOL.lease(request.session_id) as page:
+            traffic = await load_page(page, request)
+            extracted = await extract_page(page, request, traffic)
+    except PoolExhaustedError as e:
+        logger.error(f"Error: {e!s}")
+        return {"response": str(e)}
+    except PlaywrightError as e:
+        logger.error(f"Reading {request.url} failed: {e!s}")
+        return {"response": f"Could not read the page: {e!s}"}
+
+    selected, summary = select_read(request, extracted, started)
+    return (
+        {"url": request.url, "title": extracted["title"]}
+        | {
+            "text": "\n\n".join(chunk.text for chunk in selected),
+            "chunks": [
+                {"index": chunk.index, "score": round(chunk.score, 3), "tokens": chunk.tokens} for chunk in selected
+            ],
+        }
+        | summary
+    )
+
+
+@APP.get("/browser/pool")
+async def pool_stats() -> dict:
+    """Health and restarts of every browser instance, with the occupancy and wait times of its page pools."""
+    if POOL is None:
+        return {"response": "Browser context is not initialized."}
+    return POOL.stats()
+
+
+@APP.get("/browser/cache")
+async def cache_stats() -> dict:
+    """Hit, miss and eviction statistics of the search result cache."""
+    return SEARCH_CACHE.stats()
+
+
+@APP.get("/browser/traffic")
+async def traffic_stats() -> dict:
+    """Average latency, bytes and request counts per search, for lean and full mode."""
+    return {mode: stats.summary() for mode, stats in MODE_STATS.items()}
 
 
 @APP.post("/browser/close_current_window")
@@ -165,20 +532,21 @@ async def close_current_window() -> dict:
         logger.warning("Browser context is not initialized.")
         return {"response": "Browser context is not initialized."}
 
-    if len(CONTEXT.pages) == 0:
+    windows = user_windows()
+    if len(windows) == 0:
         logger.warning("No open windows to close.")
         return {"response": "No open windows to close."}
 
-    await CONTEXT.pages[-1].close()
+    await windows[-1].close()
     logger.info("Closed the current browser window.")
     return {"response": "Closed the current window."}
 
 
 @APP.get("/browser/close_browser")
 async def close_browser() -> dict:
-    """Close all open pages in the current context.
+    """Close all open windows in the current context.
 
-    (Does NOT close the entire Playwright instance;
+    (Does NOT close the entire Playwright instance or the pooled search pages;
      shutting down the entire app will do that.).
     """
     logger.info("Received request to close all browser windows.")
@@ -186,13 +554,12 @@ async def close_browser() -> dict:
         logger.warning("Browser context is not initialized.")
         return {"response": "Browser context is not initialized."}
 
-    for page in CONTEXT.pages:
+    for page in user_windows():
         await page.close()
     logger.info("All browser windows closed successfully.")
     return {"response": "Closed all browser windows."}
 
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(APP, host="127.0.0.1", port=8001)
+    # TCP on the configured port, and the Unix domain socket too if config.yaml gives one
+    serve(APP, "browser_service", host="127.0.0.1")
@@ -0,0 +1,65 @@
+"""Browser service configurations."""
+
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from unified_logging.config_types import load_toml
+
+
+class BrowserConfigs(BaseModel):
+    """Browser service configurations."""
+
+    model_config = ConfigDict(extra="forbid")
+    headless: bool = True
+    # Browser processes searches are spread over, each restarted if it crashes
+    browser_instances: int = Field(default=1, ge=1)
+    # Contexts sharing cookies and storage in every browser process
+    contexts_per_instance: int = Field(default=1, ge=1)
+    # Pages opened up front in every context and leased to one request at a time
+    pool_size: int = Field(default=4, ge=1)
+    # Requests with a session_id get a context of their own, the least recently used idle ones are closed
+    max_session_contexts: int = Field(default=16, ge=1)
+    session_pages: int = Field(default=1, ge=1)
+    # Cookies and local storage of the shared contexts are saved here on shutdown and restored on startup,
+    # relative to browser_control
+    storage_state_path: str | None = None
+    # Pages that load the default engine origin at startup, the service reports ready once they are done
+    warmup_pages: int = Field(default=2, ge=0)
+    warmup_timeout_s: float = Field(default=15.0, gt=0)
+    # First delay before relaunching a crashed browser, doubled after every failed attempt
+    restart_backoff_s: float = Field(default=1.0, gt=0)
+    max_restart_backoff_s: float = Field(default=30.0, gt=0)
+    # A page is closed and replaced after this many leases, keeping memory growth in check
+    page_max_uses: int = Field(default=50, ge=1)
+    # How long a request waits for a free page before giving up
+    lease_timeout_s: float = Field(default=30.0, gt=0)
+    # Queries of one /browser/search_batch request that run at the same time
+    batch_parallelism: int = Field(default=4, ge=1)
+    # Search results are reused for this long, 0 disables the cache
+    cache_ttl_s: float = Field(default=300.0, ge=0)
+    cache_max_entries: int = Field(default=512, ge=1)
+    # File the cache is saved to on shutdown and restored from on startup, relative to browser_control
+    cache_path: str | None = None
+    # Size of the text chunks /browser/read selects from, in approximate tokens
+    read_chunk_tokens: int = Field(default=200, ge=20)
+    # Engine used when a request does not name one: bing, duckduckgo or local
+    default_engine: str = "bing"
+    # Result page URL of the local engine, {query} is replaced by the URL-encoded query
+    local_engine_url: str = "http://127.0.0.1:8765/search?q={query}"
+    # Lean mode aborts the resource types below and waits for DOMContentLoaded instead of the full load
+    lean_mode: bool = True
+    blocked_resource_types: list[str] = ["image", "media", "font", "stylesheet"]
+    block_third_party_scripts: bool = True
+    wait_until: Literal["commit", "domcontentloaded", "load", "networkidle"] = "domcontentloaded"
+    # How long lean mode waits for the result selector after wait_until is reached
+    result_wait_timeout_s: float = Field(default=5.0, gt=0)
+
+    @staticmethod
+    def load_from_path(file_path: str | Path) -> "BrowserConfigs":
+        """Load browser configurations from a TOML file."""
+        configs: BrowserConfigs = BrowserConfigs.model_validate(
+            load_toml(Path(file_path)),
+        )
+        return configs
@@ -0,0 +1,289 @@
+"""Pool of browser processes, each running several contexts of leased pages.
+
+A single Firefox process runs every page on one main thread, so a heavy page slows
+down every search and a crash takes all of them down. Searches are spread over
+several browser instances instead, each with a few shared contexts that hold a
+``PagePool``, and every lease goes to the least loaded page pool. An instance that
+disconnects is relaunched with backoff while the others keep serving. Requests that
+carry a session get a context of their own, so cookies and storage never leak
+between sessions.
+
+Shared contexts can start from a saved storage state (cookies and local storage, such
+as a dismissed consent banner), and ``warm_up`` loads the engine origin in a number
+of pages before the first search, so it does not pay for DNS, TLS and cold caches.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from loguru import logger
+from page_pool import PagePool, PoolExhaustedError
+from playwright.async_api import Browser, BrowserContext, Page
+from playwright.async_api import Error as PlaywrightError
+
+
+@dataclass
+class BrowserInstance:
+    """One browser process and the page pools of its shared contexts."""
+
+    index: int
+    browser: Browser | None = None
+    pools: list[PagePool] = field(default_factory=list)
+    healthy: bool = False
+    restarts: int = 0
+
+    async def new_context(self) -> BrowserContext:
+        """Open a new context in the browser of the instance."""
+        if self.browser is None:
+            msg = f"Browser instance {self.index} is not running"
+            raise PoolExhaustedError(msg)
+        return await self.browser.new_context()
+
+    def load(self) -> float:
+        """Average load of the shared page pools of the instance."""
+        return sum(pool.load() for pool in self.pools) / len(self.pools) if self.pools else 0.0
+
+
+@dataclass
+class SessionContext:
+    """Context dedicated to one session, with the pages leased to its requests."""
+
+    instance: BrowserInstance
+    pool: PagePool
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class BrowserPool:
+    """Browser instances x contexts x pages, handed out one page at a time through ``lease``."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        launch: Callable[[], Awaitable[Browser]],
+        *,
+        instances: int,
+        contexts_per_instance: int,
+        pages_per_context: int,
+        max_uses: int,
+        lease_timeout: float,
+        max_sessions: int = 16,
+        session_pages: int = 1,
+        restart_backoff: float = 1.0,
+        max_restart_backoff: float = 30.0,
+        storage_state: Path | None = None,
+        page_setup: Callable[[Page], Awaitable[None]] | None = None,
+    ) -> None:
+        """Create a pool without browsers, call ``start`` to launch them."""
+        self.launch = launch
+        self.contexts_per_instance = contexts_per_instance
+        self.pages_per_context = pages_per_context
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+        self.max_sessions = max_sessions
+        self.session_pages = session_pages
+        self.restart_backoff = restart_backoff
+        self.max_restart_backoff = max_restart_backoff
+        self.storage_state = storage_state
+        self.page_setup = page_setup
+        self.instances = [BrowserInstance(index) for index in range(instances)]
+        self._sessions: OrderedDict[str, SessionContext] = OrderedDict()
+        self._session_lock = asyncio.Lock()
+        self._restarting: set[asyncio.Task[None]] = set()
+        self._closing = False
+        self._next = 0
+
+    def _page_pool(self, context: BrowserContext, size: int) -> PagePool:
+        return PagePool(
+            context,
+            size=size,
+            max_uses=self.max_uses,
+            lease_timeout=self.lease_timeout,
+            page_setup=self.page_setup,
+        )
+
+    async def start(self) -> None:
+        """Launch every browser instance concurrently.
+
+        Raises:
+            PlaywrightError: No instance could be launched.
+
+        """
+        outcomes = await asyncio.gather(*(self._launch(i) for i in self.instances), return_exceptions=True)
+        failed = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        for instance, outcome in zip(self.instances, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Browser instance {instance.index} failed to launch: {outcome!s}")
+                self._schedule_restart(instance)
+        if len(failed) == len(self.instances):
+            raise failed[0]
+        logger.info(
+            f"Browser pool started with {len(self.instances) - len(failed)} instances x "
+            f"{self.contexts_per_instance} contexts x {self.pages_per_context} pages.",
+        )
+
+    async def _launch(self, instance: BrowserInstance) -> None:
+        browser = await self.launch()
+        browser.on("disconnected", lambda _: self._on_disconnected(instance, browser))
+        # Session contexts always start empty, only the shared ones restore the saved state
+        options = {}
+        if self.storage_state is not None and self.storage_state.exists():
+            options["storage_state"] = str(self.storage_state)
+        try:
+            contexts = [await browser.new_context(**options) for _ in range(self.contexts_per_instance)]
+            pools = [self._page_pool(context, self.pages_per_context) for context in contexts]
+            await asyncio.gather(*(pool.start() for pool in pools))
+        except PlaywrightError:
+            # Do not leave a half set up browser process behind
+            await browser.close()
+            raise
+        instance.browser, instance.pools, instance.healthy = browser, pools, True
+
+    def _on_disconnected(self, instance: BrowserInstance, browser: Browser) -> None:
+        if self._closing or instance.browser is not browser:
+            return
+        logger.error(f"Browser instance {instance.index} disconnected, restarting it.")
+        instance.healthy = False
+        instance.pools = []
+        for session in [key for key, entry in self._sessions.items() if entry.instance is instance]:
+            # The context died with the browser, the session starts over in a new one
+            del self._sessions[session]
+        self._schedule_restart(instance)
+
+    def _schedule_restart(self, instance: BrowserInstance) -> None:
+        task = asyncio.ensure_future(self._restart(instance))
+        self._restarting.add(task)
+        task.add_done_callback(self._restarting.discard)
+
+    async def _restart(self, instance: BrowserInstance) -> None:
+        delay = self.restart_backoff
+        while not self._closing:
+            await asyncio.sleep(delay)
+            try:
+                await self._launch(instance)
+            except PlaywrightError as e:
+                delay = min(delay * 2, self.max_restart_backoff)
+                logger.error(f"Restarting browser instance {instance.index} failed, retrying in {delay}s: {e!s}")
+            else:
+                instance.restarts += 1
+                logger.info(f"Browser instance {instance.index} restarted.")
+                return
+
+    def _healthy(self) -> list[BrowserInstance]:
+        healthy = [instance for instance in self.instances if instance.healthy and instance.pools]
+        if not healthy:
+            msg = "No browser instance is running"
+            raise PoolExhaustedError(msg)
+        return healthy
+
+    def _least_loaded_pool(self) -> PagePool:
+        pools = [pool for instance in self._healthy() for pool in instance.pools]
+        # Rotate the starting point so equally loaded pools take turns
+        self._next = (self._next + 1) % len(pools)
+        rotated = pools[self._next :] + pools[: self._next]
+        return min(rotated, key=PagePool.load)
+
+    async def _session_pool(self, session: str) -> PagePool:
+        async with self._session_lock:
+            entry = self._sessions.get(session)
+            if entry is None or not entry.instance.healthy:
+                instance = min(self._healthy(), key=BrowserInstance.load)
+                context = await instance.new_context()
+                pool = self._page_pool(context, self.session_pages)
+                await pool.start()
+                entry = SessionContext(instance=instance, pool=pool)
+                self._sessions[session] = entry
+                await self._evict_sessions(keep=session)
+            self._sessions.move_to_end(session)
+            entry.last_used = time.monotonic()
+            return entry.pool
+
+    async def _evict_sessions(self, keep: str) -> None:
+        # Least recently used idle sessions go first, busy ones and ``keep``, just created, are kept over the limit
+        for session in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                return
+            entry = self._sessions[session]
+            if session != keep and entry.pool.load() == 0:
+                del self._sessions[session]
+                await self._close_context(entry.pool)
+
+    @staticmethod
+    async def _close_context(pool: PagePool) -> None:
+        await pool.close()
+        try:
+            await pool.context.close()
+        except PlaywrightError as e:
+            logger.warning(f"Could not close session context: {e!s}")
+
+    @asynccontextmanager
+    async def lease(self, session: str | None = None) -> AsyncIterator[Page]:
+        """Give the caller exclusive use of a page until the ``async with`` block exits.
+
+        Without a session the page comes from the least loaded shared context, with one
+        it comes from the context of that session, created on first use.
+
+        Raises:
+            PoolExhaustedError: No instance is running, or no page became free within the lease timeout.
+
+        """
+        pool = await self._session_pool(session) if session else self._least_loaded_pool()
+        async with pool.lease() as page:
+            yield page
+
+    async def warm_up(self, url: str, pages: int, navigation_timeout: float) -> int:
+        """Load ``url`` in up to ``pages`` pages at once, spread over the pools, and return how many succeeded."""
+        pages = min(pages, sum(len(instance.pools) * self.pages_per_context for instance in self.instances))
+
+        async def visit() -> bool:
+            try:
+                async with self.lease() as page:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=navigation_timeout * 1000)
+            except (PlaywrightError, PoolExhaustedError) as e:
+                logger.warning(f"Warm-up navigation to {url} failed: {e!s}")
+                return False
+            return True
+
+        return sum(await asyncio.gather(*(visit() for _ in range(pages))))
+
+    async def save_storage_state(self) -> None:
+        """Save the cookies and local storage of the first shared context to ``storage_state``."""
+        if self.storage_state is None:
+            return
+        for instance in self.instances:
+            if instance.healthy and instance.pools:
+                self.storage_state.parent.mkdir(parents=True, exist_ok=True)
+                await instance.pools[0].context.storage_state(path=self.storage_state)
+                logger.info(f"Saved the browser storage state to {self.storage_state}.")
+                return
+
+    async def close(self) -> None:
+        """Stop restarting instances and close every browser of the pool."""
+        self._closing = True
+        for task in list(self._restarting):
+            task.cancel()
+        for instance in self.instances:
+            if instance.browser is not None and instance.browser.is_connected():
+                await instance.browser.close()
+            instance.healthy = False
+
+    def stats(self) -> dict:
+        """Health, restarts and page pool counters of every instance, plus the session contexts."""
+        return {
+            "instances": [
+                {
+                    "index": instance.index,
+                    "healthy": instance.healthy,
+                    "restarts": instance.restarts,
+                    "load": round(instance.load(), 2),
+                    "contexts": [pool.stats() for pool in instance.pools],
+                    "sessions": sum(1 for entry in self._sessions.values() if entry.instance is instance),
+                }
+                for instance in self.instances
+            ],
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+        }
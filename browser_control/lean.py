@@ -0,0 +1,118 @@
+"""Lean navigation: block heavy resources and measure what every search transfers.
+
+A search only reads a few result links, yet a full page load downloads images, fonts,
+stylesheets, ads and trackers. In lean mode those requests are aborted before they
+leave the browser. Each pooled page carries a ``PageTraffic`` meter so latency, bytes
+and request counts can be reported per search and compared between the two modes.
+"""
+
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from playwright.async_api import Page, Request, Response, Route
+
+
+def site_of(url: str) -> str:
+    """Approximate the registrable domain of a URL by its last two host labels."""
+    host = urlsplit(url).hostname or ""
+    return ".".join(host.split(".")[-2:])
+
+
+@dataclass
+class ModeStats:
+    """Totals of all searches run in one navigation mode."""
+
+    searches: int = 0
+    total_latency: float = 0.0
+    total_bytes: int = 0
+    total_requests: int = 0
+    total_blocked: int = 0
+
+    def summary(self) -> dict[str, float | int]:
+        """Averages per search."""
+        n = self.searches or 1
+        return {
+            "searches": self.searches,
+            "avg_latency_ms": round(self.total_latency / n * 1000, 1),
+            "avg_bytes": round(self.total_bytes / n),
+            "avg_requests": round(self.total_requests / n, 1),
+            "avg_blocked": round(self.total_blocked / n, 1),
+        }
+
+
+MODE_STATS = {"lean": ModeStats(), "full": ModeStats()}
+
+
+@dataclass
+class PageTraffic:
+    """Route blocking and traffic counters of one page, reset at the start of every search."""
+
+    page: Page
+    blocked_types: frozenset[str]
+    block_third_party_scripts: bool
+    lean: bool = False
+    routed: bool = False
+    site: str = ""
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    blocked: int = 0
+    bytes: int = 0
+
+    def attach(self) -> None:
+        """Start counting the responses of the page."""
+        self.page.on("response", self._on_response)
+
+    async def begin(self, url: str, *, lean: bool) -> None:
+        """Reset the counters and switch the page to lean or full mode for a navigation to ``url``."""
+        self.lean = lean
+        self.site = site_of(url)
+        self.requests = self.blocked = self.bytes = 0
+        self.started = time.monotonic()
+        # Routing costs a round trip per request, so it is only installed while in lean mode
+        if lean and not self.routed:
+            await self.page.route("**/*", self._on_route)
+            self.routed = True
+        elif not lean and self.routed:
+            await self.page.unroute("**/*", self._on_route)
+            self.routed = False
+
+    def finish(self, *, record: bool = True) -> dict[str, float | int | str]:
+        """Return the metrics of the navigation, recording a search in the per-mode totals if ``record``."""
+        latency = time.monotonic() - self.started
+        mode = "lean" if self.lean else "full"
+        if record:
+            stats = MODE_STATS[mode]
+            stats.searches += 1
+            stats.total_latency += latency
+            stats.total_bytes += self.bytes
+            stats.total_requests += self.requests
+            stats.total_blocked += self.blocked
+        return {
+            "mode": mode,
+            "latency_ms": round(latency * 1000, 1),
+            "bytes": self.bytes,
+            "requests": self.requests,
+            "blocked": self.blocked,
+        }
+
+    def _should_block(self, request: Request) -> bool:
+        if request.resource_type in self.blocked_types:
+            return True
+        return (
+            self.block_third_party_scripts and request.resource_type == "script" and site_of(request.url) != self.site
+        )
+
+    async def _on_route(self, route: Route, request: Request) -> None:
+        if self._should_block(request):
+            self.blocked += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _on_response(self, response: Response) -> None:
+        self.requests += 1
+        # Content-Length is an approximation: it is the compressed size and missing on chunked responses
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes += int(length)
@@ -7,3 +7,44 @@ class SearchQuery(BaseModel):
     """SearchQuery: Pydantic model for the search query."""
 
     query: str = Field(strict=True, default="India")
+    engine: str | None = Field(
+        default=None,
+        description="Search engine (bing, duckduckgo, local), defaults to default_engine in browser_config.toml",
+    )
+    max_results: int = Field(default=3, ge=1, le=20, description="Number of results to return")
+    lean: bool | None = Field(
+        default=None,
+        description="Block heavy resources and skip the full page load, defaults to lean_mode in browser_config.toml",
+    )
+    session_id: str | None = Field(
+        default=None,
+        description="Requests with the same session share a browser context isolated from other sessions",
+    )
+
+
+class SearchBatchQuery(BaseModel):
+    """SearchBatchQuery: Pydantic model for several search queries run together."""
+
+    queries: list[str] = Field(min_length=1, max_length=20)
+    engine: str | None = Field(default=None, description="Search engine used for every query")
+    max_results: int = Field(default=3, ge=1, le=20, description="Number of results to return per query")
+    lean: bool | None = Field(default=None, description="Lean navigation for every query")
+    session_id: str | None = Field(default=None, description="Browser context session used for every query")
+
+
+class ReadQuery(BaseModel):
+    """ReadQuery: Pydantic model for reading the text of a web page."""
+
+    url: str = Field(strict=True, pattern=r"^https?://")
+    question: str | None = Field(default=None, description="Chunks most relevant to this question are returned")
+    token_budget: int = Field(default=1500, ge=50, le=20000, description="Approximate tokens of text to return")
+    max_bytes: int = Field(
+        default=500_000,
+        ge=1000,
+        le=5_000_000,
+        description="Cap on the text extracted from the page",
+    )
+    timeout_s: float = Field(default=15.0, gt=0, le=60, description="Cap on the time spent loading the page")
+    stream: bool = Field(default=False, description="Stream the chunks back as newline-delimited JSON")
+    lean: bool | None = Field(default=None, description="Block heavy resources while loading the page")
+    session_id: str | None = Field(default=None, description="Read the page in the browser context of this session")
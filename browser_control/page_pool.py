@@ -0,0 +1,152 @@
+"""Pool of pre-opened pages leased to one request at a time.
+
+Every search used to navigate the most recently opened page, so two concurrent
+searches raced on the same page. A lease gives a request exclusive use of a page
+until it is done with it; requests queue while all pages are busy.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
+from loguru import logger
+from playwright.async_api import BrowserContext, Page
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no page became free within the lease timeout."""
+
+
+class PagePool:
+    """A fixed number of pages in one browser context, handed out through ``lease``."""
+
+    def __init__(
+        self,
+        context: BrowserContext,
+        size: int,
+        max_uses: int,
+        lease_timeout: float,
+        page_setup: Callable[[Page], Awaitable[None]] | None = None,
+    ) -> None:
+        """Create an empty pool, call ``start`` to open its pages."""
+        self.context = context
+        self.size = size
+        self.max_uses = max_uses
+        self.lease_timeout = lease_timeout
+        self.page_setup = page_setup
+        self._idle: asyncio.Queue[Page] = asyncio.Queue()
+        self._uses: dict[Page, int] = {}
+        self._creating = 0
+        self._busy = 0
+        self._waiting = 0
+        self._leases = 0
+        self._recycled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def start(self) -> None:
+        """Open all pages of the pool concurrently."""
+        pages = await asyncio.gather(*(self._new_page() for _ in range(self.size)))
+        for page in pages:
+            self._idle.put_nowait(page)
+        logger.info(f"Page pool started with {self.size} pages.")
+
+    async def close(self) -> None:
+        """Close every page owned by the pool."""
+        for page in list(self._uses):
+            await self._discard(page)
+
+    def load(self) -> float:
+        """Leased and awaited pages per pooled page, used to pick the least busy pool."""
+        return (self._busy + self._waiting) / self.size
+
+    async def _new_page(self) -> Page:
+        self._creating += 1
+        try:
+            page = await self.context.new_page()
+            if self.page_setup is not None:
+                await self.page_setup(page)
+        finally:
+            self._creating -= 1
+        self._uses[page] = 0
+        return page
+
+    async def _discard(self, page: Page) -> None:
+        self._uses.pop(page, None)
+        if not page.is_closed():
+            try:
+                await page.close()
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"Could not close pooled page: {e!s}")
+
+    async def _acquire(self) -> Page:
+        # Refill the pool if earlier recycling failed to open a replacement page
+        if self._idle.empty() and len(self._uses) + self._creating < self.size:
+            return await self._new_page()
+        return await self._idle.get()
+
+    async def _release(self, page: Page, *, failed: bool) -> None:
+        self._uses[page] = self._uses.get(page, 0) + 1
+        if not failed and not page.is_closed() and self._uses[page] < self.max_uses:
+            self._idle.put_nowait(page)
+            return
+
+        # Recycle pages that errored, were closed, or have been used too often
+        self._recycled += 1
+        await self._discard(page)
+        try:
+            self._idle.put_nowait(await self._new_page())
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Could not open a replacement page: {e!s}")
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Page]:
+        """Give the caller exclusive use of a page until the ``async with`` block exits.
+
+        Raises:
+            PoolExhaustedError: No page became free within the lease timeout.
+
+        """
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            page = await asyncio.wait_for(self._acquire(), timeout=self.lease_timeout)
+        except TimeoutError as e:
+            msg = f"No browser page became free within {self.lease_timeout}s"
+            raise PoolExhaustedError(msg) from e
+        finally:
+            self._waiting -= 1
+
+        wait = time.monotonic() - started
+        self._leases += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+        if page.is_closed():
+            self._uses.pop(page, None)
+            page = await self._new_page()
+
+        self._busy += 1
+        failed = False
+        try:
+            yield page
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._busy -= 1
+            await self._release(page, failed=failed)
+
+    def stats(self) -> dict[str, float | int]:
+        """Occupancy and wait-time counters of the pool."""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "busy": self._busy,
+            "waiting": self._waiting,
+            "leases": self._leases,
+            "recycled": self._recycled,
+            "avg_wait_ms": round(self._total_wait / self._leases * 1000, 2) if self._leases else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 2),
+        }
@@ -0,0 +1,151 @@
+"""Readable text extraction and token-budgeted chunk selection for web pages.
+
+The page's main text is extracted by one in-page script that drops scripts, styles,
+navigation and other boilerplate and stops after a byte cap, so raw HTML never
+leaves the browser. The text is then split into chunks, and only the chunks most
+relevant to the question are kept within the caller's token budget.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+# Roughly four characters per token for English text, close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+EXTRACT_SCRIPT = """(maxChars) => {
+    const root = (document.querySelector("article") || document.querySelector("main")
+        || document.querySelector("[role=main]") || document.body);
+    if (!root) {
+        return {title: document.title, blocks: [], chars: 0, truncated: false};
+    }
+    const clone = root.cloneNode(true);
+    clone.querySelectorAll(
+        "script, style, noscript, template, iframe, svg, canvas, nav, header, footer, aside, form, button,"
+        + " [role=navigation], [role=banner], [role=contentinfo], [aria-hidden=true]"
+    ).forEach((element) => element.remove());
+
+    const blocks = [];
+    const seen = new Set();
+    let chars = 0;
+    let truncated = false;
+    for (const element of clone.querySelectorAll("h1, h2, h3, h4, h5, h6, p, li, pre, blockquote, td, dd")) {
+        // Nested matches (a p inside an li) would repeat the same text
+        if (element.querySelector("p, li, pre, blockquote")) {
+            continue;
+        }
+        const text = element.textContent.replace(/\\s+/g, " ").trim();
+        if (text.length < 2 || seen.has(text)) {
+            continue;
+        }
+        seen.add(text);
+        if (chars + text.length > maxChars) {
+            blocks.push(text.slice(0, maxChars - chars));
+            truncated = true;
+            break;
+        }
+        blocks.push(text);
+        chars += text.length;
+    }
+    return {title: document.title, blocks: blocks, chars: chars, truncated: truncated};
+}"""
+
+WORD = re.compile(r"[a-z0-9]+")
+# fmt: off
+STOPWORDS = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does", "for", "from", "has",
+        "have", "how", "i", "in", "is", "it", "its", "of", "on", "or", "that", "the", "their", "there",
+        "this", "to", "was", "what", "when", "where", "which", "who", "why", "will", "with", "you", "your",
+    },
+)
+# fmt: on
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def terms(text: str) -> list[str]:
+    """Lower-cased words of ``text`` without stopwords."""
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    """A run of consecutive text blocks."""
+
+    index: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def chunk_blocks(blocks: list[str], chunk_tokens: int) -> list[Chunk]:
+    """Group consecutive blocks into chunks of about ``chunk_tokens`` tokens, splitting oversized blocks."""
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks: list[Chunk] = []
+    current: list[str] = []
+    size = 0
+
+    def flush() -> None:
+        nonlocal current, size
+        if current:
+            text = "\n".join(current)
+            chunks.append(Chunk(index=len(chunks), text=text, tokens=estimate_tokens(text)))
+        current, size = [], 0
+
+    for block in blocks:
+        for start in range(0, len(block), max_chars):
+            piece = block[start : start + max_chars]
+            if size + len(piece) > max_chars:
+                flush()
+            current.append(piece)
+            size += len(piece) + 1
+    flush()
+    return chunks
+
+
+def score_chunks(chunks: list[Chunk], question: str) -> None:
+    """Score every chunk against ``question`` with BM25."""
+    query = set(terms(question))
+    if not query or not chunks:
+        return
+    counts = [Counter(terms(chunk.text)) for chunk in chunks]
+    lengths = [sum(count.values()) for count in counts]
+    average = sum(lengths) / len(lengths) or 1.0
+    k1, b = 1.2, 0.75
+    for term in query:
+        containing = sum(1 for count in counts if term in count)
+        if containing == 0:
+            continue
+        idf = math.log(1 + (len(chunks) - containing + 0.5) / (containing + 0.5))
+        for chunk, count, length in zip(chunks, counts, lengths, strict=True):
+            tf = count[term]
+            if tf:
+                chunk.score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+
+
+def select_chunks(chunks: list[Chunk], token_budget: int, question: str | None) -> list[Chunk]:
+    """Pick the chunks to return within ``token_budget``, kept in document order.
+
+    With a question, the highest scoring chunks are picked first; without one, the page
+    is simply truncated. A chunk that does not fit is skipped in favour of smaller ones.
+    """
+    if question:
+        score_chunks(chunks, question)
+        ranked = sorted(chunks, key=lambda chunk: (-chunk.score, chunk.index))
+    else:
+        ranked = chunks
+
+    selected: list[Chunk] = []
+    used = 0
+    for chunk in ranked:
+        if used + chunk.tokens <= token_budget:
+            selected.append(chunk)
+            used += chunk.tokens
+        elif not question:
+            break
+    return sorted(selected, key=lambda chunk: chunk.index)
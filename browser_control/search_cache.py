@@ -0,0 +1,145 @@
+"""Cache of search results with single-flight navigation.
+
+Results are kept per engine, normalized query and result count for a limited time, in a
+size-bounded LRU. While a query is being fetched, identical queries wait for that
+navigation instead of starting their own.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+
+@dataclass
+class CacheEntry:
+    """Results of one search and when they were fetched (unix time, so it survives restarts)."""
+
+    results: list[dict]
+    fetched_at: float
+
+
+@dataclass
+class CacheLookup:
+    """Results returned by the cache and where they came from."""
+
+    results: list[dict]
+    cached: bool  # served from a stored entry
+    shared: bool  # joined a navigation another request had already started
+    age: float
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share an entry."""
+    return " ".join(query.casefold().split())
+
+
+class SearchCache:
+    """TTL + LRU cache of search results keyed on the engine, normalized query and result count."""
+
+    def __init__(self, ttl: float, max_entries: int, persist_path: Path | None = None) -> None:
+        """Create an empty cache, call ``load`` to restore persisted entries."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[list[dict]]] = {}
+        self._hits = 0
+        self._shared = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(engine: str, query: str, limit: int, session: str | None = None) -> str:
+        """Build the cache key of a query, kept apart per session when one is given."""
+        key = f"{engine}:{limit}:{normalize_query(query)}"
+        return f"{session}/{key}" if session else key
+
+    def _fresh(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.fetched_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, results: list[dict]) -> None:
+        self._entries[key] = CacheEntry(results=results, fetched_at=time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[list[dict]]]) -> CacheLookup:
+        """Return the cached results for ``key``, or fetch them exactly once for all concurrent callers."""
+        entry = self._fresh(key)
+        if entry is not None:
+            self._hits += 1
+            return CacheLookup(entry.results, cached=True, shared=False, age=time.time() - entry.fetched_at)
+
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            self._misses += 1
+            # The navigation runs as its own task, so it finishes for the other callers
+            # even if the request that started it goes away
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self._shared += 1
+
+        results = await asyncio.shield(task)
+        return CacheLookup(results, cached=False, shared=shared, age=0.0)
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        try:
+            results = await fetch()
+        finally:
+            del self._inflight[key]
+        # An empty page usually means a blocked or broken navigation, so it is not worth keeping
+        if results:
+            self._store(key, results)
+        return results
+
+    def load(self) -> None:
+        """Restore the unexpired entries saved by ``save``."""
+        if self.persist_path is None or not self.persist_path.exists():
+            return
+        try:
+            saved = json.loads(self.persist_path.read_text(encoding="utf8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load the search cache from {self.persist_path}: {e!s}")
+            return
+        now = time.time()
+        for key, entry in saved.items():
+            if now - entry["fetched_at"] <= self.ttl:
+                self._entries[key] = CacheEntry(results=entry["results"], fetched_at=entry["fetched_at"])
+        logger.info(f"Loaded {len(self._entries)} search cache entries from {self.persist_path}.")
+
+    def save(self) -> None:
+        """Write the cache to ``persist_path``, if persistence is enabled."""
+        if self.persist_path is None:
+            return
+        entries = {key: {"results": e.results, "fetched_at": e.fetched_at} for key, e in self._entries.items()}
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        self.persist_path.write_text(json.dumps(entries), encoding="utf8")
+        logger.info(f"Saved {len(entries)} search cache entries to {self.persist_path}.")
+
+    def stats(self) -> dict[str, int]:
+        """Hit, miss and eviction counters of the cache."""
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self._hits,
+            "shared": self._shared,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
@@ -0,0 +1,139 @@
+"""Local search result page server for testing and benchmarking the browser service offline.
+
+Serves result pages in the markup of the local engine at ``/search?q={query}``, so
+setting ``default_engine = "local"`` in browser_config.toml (or ``engine: "local"`` in a
+request) searches this server instead of a live engine. Pages are synthetic and
+deterministic per query unless a recorded page exists for the query. Page weight,
+the number of images, stylesheets and scripts each page pulls in, and the response
+latency are configurable, so lean and full navigation can be compared realistically.
+
+    uv run ./serp_fixture_server.py --port 8765 --latency_ms 150 --page_kb 120 --assets 20
+"""
+
+import argparse
+import asyncio
+import html
+import random
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Response
+from fastapi.responses import HTMLResponse
+
+# fmt: off
+WORDS = [
+    "system", "process", "memory", "browser", "search", "network", "latency", "result", "cache", "thread",
+    "page", "engine", "service", "request", "response", "python", "model", "server", "index", "query",
+]
+# fmt: on
+
+
+@dataclass
+class FixtureSettings:
+    """What the fixture server serves and how slowly."""
+
+    results: int = 10
+    page_kb: int = 100
+    assets: int = 10
+    asset_kb: int = 20
+    latency_ms: float = 100.0
+    jitter_ms: float = 50.0
+    recordings: Path | None = None
+
+
+SETTINGS = FixtureSettings()
+
+APP = FastAPI()
+
+
+def slug(query: str) -> str:
+    """File name of the recorded page of ``query``."""
+    return re.sub(r"[^a-z0-9]+", "-", query.casefold()).strip("-") or "empty"
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    """Make up a sentence of ``words`` words."""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def result_page(query: str) -> str:
+    """Synthetic result page of ``query`` in the local engine markup, padded to ``page_kb``."""
+    rng = random.Random(query)  # noqa: S311
+    escaped = html.escape(query)
+    head = [f"<title>{escaped} - Fixture Search</title>"]
+    body = [f"<h1>Results for {escaped}</h1>"]
+    for i in range(SETTINGS.assets):
+        # A mix of the resource types lean mode blocks, so blocking has something to save
+        kind = ("img", "css", "js")[i % 3]
+        if kind == "img":
+            body.append(f'<img src="/assets/{i}.png" alt="">')
+        elif kind == "css":
+            head.append(f'<link rel="stylesheet" href="/assets/{i}.css">')
+        else:
+            head.append(f'<script src="/assets/{i}.js" defer></script>')
+    for i in range(SETTINGS.results):
+        url = f"https://example.org/{slug(query)}/{i}"
+        body.append(
+            f'<div class="result"><h2><a href="{url}">{escaped}: {sentence(rng, 4)}</a></h2>'
+            f'<p class="snippet">{sentence(rng, 25)}</p></div>',
+        )
+
+    page = "<!doctype html><html><head>{}</head><body>{}{}</body></html>"
+    size = len(page.format("".join(head), "".join(body), ""))
+    # Hidden filler stands in for the inline scripts, styles and markup of a real result page
+    filler = max(0, SETTINGS.page_kb * 1024 - size - 64)
+    padding = f'<div hidden class="filler">{sentence(rng, filler // 6)[:filler]}</div>' if filler else ""
+    return page.format("".join(head), "".join(body), padding)
+
+
+async def delay() -> None:
+    """Wait the configured latency plus a random jitter."""
+    await asyncio.sleep((SETTINGS.latency_ms + random.uniform(0, SETTINGS.jitter_ms)) / 1000)  # noqa: S311
+
+
+@APP.get("/search")
+async def search(q: str = "") -> HTMLResponse:
+    """Serve the result page of query ``q``, the recorded one if there is one."""
+    await delay()
+    if SETTINGS.recordings is not None:
+        recorded = SETTINGS.recordings / f"{slug(q)}.html"
+        if recorded.exists():
+            return HTMLResponse(recorded.read_text(encoding="utf8"))
+    return HTMLResponse(result_page(q))
+
+
+@APP.get("/assets/{name}")
+async def asset(name: str) -> Response:
+    """Serve a padding asset of ``asset_kb`` kilobytes with a content type matching its extension."""
+    await delay()
+    media_type = {"png": "image/png", "css": "text/css", "js": "text/javascript"}.get(name.rsplit(".", 1)[-1])
+    body = b"/*" + b"x" * max(0, SETTINGS.asset_kb * 1024 - 4) + b"*/"
+    return Response(body, media_type=media_type or "application/octet-stream")
+
+
+def main() -> None:
+    """Start the fixture server with the settings given on the command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--results", type=int, default=SETTINGS.results)
+    parser.add_argument("--page_kb", type=int, default=SETTINGS.page_kb)
+    parser.add_argument("--assets", type=int, default=SETTINGS.assets)
+    parser.add_argument("--asset_kb", type=int, default=SETTINGS.asset_kb)
+    parser.add_argument("--latency_ms", type=float, default=SETTINGS.latency_ms)
+    parser.add_argument("--jitter_ms", type=float, default=SETTINGS.jitter_ms)
+    parser.add_argument("--recordings", type=Path, default=None, help="Directory of recorded <query-slug>.html pages")
+    args = parser.parse_args()
+
+    SETTINGS.results, SETTINGS.page_kb = args.results, args.page_kb
+    SETTINGS.assets, SETTINGS.asset_kb = args.assets, args.asset_kb
+    SETTINGS.latency_ms, SETTINGS.jitter_ms = args.latency_ms, args.jitter_ms
+    SETTINGS.recordings = args.recordings
+
+    uvicorn.run(APP, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
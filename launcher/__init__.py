@@ -0,0 +1 @@
+"""Start the services, wait until they are ready and restart them when they crash."""
@@ -0,0 +1,62 @@
+"""Start the services in parallel, report when each is ready and keep them running.
+
+Run from the repository root, with the environment of the services:
+
+    uv run python -m launcher
+    uv run python -m launcher --services logger_service hardware_service
+"""
+
+import argparse
+import json
+import signal
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from launcher.launcher_configs import LauncherConfigs
+from launcher.services import service_specs
+from launcher.supervisor import Supervisor
+from serving.sockets import load_network_config
+
+LAUNCHER_CONFIG_PATH = Path(__file__).resolve().parent / "launcher_config.toml"
+
+
+def main() -> None:
+    """Start the configured services and supervise them until interrupted."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_file_path", default=str(LAUNCHER_CONFIG_PATH))
+    parser.add_argument("--services", nargs="+", default=None, help="Names in config.yaml, overrides the config")
+    parser.add_argument("--exit_when_ready", action="store_true", help="Stop everything once all are ready")
+    args = parser.parse_args()
+
+    configs = LauncherConfigs.load_from_path(args.config_file_path)
+    specs = service_specs(load_network_config(), configs.probe_timeout_s)
+    names = args.services or configs.services
+    unknown = set(names) - set(specs)
+    if unknown:
+        parser.error(f"unknown services {sorted(unknown)}, known are {sorted(specs)}")
+
+    supervisor = Supervisor([specs[name] for name in names], configs)
+    # Stop the services on SIGTERM too, not only on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stopping.set())
+    supervisor.start()
+    try:
+        # Services are restarted until the startup timeout, so allow for a few attempts
+        if supervisor.wait_ready(configs.startup_timeout_s * 3):
+            logger.info(f"All {len(names)} services ready in {time.monotonic() - supervisor.started:.2f} s")
+        else:
+            logger.error("Not every service became ready")
+        for line in supervisor.report():
+            print(json.dumps(line))  # noqa: T201
+        while not args.exit_when_ready and not supervisor.stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping the services")
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Launcher configurations."""
+
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from unified_logging.config_types import load_toml
+
+
+class LauncherConfigs(BaseModel):
+    """Launcher configurations."""
+
+    model_config = ConfigDict(extra="forbid")
+    # Services started, by their names in config.yaml; the logging server is logger_service
+    services: list[str] = ["logger_service", "browser_service", "hardware_service", "llm_service", "ui_service"]
+    # A service that does not pass its readiness probe within this time is restarted
+    startup_timeout_s: float = Field(default=60.0, gt=0)
+    probe_interval_s: float = Field(default=0.1, gt=0)
+    probe_timeout_s: float = Field(default=1.0, gt=0)
+    # First delay before restarting a crashed service, doubled after every crash in a row
+    restart_backoff_s: float = Field(default=1.0, gt=0)
+    max_restart_backoff_s: float = Field(default=30.0, gt=0)
+    # A service that ran this long before crashing is restarted after the first delay again
+    healthy_after_s: float = Field(default=30.0, gt=0)
+    # How long a service gets to shut down after SIGTERM before it is killed
+    stop_timeout_s: float = Field(default=10.0, gt=0)
+
+    @staticmethod
+    def load_from_path(file_path: str | Path) -> "LauncherConfigs":
+        """Load launcher configurations from a TOML file."""
+        configs: LauncherConfigs = LauncherConfigs.model_validate(
+            load_toml(Path(file_path)),
+        )
+        return configs
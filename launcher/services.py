@@ -0,0 +1,97 @@
+"""The services the launcher starts and the probes telling they are ready."""
+
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import httpx
+import zmq
+
+from launcher.supervisor import ServiceSpec
+from serving.sockets import base_url
+from unified_logging.config_types import LoggingConfigs
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+LOGGING_CONFIG_PATH = REPO_DIR / "unified_logging" / "logging_config.toml"
+
+
+def http_probe(url: str, timeout_s: float) -> Callable[[], bool]:
+    """Probe passing once ``url`` answers with status 200."""
+
+    def probe() -> bool:
+        try:
+            return httpx.get(url, timeout=timeout_s).status_code == httpx.codes.OK
+        except httpx.HTTPError:
+            return False
+
+    return probe
+
+
+def stats_probe(port: int, timeout_s: float) -> Callable[[], bool]:
+    """Probe passing once the logging server answers on its stats ``port``."""
+
+    def probe() -> bool:
+        socket = zmq.Context.instance().socket(zmq.REQ)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.setsockopt(zmq.RCVTIMEO, int(timeout_s * 1000))
+        socket.connect(f"tcp://127.0.0.1:{port}")
+        try:
+            socket.send(b"stats")
+            socket.recv()
+        except zmq.Again:
+            return False
+        finally:
+            socket.close()
+        return True
+
+    return probe
+
+
+def running() -> Callable[[], bool]:
+    """Probe passing as soon as the process runs, for services without anything to ask."""
+    return lambda: True
+
+
+def service_specs(network_config: dict[str, Any], probe_timeout_s: float) -> dict[str, ServiceSpec]:
+    """Every service the launcher knows, keyed by its name in config.yaml or ``single_process``."""
+    python = sys.executable
+    logging_configs = LoggingConfigs.load_from_path(LOGGING_CONFIG_PATH)
+
+    def ready_url(service: str) -> str:
+        return base_url(network_config[service]) + "/ready"
+
+    specs = {
+        "logger_service": (
+            REPO_DIR / "unified_logging",
+            [python, "start_logging_server.py"],
+            stats_probe(logging_configs.stats_port, probe_timeout_s) if logging_configs.stats_port else running(),
+        ),
+        "browser_service": (
+            REPO_DIR / "browser_control",
+            [python, "browser.py"],
+            http_probe(ready_url("browser_service"), probe_timeout_s),
+        ),
+        "hardware_service": (
+            REPO_DIR / "HardwareApplication",
+            [python, "hardware.py"],
+            http_probe(ready_url("hardware_service"), probe_timeout_s),
+        ),
+        "llm_service": (
+            REPO_DIR / "tool_use",
+            [python, "llm.py"],
+            http_probe(ready_url("llm_service"), probe_timeout_s),
+        ),
+        # The LLM service with the browser and hardware services in its process, see tool_use/single_process.py
+        "single_process": (
+            REPO_DIR / "tool_use",
+            [python, "single_process.py", "--port", str(network_config["llm_service"]["port"])],
+            http_probe(ready_url("llm_service"), probe_timeout_s),
+        ),
+        "ui_service": (
+            REPO_DIR / "UI",
+            [python, "-m", "http.server", str(network_config["ui_service"]["port"])],
+            http_probe(base_url(network_config["ui_service"]) + "/", probe_timeout_s),
+        ),
+    }
+    return {name: ServiceSpec(name, directory, command, probe) for name, (directory, command, probe) in specs.items()}
@@ -0,0 +1,154 @@
+"""Run services as child processes, probe their readiness and restart them when they exit.
+
+Every service is watched by a thread of its own, so the services start in parallel
+and the launcher is ready once the slowest of them is. A service that exits, or does
+not become ready within ``startup_timeout_s``, is restarted after a delay that doubles
+with every failure in a row, like the browser pool relaunches crashed browsers.
+"""
+
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from launcher.launcher_configs import LauncherConfigs
+
+
+@dataclass
+class ServiceSpec:
+    """How to start a service and how to tell it is ready."""
+
+    name: str
+    # Working directory, the services find their configuration relative to it
+    directory: Path
+    command: list[str]
+    # Returns whether the service answers, called until it does
+    probe: Callable[[], bool]
+
+
+class ServiceRunner:
+    """Keep one service running, see the module docstring."""
+
+    def __init__(self, spec: ServiceSpec, configs: LauncherConfigs, stopping: threading.Event) -> None:
+        """Prepare the watcher thread, ``start`` starts it."""
+        self.spec = spec
+        self.configs = configs
+        self.stopping = stopping
+        # Set while the current process of the service has passed its probe
+        self.ready = threading.Event()
+        self.process: subprocess.Popen | None = None
+        # Time from the first start to the first passed probe
+        self.startup_s: float | None = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=spec.name, daemon=True)
+
+    def start(self) -> None:
+        """Start the service and keep it running until ``stopping`` is set."""
+        self._thread.start()
+
+    def _run(self) -> None:
+        first_start = time.monotonic()
+        failures = 0
+        while not self.stopping.is_set():
+            started = time.monotonic()
+            with self._lock:
+                if self.stopping.is_set():
+                    return
+                self.process = subprocess.Popen(self.spec.command, cwd=self.spec.directory)  # noqa: S603
+            if self._wait_ready(started, first_start):
+                self.process.wait()
+            self.ready.clear()
+            if self.stopping.is_set():
+                return
+
+            failures = 0 if time.monotonic() - started >= self.configs.healthy_after_s else failures + 1
+            delay = min(self.configs.restart_backoff_s * 2 ** max(failures - 1, 0), self.configs.max_restart_backoff_s)
+            self.restarts += 1
+            logger.warning(
+                f"{self.spec.name} exited with code {self.process.returncode}, restarting in {delay:.1f} s "
+                f"(restart {self.restarts})",
+            )
+            self.stopping.wait(delay)
+
+    def _wait_ready(self, started: float, first_start: float) -> bool:
+        """Probe the service until it is ready; return False if it exited or was stopped first."""
+        process = self.process
+        deadline = started + self.configs.startup_timeout_s
+        while not self.stopping.is_set() and process is not None and process.poll() is None:
+            if self.spec.probe():
+                now = time.monotonic()
+                if self.startup_s is None:
+                    self.startup_s = now - first_start
+                logger.info(f"{self.spec.name} ready in {now - started:.2f} s (pid {process.pid})")
+                self.ready.set()
+                return True
+            if time.monotonic() > deadline:
+                logger.error(f"{self.spec.name} not ready after {self.configs.startup_timeout_s} s, restarting it")
+                self._terminate(process)
+                return False
+            self.stopping.wait(self.configs.probe_interval_s)
+        return False
+
+    def _terminate(self, process: subprocess.Popen) -> None:
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(self.configs.stop_timeout_s)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"{self.spec.name} did not stop within {self.configs.stop_timeout_s} s, killing it")
+            process.kill()
+            process.wait()
+
+    def stop(self) -> None:
+        """Stop the service; ``stopping`` has to be set first so it is not restarted."""
+        with self._lock:
+            process = self.process
+        if process is not None:
+            self._terminate(process)
+        self._thread.join()
+
+
+class Supervisor:
+    """Start every service in parallel and keep them running."""
+
+    def __init__(self, specs: list[ServiceSpec], configs: LauncherConfigs) -> None:
+        """Prepare a runner per service, ``start`` starts them."""
+        self.stopping = threading.Event()
+        self.runners = [ServiceRunner(spec, configs, self.stopping) for spec in specs]
+        self.started: float | None = None
+
+    def start(self) -> None:
+        """Start every service."""
+        self.started = time.monotonic()
+        for runner in self.runners:
+            runner.start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Wait until every service is ready, at most ``timeout`` seconds; return whether they are."""
+        deadline = time.monotonic() + timeout
+        return all(runner.ready.wait(max(0.0, deadline - time.monotonic())) for runner in self.runners)
+
+    def report(self) -> list[dict]:
+        """Startup time, restarts and pid of every service."""
+        return [
+            {
+                "service": runner.spec.name,
+                "startup_s": round(runner.startup_s, 2) if runner.startup_s is not None else None,
+                "ready": runner.ready.is_set(),
+                "restarts": runner.restarts,
+                "pid": runner.process.pid if runner.process is not None else None,
+            }
+            for runner in self.runners
+        ]
+
+    def stop(self) -> None:
+        """Stop every service, the ones started last first."""
+        self.stopping.set()
+        for runner in reversed(self.runners):
+            runner.stop()
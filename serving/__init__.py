@@ -0,0 +1 @@
+"""Network settings of the services and the sockets they listen on."""
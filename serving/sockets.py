@@ -0,0 +1,87 @@
+"""Sockets the services listen on, as configured in config.yaml.
+
+Every service listens on TCP at its ``host`` and ``port``. A service that also has a
+``uds`` path listens on that Unix domain socket as well, and the tools reach it there,
+skipping the TCP stack on the machine the services share. TCP stays open for the UI
+and for links such as image URLs. Relative ``uds`` paths are relative to config.yaml.
+"""
+
+import socket
+import stat
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.yaml"
+
+
+def load_network_config(path: Path = CONFIG_PATH) -> dict[str, Any]:
+    """Return config.yaml as a dictionary keyed by service name."""
+    with path.open() as file:
+        return yaml.safe_load(file)
+
+
+def base_url(service: dict[str, Any]) -> str:
+    """TCP URL of a service section of config.yaml, like ``http://localhost:8003``."""
+    return f"http://{service['host']}:{service['port']}"
+
+
+def socket_path(service: dict[str, Any], config_path: Path = CONFIG_PATH) -> Path | None:
+    """Unix domain socket path of a service section of config.yaml, ``None`` if it has none."""
+    if not service.get("uds") or not hasattr(socket, "AF_UNIX"):
+        return None
+    return (config_path.parent / service["uds"]).resolve()
+
+
+def tcp_socket(host: str, port: int) -> socket.socket:
+    """Return a listening TCP socket, bound the way uvicorn binds one."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # asyncio only sets TCP_NODELAY on connections of sockets created with IPPROTO_TCP, without it
+    # small responses wait on delayed ACKs for 40 ms
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    return sock
+
+
+def unix_socket(path: Path) -> socket.socket:
+    """Return a listening Unix domain socket at ``path``, readable and writable by this user only.
+
+    Raises:
+        FileExistsError: Something other than a socket left by an earlier run is at ``path``.
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if not stat.S_ISSOCK(path.stat().st_mode):
+            msg = f"{path} exists and is not a socket"
+            raise FileExistsError(msg)
+        path.unlink()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    path.chmod(0o600)
+    sock.listen(2048)
+    return sock
+
+
+def serve(app: Any, name: str, host: str | None = None) -> None:  # noqa: ANN401
+    """Run ``app`` with uvicorn on the sockets config.yaml gives the service ``name``.
+
+    ``host`` overrides the configured TCP host, the services bind 127.0.0.1 by default.
+    """
+    import uvicorn  # noqa: PLC0415
+
+    service = load_network_config()[name]
+    sockets = [tcp_socket(host or service["host"], int(service["port"]))]
+    path = socket_path(service)
+    if path is not None:
+        sockets.append(unix_socket(path))
+    try:
+        uvicorn.Server(uvicorn.Config(app)).run(sockets=sockets)
+    finally:
+        for sock in sockets:
+            sock.close()
+        if path is not None:
+            path.unlink(missing_ok=True)
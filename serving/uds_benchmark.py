@@ -0,0 +1,112 @@
+"""Compare HTTP over a Unix domain socket with HTTP over TCP loopback.
+
+Starts a small FastAPI app in a separate process, listening on both, the way
+``serving.sockets.serve`` runs the services, and calls it through pooled httpx
+clients. Prints one JSON line per transport and response size with the p50, p95 and
+p99 latency of sequential requests in milliseconds and the requests per second that
+``--threads`` threads sharing one client reach.
+
+    uv run python -m serving.uds_benchmark --requests 5000 --threads 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.synchronize import Event
+from pathlib import Path
+
+import httpx
+
+from serving.sockets import tcp_socket, unix_socket
+
+
+def run_server(port: int, path: Path, ready: Event) -> None:
+    """Serve an app answering ``/payload?size=`` with that many bytes of JSON, on TCP and on ``path``."""
+    import uvicorn  # noqa: PLC0415
+    from fastapi import FastAPI  # noqa: PLC0415
+
+    app = FastAPI()
+
+    @app.get("/payload")
+    def payload(size: int = 64) -> dict:
+        return {"data": "x" * size}
+
+    sockets = [tcp_socket("127.0.0.1", port), unix_socket(path)]
+    ready.set()
+    uvicorn.Server(uvicorn.Config(app, log_level="warning")).run(sockets=sockets)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """p50, p95 and p99 of ``values`` in milliseconds."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+    return {"p50": round(statistics.median(ordered) * 1000, 3), "p95": at(0.95), "p99": at(0.99)}
+
+
+def measure(client: httpx.Client, size: int, requests: int, threads: int) -> dict:
+    """Latency of ``requests`` sequential requests, then the throughput of ``threads`` threads."""
+    params = {"size": size}
+    for _ in range(100):  # Warm up the pool and the server
+        client.get("/payload", params=params).raise_for_status()
+
+    durations = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get("/payload", params=params).raise_for_status()
+        durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for response in pool.map(lambda _: client.get("/payload", params=params), range(requests)):
+            response.raise_for_status()
+    requests_per_s = requests / (time.perf_counter() - started)
+    return {**percentiles(durations), "requests_per_s": round(requests_per_s)}
+
+
+def main() -> None:
+    """Start the server and measure both transports for every response size."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 16 * 1024, 256 * 1024], help="Response bytes")
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = Path(scratch, "benchmark.sock")
+        context = multiprocessing.get_context("spawn")
+        ready = context.Event()
+        server = context.Process(target=run_server, args=(args.port, path, ready), daemon=True)
+        server.start()
+        ready.wait(30)
+        limits = httpx.Limits(max_connections=args.threads, max_keepalive_connections=args.threads)
+        clients = {
+            "tcp": httpx.Client(base_url=f"http://127.0.0.1:{args.port}", limits=limits),
+            "uds": httpx.Client(
+                base_url="http://localhost",
+                transport=httpx.HTTPTransport(uds=str(path), limits=limits),
+            ),
+        }
+        try:
+            for size in args.sizes:
+                for name, client in clients.items():
+                    result = measure(client, size, args.requests, args.threads)
+                    print(json.dumps({"transport": name, "response_bytes": size, **result}))  # noqa: T201
+        finally:
+            for client in clients.values():
+                client.close()
+            server.terminate()
+            server.join(10)
+
+
+if __name__ == "__main__":
+    main()
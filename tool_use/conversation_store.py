@@ -0,0 +1,293 @@
+"""Persistent store of the /ask turns and the tool calls they made.
+
+Turns are written to SQLite in WAL mode by a background thread, in batches of up to
+``batch_size`` per transaction, so a request only appends its record to a bounded
+queue; when the queue is full the oldest records are dropped and counted. Prompts,
+answers, tool arguments and results are indexed with FTS5 for ``search``, and the
+reports below read through covering indexes so they stay fast over millions of rows.
+Readers open their own connections and never wait for the writer.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from store_configs import StoreConfigs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    prompt TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    error TEXT,
+    duration_ms REAL NOT NULL,
+    model TEXT,
+    llm_calls INTEGER NOT NULL,
+    llm_ms REAL NOT NULL,
+    llm_load_ms REAL NOT NULL,
+    llm_prompt_eval_ms REAL NOT NULL,
+    llm_eval_ms REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    context_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS turns_started_at ON turns (started_at, duration_ms);
+CREATE INDEX IF NOT EXISTS turns_duration ON turns (duration_ms, started_at);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, started_at);
+
+CREATE TABLE IF NOT EXISTS tool_calls (
+    id INTEGER PRIMARY KEY,
+    turn_id INTEGER NOT NULL REFERENCES turns (id),
+    started_at REAL NOT NULL,
+    tool TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    result TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    failed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tool_calls_turn ON tool_calls (turn_id);
+CREATE INDEX IF NOT EXISTS tool_calls_usage ON tool_calls (started_at, tool, duration_ms, failed);
+CREATE INDEX IF NOT EXISTS tool_calls_latency ON tool_calls (tool, duration_ms, started_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5 (prompt, answer, content='turns', content_rowid='id');
+CREATE VIRTUAL TABLE IF NOT EXISTS tool_calls_fts USING fts5 (
+    tool, arguments, result, content='tool_calls', content_rowid='id'
+);
+"""
+
+
+@dataclass
+class ToolCallRecord:
+    """One tool call: its arguments and result as text and how long it took."""
+
+    tool: str
+    arguments: str
+    result: str
+    started_at: float  # unix time
+    duration_ms: float
+    failed: bool = False
+
+
+@dataclass
+class TurnRecord:
+    """One /ask turn with the model timings and tool calls of the agent run."""
+
+    session_id: str
+    started_at: float  # unix time
+    prompt: str
+    answer: str
+    duration_ms: float
+    error: str | None = None
+    model: str | None = None
+    llm_calls: int = 0
+    # Wall time of the model calls, and the load, prompt evaluation and generation times Ollama reports
+    llm_ms: float = 0.0
+    llm_load_ms: float = 0.0
+    llm_prompt_eval_ms: float = 0.0
+    llm_eval_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Estimate of the context ConversationMemory built for the turn
+    context_tokens: int | None = None
+    tool_calls: list[ToolCallRecord] = field(default_factory=list)
+
+
+@dataclass
+class StoreCounters:
+    """Record counters of the store writer."""
+
+    submitted: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0  # lost in a batch SQLite refused
+    batches: int = 0
+
+
+def connect(path: Path, *, read_only: bool = False) -> sqlite3.Connection:
+    """Open the store, creating it for writers; readers see the last committed batch."""
+    if read_only:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL a commit only waits for the log write, and a crash loses at most the last batches
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class ConversationStore:
+    """Write turn records in the background, see the module docstring."""
+
+    def __init__(self, configs: StoreConfigs, path: Path) -> None:
+        """Open or create the database at ``path`` and start the writer thread."""
+        self.configs = configs
+        self.path = path
+        self.counters = StoreCounters()
+        self._connection = connect(path)
+        self._queue: deque[TurnRecord] = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="conversation-store", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: TurnRecord) -> None:
+        """Queue ``record`` for writing, dropping the oldest queued record if the queue is full."""
+        record = self._truncated(record)
+        with self._condition:
+            if len(self._queue) >= self.configs.queue_capacity:
+                self._queue.popleft()
+                self.counters.dropped += 1
+            self._queue.append(record)
+            self.counters.submitted += 1
+            if len(self._queue) >= self.configs.batch_size:
+                self._condition.notify()
+
+    def _truncated(self, record: TurnRecord) -> TurnRecord:
+        limit = self.configs.max_text_chars
+        for call in record.tool_calls:
+            call.arguments = call.arguments[:limit]
+            call.result = call.result[:limit]
+        record.answer = record.answer[:limit]
+        return record
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                # submit wakes the writer as soon as a batch is full
+                if len(self._queue) < self.configs.batch_size and not self._closing:
+                    self._condition.wait(self.configs.flush_interval_ms / 1000)
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.configs.batch_size))]
+                done = self._closing and not self._queue
+            if batch:
+                self._write(batch)
+            if done:
+                return
+
+    def _write(self, batch: list[TurnRecord]) -> None:
+        connection = self._connection
+        try:
+            with connection:
+                first_turn = self._next_id("turns")
+                first_call = self._next_id("tool_calls")
+                for record in batch:
+                    values = asdict(record)
+                    calls = values.pop("tool_calls")
+                    # Column names come from the record fields, not from the request
+                    cursor = connection.execute(
+                        f"INSERT INTO turns ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",  # noqa: S608
+                        list(values.values()),
+                    )
+                    connection.executemany(
+                        "INSERT INTO tool_calls (turn_id, tool, arguments, result, started_at, duration_ms, failed) "
+                        "VALUES (:turn_id, :tool, :arguments, :result, :started_at, :duration_ms, :failed)",
+                        [{**call, "turn_id": cursor.lastrowid} for call in calls],
+                    )
+                # One statement per index for the whole batch instead of one per row
+                connection.execute(
+                    "INSERT INTO turns_fts (rowid, prompt, answer) SELECT id, prompt, answer FROM turns WHERE id >= ?",
+                    (first_turn,),
+                )
+                connection.execute(
+                    "INSERT INTO tool_calls_fts (rowid, tool, arguments, result) "
+                    "SELECT id, tool, arguments, result FROM tool_calls WHERE id >= ?",
+                    (first_call,),
+                )
+        except sqlite3.Error:
+            self.counters.failed += len(batch)
+            return
+        self.counters.written += len(batch)
+        self.counters.batches += 1
+
+    def _next_id(self, table: str) -> int:
+        row = self._connection.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()  # noqa: S608
+        return row[0]
+
+    def stats(self) -> dict[str, int]:
+        """Counters and queue depth of the writer."""
+        return asdict(self.counters) | {"queued": len(self._queue)}
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every submitted record is written or dropped; return whether that happened in time."""
+        deadline = time.monotonic() + timeout
+        counters = self.counters
+        while counters.submitted > counters.written + counters.dropped + counters.failed:
+            if time.monotonic() > deadline:
+                return False
+            with self._condition:
+                self._condition.notify()
+            time.sleep(0.01)
+        return True
+
+    def close(self) -> None:
+        """Write what is queued and close the database."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self._connection.close()
+
+
+def search(connection: sqlite3.Connection, query: str, limit: int = 20, *, tools: bool = False) -> list[dict]:
+    """Best matches of an FTS5 ``query`` among the prompts and answers, or among the tool calls with ``tools``."""
+    if tools:
+        sql = """
+            SELECT c.id, c.turn_id, c.started_at, c.tool, c.duration_ms, c.failed,
+                   snippet(tool_calls_fts, -1, '[', ']', '...', 12) AS snippet
+            FROM tool_calls_fts JOIN tool_calls AS c ON c.id = tool_calls_fts.rowid
+            WHERE tool_calls_fts MATCH ? ORDER BY rank LIMIT ?
+        """
+    else:
+        sql = """
+            SELECT t.id, t.session_id, t.started_at, t.duration_ms, t.prompt,
+                   snippet(turns_fts, 1, '[', ']', '...', 12) AS snippet
+            FROM turns_fts JOIN turns AS t ON t.id = turns_fts.rowid
+            WHERE turns_fts MATCH ? ORDER BY rank LIMIT ?
+        """
+    return [dict(row) for row in connection.execute(sql, (query, limit))]
+
+
+def slow_turns(connection: sqlite3.Connection, since: float = 0.0, limit: int = 20) -> list[dict]:
+    """Slowest turns since ``since`` with their model and tool time."""
+    sql = """
+        SELECT t.id, t.session_id, t.started_at, t.duration_ms, t.llm_calls, t.llm_ms, t.llm_eval_ms,
+               (SELECT COALESCE(SUM(duration_ms), 0) FROM tool_calls WHERE turn_id = t.id) AS tool_ms,
+               (SELECT COUNT(*) FROM tool_calls WHERE turn_id = t.id) AS tool_calls,
+               substr(t.prompt, 1, 80) AS prompt
+        FROM turns AS t INDEXED BY turns_duration
+        WHERE t.started_at >= ? ORDER BY t.duration_ms DESC LIMIT ?
+    """
+    return [dict(row) for row in connection.execute(sql, (since, limit))]
+
+
+def tool_usage(connection: sqlite3.Connection, since: float = 0.0) -> list[dict]:
+    """Return calls, failures and latency of every tool since ``since``, the p95 read by offset in its index."""
+    usage = [
+        dict(row)
+        for row in connection.execute(
+            """
+            SELECT tool, COUNT(*) AS calls, SUM(failed) AS failed, ROUND(AVG(duration_ms), 1) AS avg_ms,
+                   ROUND(MAX(duration_ms), 1) AS max_ms
+            FROM tool_calls INDEXED BY tool_calls_usage
+            WHERE started_at >= ? GROUP BY tool ORDER BY calls DESC
+            """,
+            (since,),
+        )
+    ]
+    for row in usage:
+        p95 = connection.execute(
+            """
+            SELECT duration_ms FROM tool_calls INDEXED BY tool_calls_latency
+            WHERE tool = ? AND started_at >= ? ORDER BY duration_ms LIMIT 1 OFFSET ?
+            """,
+            (row["tool"], since, int(row["calls"] * 0.95)),
+        ).fetchone()
+        row["p95_ms"] = round(p95[0], 1) if p95 else None
+    return usage
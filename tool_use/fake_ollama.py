@@ -0,0 +1,94 @@
+"""Fake Ollama server answering chat requests after a set delay, to try the backend pool without GPUs.
+
+Serves ``/api/chat`` (streamed or not), ``/api/ps`` and ``/api/tags``. It runs
+``--parallel`` requests at once and queues the rest, the way Ollama does with
+OLLAMA_NUM_PARALLEL. The first request to a model also pays ``--load_ms``, after
+which the model stays loaded.
+
+    uv run ./fake_ollama.py --port 11501 --latency_ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+NS_PER_MS = 1_000_000
+
+
+def create_app(name: str, latency_ms: float, load_ms: float, parallel: int) -> FastAPI:
+    """Fake Ollama app called ``name`` in its answers."""
+    app = FastAPI()
+    slots = asyncio.Semaphore(parallel)
+    loaded: dict[str, float] = {}
+
+    async def answer(body: dict) -> dict:
+        model = body.get("model", "")
+        prompt = next((m.get("content", "") for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+        started = time.perf_counter()
+        async with slots:
+            queued_ms = (time.perf_counter() - started) * 1000
+            load = 0.0 if model in loaded else load_ms
+            await asyncio.sleep((load + latency_ms) / 1000)
+            loaded[model] = time.time()
+        content = f"{name} answered: {prompt}"
+        return {
+            "model": model,
+            "created_at": datetime.now(UTC).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((queued_ms + load + latency_ms) * NS_PER_MS),
+            "load_duration": int(load * NS_PER_MS),
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": int(latency_ms / 4 * NS_PER_MS),
+            "eval_count": len(content.split()),
+            "eval_duration": int(latency_ms * 3 / 4 * NS_PER_MS),
+        }
+
+    @app.post("/api/chat", response_model=None)
+    async def chat(request: Request) -> dict | StreamingResponse:
+        body = await request.json()
+        if not body.get("stream", True):
+            return await answer(body)
+
+        async def chunks() -> AsyncIterator[bytes]:
+            final = await answer(body)
+            message = final["message"]
+            yield json.dumps({"model": final["model"], "message": message, "done": False}).encode() + b"\n"
+            yield json.dumps({**final, "message": {"role": "assistant", "content": ""}}).encode() + b"\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/api/ps")
+    async def ps() -> dict:
+        return {"models": [{"name": model, "model": model} for model in loaded]}
+
+    @app.get("/api/tags")
+    async def tags() -> dict:
+        return {"models": [{"name": model, "model": model} for model in loaded]}
+
+    return app
+
+
+def main() -> None:
+    """Run one fake Ollama server."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11501)
+    parser.add_argument("--name", help="Name in the answers, defaults to fake-<port>")
+    parser.add_argument("--latency_ms", type=float, default=200.0)
+    parser.add_argument("--load_ms", type=float, default=1000.0)
+    parser.add_argument("--parallel", type=int, default=1)
+    args = parser.parse_args()
+    app = create_app(args.name or f"fake-{args.port}", args.latency_ms, args.load_ms, args.parallel)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
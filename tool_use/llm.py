@@ -1,13 +1,16 @@
 """LLM."""
 
 import sys
+import time
+import uuid
+from dataclasses import asdict
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama.chat_models import ChatOllama
 from loguru import logger
 from pydantic import BaseModel
 from tools import TOOLS
@@ -15,21 +18,39 @@ from tools import TOOLS
 parent_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(parent_dir))
 
+from conversation_store import ConversationStore  # noqa: E402
+from memory import ConversationMemory  # noqa: E402
+from memory_configs import MemoryConfigs  # noqa: E402
+from ollama_pool import OllamaPool, PooledChatOllama  # noqa: E402
+from ollama_pool_configs import OllamaPoolConfigs  # noqa: E402
+from store_configs import StoreConfigs  # noqa: E402
+from turn_recorder import TurnRecorder  # noqa: E402
+
+from serving.sockets import serve  # noqa: E402
 from unified_logging.config_types import LoggingConfigs  # noqa: E402
 from unified_logging.logging_client import setup_network_logger_client  # noqa: E402
 
-LOGGING_CONFIG_PATH = Path("..", "unified_logging/logging_config.toml")
+LOGGING_CONFIG_PATH = parent_dir / "unified_logging" / "logging_config.toml"
 if LOGGING_CONFIG_PATH.exists():
     logging_configs = LoggingConfigs.load_from_path(str(LOGGING_CONFIG_PATH))
     setup_network_logger_client(logging_configs, logger)
     logger.info("LLM service started with unified logging")
 
+HERE = Path(__file__).resolve().parent
+MEMORY = ConversationMemory(MemoryConfigs.load_from_path(HERE / "memory_config.toml"))
+# Every turn with its tool calls and model timings, written in the background, see query_history.py
+STORE_CONFIGS = StoreConfigs.load_from_path(HERE / "store_config.toml")
+STORE = ConversationStore(STORE_CONFIGS, HERE / STORE_CONFIGS.database_path) if STORE_CONFIGS.database_path else None
+# Model calls are spread over the Ollama servers of ollama_pool_config.toml
+POOL = OllamaPool(OllamaPoolConfigs.load_from_path(HERE / "ollama_pool_config.toml"))
+POOL.start()
+
 
 def init_agent() -> AgentExecutor | None:
     """Initialize and return the tool-calling agent executor."""
     try:
-        logger.info("Initializing ChatOllama model")
-        model = ChatOllama(model="qwen2.5:7b", temperature=0)
+        logger.info(f"Initializing {POOL.configs.model} on {len(POOL.backends)} Ollama backends")
+        model = PooledChatOllama(pool=POOL, model=POOL.configs.model, temperature=POOL.configs.temperature)
 
         logger.info("Defining tool-calling prompt")
         prompt = ChatPromptTemplate.from_messages(
@@ -44,6 +65,8 @@ def init_agent() -> AgentExecutor | None:
                     the function and get the answer. You can only call functions that are listed below.
                     You must include the image URL in your response.""",
                 ),
+                # Earlier turns of the session, trimmed to the token budget by ConversationMemory
+                ("placeholder", "{chat_history}"),
                 ("human", "{prompt}"),
                 ("placeholder", "{agent_scratchpad}"),
             ],
@@ -58,6 +81,8 @@ def init_agent() -> AgentExecutor | None:
             tools=TOOLS,
             verbose=True,
             handle_parsing_errors=True,
+            # The tool outputs are kept in the session, large ones by reference
+            return_intermediate_steps=True,
         )
 
     except (Exception, RuntimeError) as e:
@@ -85,6 +110,8 @@ class QueryRequest(BaseModel):
     """Request model for the query endpoint."""
 
     prompt: str
+    # Continues the conversation of an earlier answer, a new session is started without one
+    session_id: str | None = None
 
 
 @app.post("/ask")
@@ -93,23 +120,84 @@ def query_endpoint(request: QueryRequest) -> dict:
     if not executor:
         logger.error("Tool-calling agent not initialized.")
         return {"error": "Agent not available."}
-    try:
-        user_input = request.prompt
-        logger.info(f"Received API request with prompt: {user_input}")
-
-        # Invoke the tool-calling agent to process the user's input.
-        response = executor.invoke({"prompt": user_input})
-        raw_output = response.get("output", "")
-        logger.info(f"Agent response: {raw_output}")
-
-        # Return the result in JSON format.
-    except (Exception, RuntimeError) as e:
-        logger.error(f"Error during API query: {e!s}")
-        return {"error": str(e)}
-    return {"result": raw_output, "additional": []}
+    session = MEMORY.session(request.session_id or uuid.uuid4().hex)
+    user_input = request.prompt
+    recorder = TurnRecorder()
+    started_at, started = time.time(), time.perf_counter()
+    raw_output, error, stats = "", None, None
+    with session.lock:
+        try:
+            logger.info(f"Received API request with prompt: {user_input}")
+            history, stats = MEMORY.context(session, user_input)
+            logger.info("Session {} turn {} context: {}", session.session_id, stats.turn, asdict(stats))
+
+            # Invoke the tool-calling agent to process the user's input.
+            response = executor.invoke(
+                {"prompt": user_input, "chat_history": history},
+                config={"callbacks": [recorder]},
+            )
+            raw_output = response.get("output", "")
+            logger.info(f"Agent response: {raw_output}")
+            tool_calls = [(action.tool, output) for action, output in response.get("intermediate_steps", [])]
+            MEMORY.record(session, user_input, raw_output, tool_calls, stats)
+
+            # Return the result in JSON format.
+        except (Exception, RuntimeError) as e:
+            logger.error(f"Error during API query: {e!s}")
+            error = str(e)
+            return {"error": error, "session_id": session.session_id}
+        finally:
+            if STORE is not None:
+                STORE.submit(
+                    recorder.turn_record(
+                        session.session_id,
+                        user_input,
+                        raw_output,
+                        started_at,
+                        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                        error=error,
+                        context_tokens=stats.context_tokens if stats is not None else None,
+                    ),
+                )
+    return {"result": raw_output, "additional": [], "session_id": session.session_id, "context": asdict(stats)}
+
+
+@app.get("/sessions/{session_id}/outputs/{ref}")
+def tool_output(session_id: str, ref: str) -> dict:
+    """Return a tool output the conversation refers to instead of carrying it in the context."""
+    output = MEMORY.output(session_id, ref)
+    if output is None:
+        raise HTTPException(status_code=404, detail=f"No output {ref} in session {session_id}")
+    return asdict(output)
+
+
+@app.get("/sessions")
+def session_stats() -> dict:
+    """Return how many sessions are held, created, expired and evicted."""
+    return MEMORY.stats()
+
+
+@app.get("/backends")
+def backend_stats() -> dict:
+    """Return the health, load and latency of every Ollama backend."""
+    return POOL.stats()
+
+
+@app.on_event("shutdown")
+def close_store_and_pool() -> None:
+    """Write the queued turns, close the conversation store and stop the backend health checks."""
+    if STORE is not None:
+        STORE.close()
+    POOL.close()
+
+
+@app.get("/ready", response_model=None)
+def ready() -> dict | JSONResponse:
+    """Report whether the agent is initialized, with status 503 if it is not."""
+    if not executor:
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
 
 
 if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    serve(app, "llm_service", host="127.0.0.1")
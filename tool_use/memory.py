@@ -0,0 +1,230 @@
+"""Conversation memory of the /ask sessions.
+
+Sessions are kept in memory, the least recently used dropped beyond ``max_sessions``
+and any unused for ``session_ttl_s``. Every turn the agent gets the latest turns in
+full within ``context_token_budget``; turns that no longer fit are folded, once each,
+into a running summary of one short line per turn, so trimming costs the same however
+long the conversation gets and needs no extra model call. Tool outputs above
+``tool_output_max_tokens`` stay out of the context behind a reference that
+``/sessions/{session_id}/outputs/{ref}`` resolves.
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from memory_configs import MemoryConfigs
+
+# Roughly four characters per token for English text, close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def shorten(text: str, max_chars: int) -> str:
+    """``text`` on one line, cut to ``max_chars`` characters."""
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[: max_chars - 3] + "..."
+
+
+@dataclass
+class ToolOutput:
+    """Full output of a tool call that is referenced instead of being put in the context."""
+
+    ref: str
+    tool: str
+    text: str
+    tokens: int
+
+
+@dataclass
+class ContextStats:
+    """How the context of one turn was built."""
+
+    turn: int
+    history_turns: int  # earlier turns given in full
+    summarized_turns: int  # turns folded into the summary while building this context
+    summary_tokens: int
+    context_tokens: int  # summary, earlier turns and prompt
+    trim_ms: float
+
+
+@dataclass
+class Turn:
+    """A prompt, the tool calls it led to and the answer."""
+
+    prompt: str
+    answer: str
+    tools: list[str]
+    # One line per tool call, with the output or the reference to it
+    tool_notes: list[str]
+    tokens: int
+    stats: ContextStats | None = None
+
+    def messages(self) -> list[tuple[str, str]]:
+        """Return the turn as chat messages."""
+        answer = "\n".join([*self.tool_notes, self.answer])
+        return [("human", self.prompt), ("ai", answer)]
+
+    def summary_line(self, max_chars: int) -> str:
+        """Return the turn as one line of the summary."""
+        used = f" (tools: {', '.join(sorted(set(self.tools)))})" if self.tools else ""
+        half = max_chars // 2
+        return f"- asked: {shorten(self.prompt, half)}{used}; answered: {shorten(self.answer, half)}"
+
+
+@dataclass
+class Session:
+    """Turns of one conversation."""
+
+    session_id: str
+    last_used: float
+    turns: deque[Turn] = field(default_factory=deque)
+    # Tokens of the turns above, kept up to date so trimming does not sum them every turn
+    turn_tokens: int = 0
+    summary: deque[str] = field(default_factory=deque)
+    summary_tokens: int = 0
+    # Turns folded into the summary whose line was later dropped to fit summary_token_budget
+    omitted_turns: int = 0
+    turn_count: int = 0
+    outputs: OrderedDict[str, ToolOutput] = field(default_factory=OrderedDict)
+    # Held for a whole turn, so concurrent requests of one session do not interleave
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ConversationMemory:
+    """Sessions by id, see the module docstring."""
+
+    def __init__(self, configs: MemoryConfigs) -> None:
+        """Create an empty store."""
+        self.configs = configs
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def session(self, session_id: str) -> Session:
+        """Return the session ``session_id``, starting a new one if it does not exist or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id=session_id, last_used=now)
+                self._created += 1
+                while len(self._sessions) > self.configs.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self._evicted += 1
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def _drop_expired(self, now: float) -> None:
+        # Least recently used first, so the expired ones are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.configs.session_ttl_s:
+                return
+            self._sessions.popitem(last=False)
+            self._expired += 1
+
+    def context(self, session: Session, prompt: str) -> tuple[list[tuple[str, str]], ContextStats]:
+        """Chat messages of the earlier turns for ``prompt``, trimmed to the token budget."""
+        started = time.perf_counter()
+        prompt_tokens = estimate_tokens(prompt)
+        summarized = 0
+        while session.turns and (
+            session.summary_tokens + session.turn_tokens + prompt_tokens > self.configs.context_token_budget
+        ):
+            self._fold(session, session.turns.popleft())
+            summarized += 1
+
+        messages: list[tuple[str, str]] = []
+        if session.summary or session.omitted_turns:
+            messages.append(("system", self._summary_text(session)))
+        for turn in session.turns:
+            messages.extend(turn.messages())
+        stats = ContextStats(
+            turn=session.turn_count + 1,
+            history_turns=len(session.turns),
+            summarized_turns=summarized,
+            summary_tokens=session.summary_tokens,
+            context_tokens=session.summary_tokens + session.turn_tokens + prompt_tokens,
+            trim_ms=round((time.perf_counter() - started) * 1000, 3),
+        )
+        return messages, stats
+
+    def _fold(self, session: Session, turn: Turn) -> None:
+        session.turn_tokens -= turn.tokens
+        line = turn.summary_line(self.configs.summary_chars_per_turn)
+        session.summary.append(line)
+        session.summary_tokens += estimate_tokens(line)
+        while session.summary and session.summary_tokens > self.configs.summary_token_budget:
+            session.summary_tokens -= estimate_tokens(session.summary.popleft())
+            session.omitted_turns += 1
+
+    @staticmethod
+    def _summary_text(session: Session) -> str:
+        lines = ["Summary of the earlier conversation:"]
+        if session.omitted_turns:
+            lines.append(f"- ({session.omitted_turns} earlier turns omitted)")
+        lines.extend(session.summary)
+        return "\n".join(lines)
+
+    def record(
+        self,
+        session: Session,
+        prompt: str,
+        answer: str,
+        tool_calls: list[tuple[str, Any]],
+        stats: ContextStats | None = None,
+    ) -> Turn:
+        """Add a turn, with ``tool_calls`` as (tool name, output) pairs; large outputs are stored by reference."""
+        notes = []
+        for tool, output in tool_calls:
+            text = output if isinstance(output, str) else json.dumps(output, default=str)
+            tokens = estimate_tokens(text)
+            if tokens <= self.configs.tool_output_max_tokens:
+                notes.append(f"[tool {tool} returned: {text}]")
+                continue
+            ref = f"out{session.turn_count + 1}.{len(notes) + 1}"
+            session.outputs[ref] = ToolOutput(ref=ref, tool=tool, text=text, tokens=tokens)
+            while len(session.outputs) > self.configs.max_tool_outputs:
+                session.outputs.popitem(last=False)
+            notes.append(f"[tool {tool} returned {tokens} tokens, kept out of the context as {ref}]")
+
+        tools = [tool for tool, _ in tool_calls]
+        turn = Turn(prompt=prompt, answer=answer, tools=tools, tool_notes=notes, tokens=0, stats=stats)
+        turn.tokens = sum(estimate_tokens(content) for _, content in turn.messages())
+        session.turns.append(turn)
+        session.turn_tokens += turn.tokens
+        session.turn_count += 1
+        return turn
+
+    def output(self, session_id: str, ref: str) -> ToolOutput | None:
+        """Return a referenced tool output, None if the session or the output is gone."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        # record changes the outputs of the session under its lock, from other request threads
+        with session.lock:
+            return session.outputs.get(ref)
+
+    def stats(self) -> dict[str, int]:
+        """Session counters of the store."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "created": self._created,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
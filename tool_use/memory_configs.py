@@ -0,0 +1,34 @@
+"""Conversation memory configurations."""
+
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from unified_logging.config_types import load_toml
+
+
+class MemoryConfigs(BaseModel):
+    """Conversation memory configurations."""
+
+    model_config = ConfigDict(extra="forbid")
+    # Sessions unused for this long are dropped, and the least recently used beyond max_sessions
+    session_ttl_s: float = Field(default=1800.0, gt=0)
+    max_sessions: int = Field(default=256, ge=1)
+    # Approximate tokens of the summary, the earlier turns and the prompt the agent receives per turn
+    context_token_budget: int = Field(default=2000, ge=100)
+    # Part of the budget the summary of the turns that no longer fit may take, the oldest lines go first
+    summary_token_budget: int = Field(default=400, ge=0)
+    # Characters of the prompt and of the answer a turn keeps in the summary
+    summary_chars_per_turn: int = Field(default=160, ge=20)
+    # Tool outputs above this size are kept out of the context and replaced by a reference
+    tool_output_max_tokens: int = Field(default=150, ge=0)
+    # Referenced tool outputs kept per session, the oldest are dropped first
+    max_tool_outputs: int = Field(default=32, ge=0)
+
+    @staticmethod
+    def load_from_path(file_path: str | Path) -> "MemoryConfigs":
+        """Load conversation memory configurations from a TOML file."""
+        configs: MemoryConfigs = MemoryConfigs.model_validate(
+            load_toml(Path(file_path)),
+        )
+        return configs
@@ -0,0 +1,289 @@
+"""Pool of Ollama-compatible servers the agent's model calls are spread over.
+
+Every call leases the least loaded healthy backend, the load being its requests in
+flight over the requests it runs at once. With ``model_affinity`` a backend that
+already has the model loaded is preferred while it is at most
+``affinity_max_extra_in_flight`` requests busier, so warm models are reused instead of
+being loaded on another server. A background thread asks every backend for its
+loaded models (``/api/ps``) each ``health_interval_s``; backends failing health
+checks or connections ``eject_after_failures`` times in a row get no more requests
+until they pass ``readmit_after_successes`` checks. ``PooledChatOllama`` is the chat
+model the agent uses, sending each call to a leased backend and retrying another one
+when it cannot connect.
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_ollama.chat_models import ChatOllama
+from loguru import logger
+from ollama_pool_configs import BackendConfigs, OllamaPoolConfigs
+from pydantic import ConfigDict, PrivateAttr
+
+# Weight of the latest request in the moving average used to break load ties
+LATENCY_SMOOTHING = 0.2
+
+
+class NoBackendError(RuntimeError):
+    """No healthy backend serves the requested model."""
+
+
+@dataclass(eq=False)
+class Backend:
+    """One Ollama server with its load, health and latencies."""
+
+    url: str
+    parallel: int
+    models: list[str]
+    latencies: deque[float]
+    in_flight: int = 0
+    healthy: bool = True
+    # Health checks or connections failed, or health checks passed while ejected, in a row
+    failures: int = 0
+    successes: int = 0
+    loaded_models: set[str] = field(default_factory=set)
+    latency_ewma_ms: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    ejections: int = 0
+
+    def load(self) -> float:
+        """Return the requests in flight over the requests the server runs at once."""
+        return self.in_flight / self.parallel
+
+    def serves(self, model: str) -> bool:
+        """Return whether the backend may serve ``model``."""
+        return not self.models or model in self.models
+
+    def stats(self) -> dict:
+        """Health, load and latency percentiles of the backend."""
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float | None:
+            return round(latencies[int(fraction * (len(latencies) - 1))], 1) if latencies else None
+
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "load": round(self.load(), 2),
+            "loaded_models": sorted(self.loaded_models),
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(latencies[-1], 1) if latencies else None,
+        }
+
+
+class OllamaPool:
+    """Backends of the pool, handed out one request at a time through ``lease``."""
+
+    def __init__(self, configs: OllamaPoolConfigs) -> None:
+        """Create the pool with every backend healthy, call ``start`` to run the health checks."""
+        self.configs = configs
+        self.backends = [self._backend(backend) for backend in configs.backends]
+        self._lock = threading.Lock()
+        self._next = 0
+        self._closing = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._http = httpx.Client(timeout=configs.health_timeout_s)
+
+    def _backend(self, configs: BackendConfigs) -> Backend:
+        return Backend(
+            url=configs.url.rstrip("/"),
+            parallel=configs.parallel,
+            models=configs.models,
+            latencies=deque(maxlen=self.configs.latency_window),
+        )
+
+    def start(self) -> None:
+        """Check every backend once, then keep checking them in the background."""
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closing.wait(self.configs.health_interval_s):
+            self.check()
+
+    def check(self) -> None:
+        """Ask every backend for its loaded models, ejecting or readmitting it by the outcome."""
+        for backend in self.backends:
+            try:
+                response = self._http.get(f"{backend.url}/api/ps")
+                response.raise_for_status()
+                loaded = {model["name"] for model in response.json().get("models", [])}
+            except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+                with self._lock:
+                    self._failed(backend, f"health check failed: {e!s}")
+                continue
+            with self._lock:
+                backend.loaded_models = loaded
+                self._passed(backend)
+
+    def _failed(self, backend: Backend, reason: str) -> None:
+        backend.failures += 1
+        backend.successes = 0
+        if backend.healthy and backend.failures >= self.configs.eject_after_failures:
+            backend.healthy = False
+            backend.ejections += 1
+            backend.loaded_models = set()
+            logger.warning(f"Ejected Ollama backend {backend.url}: {reason}")
+
+    def _passed(self, backend: Backend) -> None:
+        backend.failures = 0
+        if backend.healthy:
+            return
+        backend.successes += 1
+        if backend.successes >= self.configs.readmit_after_successes:
+            backend.healthy = True
+            backend.successes = 0
+            logger.info(f"Readmitted Ollama backend {backend.url}")
+
+    def _pick(self, model: str, exclude: Sequence[Backend]) -> Backend:
+        candidates = [
+            backend for backend in self.backends if backend.healthy and backend.serves(model) and backend not in exclude
+        ]
+        if not candidates:
+            msg = f"No healthy Ollama backend serves {model}"
+            raise NoBackendError(msg)
+        # Rotate the starting point so equally loaded, equally fast backends take turns
+        self._next = (self._next + 1) % len(candidates)
+        candidates = candidates[self._next :] + candidates[: self._next]
+
+        def key(backend: Backend) -> tuple[float, float]:
+            return backend.load(), backend.latency_ewma_ms
+
+        least = min(candidates, key=key)
+        if self.configs.model_affinity:
+            warm = [backend for backend in candidates if model in backend.loaded_models]
+            if warm:
+                best_warm = min(warm, key=key)
+                if best_warm.in_flight - least.in_flight <= self.configs.affinity_max_extra_in_flight:
+                    return best_warm
+        return least
+
+    @contextmanager
+    def lease(self, model: str, exclude: Sequence[Backend] = ()) -> Iterator[Backend]:
+        """Count a request to ``model`` on the chosen backend until the ``with`` block exits.
+
+        Connection failures inside the block count toward ejecting the backend, other
+        errors only as errors of the request.
+
+        Raises:
+            NoBackendError: No healthy backend outside ``exclude`` serves the model.
+
+        """
+        with self._lock:
+            backend = self._pick(model, exclude)
+            backend.in_flight += 1
+            backend.requests += 1
+        started = time.perf_counter()
+        try:
+            yield backend
+        except (ConnectionError, httpx.TransportError) as e:
+            with self._lock:
+                backend.errors += 1
+                self._failed(backend, f"request failed: {e!s}")
+            raise
+        except Exception:
+            with self._lock:
+                backend.errors += 1
+            raise
+        else:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                backend.latencies.append(elapsed_ms)
+                backend.latency_ewma_ms += LATENCY_SMOOTHING * (elapsed_ms - backend.latency_ewma_ms)
+                # Serving the request loaded the model, until the next health check says otherwise
+                backend.loaded_models.add(model)
+                backend.failures = 0
+        finally:
+            with self._lock:
+                backend.in_flight -= 1
+
+    def close(self) -> None:
+        """Stop the health checks."""
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._http.close()
+
+    def stats(self) -> dict:
+        """Health, load and latency of every backend."""
+        with self._lock:
+            return {"model": self.configs.model, "backends": [backend.stats() for backend in self.backends]}
+
+
+class PooledChatOllama(BaseChatModel):
+    """Chat model sending every call to a backend leased from an ``OllamaPool``.
+
+    Each backend gets a ``ChatOllama`` of its own, so the responses carry the same
+    metadata, Ollama's timings included, as with a single server.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    pool: OllamaPool
+    model: str
+    temperature: float = 0.0
+    _clients: dict[str, ChatOllama] = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled-chat-ollama"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model": self.model, "backends": [backend.url for backend in self.pool.backends]}
+
+    def _client(self, backend: Backend) -> ChatOllama:
+        client = self._clients.get(backend.url)
+        if client is None:
+            client = ChatOllama(model=self.model, temperature=self.temperature, base_url=backend.url)
+            self._clients[backend.url] = client
+        return client
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> ChatResult:
+        tried: list[Backend] = []
+        while True:
+            try:
+                with self.pool.lease(self.model, exclude=tried) as backend:
+                    result = self._client(backend)._generate(messages, stop, run_manager, **kwargs)  # noqa: SLF001
+            except (ConnectionError, httpx.TransportError) as e:
+                tried.append(backend)
+                if len(tried) >= self.pool.configs.request_attempts:
+                    raise
+                logger.warning(f"Retrying on another Ollama backend after {backend.url} failed: {e!s}")
+                continue
+            for generation in result.generations:
+                generation.message.response_metadata["backend"] = backend.url
+            return result
+
+    def bind_tools(
+        self,
+        tools: Sequence[dict[str, Any] | type | BaseTool],
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        """Bind tools the way ``ChatOllama`` does, passing them to the backend's chat call."""
+        return super().bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
@@ -0,0 +1,52 @@
+"""Ollama backend pool configurations."""
+
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from unified_logging.config_types import load_toml
+
+
+class BackendConfigs(BaseModel):
+    """One Ollama-compatible server."""
+
+    model_config = ConfigDict(extra="forbid")
+    url: str
+    # Requests the server runs at once (OLLAMA_NUM_PARALLEL), the load of a backend is its requests over this
+    parallel: int = Field(default=1, ge=1)
+    # Models the server is allowed to serve, any model if empty
+    models: list[str] = []
+
+
+class OllamaPoolConfigs(BaseModel):
+    """Ollama backend pool configurations."""
+
+    model_config = ConfigDict(extra="forbid")
+    model: str = "qwen2.5:7b"
+    temperature: float = 0.0
+    backends: list[BackendConfigs] = Field(
+        default_factory=lambda: [BackendConfigs(url="http://127.0.0.1:11434")],
+        min_length=1,
+    )
+    # Every backend is asked for its loaded models this often, ejected ones included
+    health_interval_s: float = Field(default=5.0, gt=0)
+    health_timeout_s: float = Field(default=2.0, gt=0)
+    # Failed health checks or connection failures in a row before a backend gets no more requests
+    eject_after_failures: int = Field(default=2, ge=1)
+    # Passed health checks in a row before an ejected backend gets requests again
+    readmit_after_successes: int = Field(default=1, ge=1)
+    # Backends a request tries when it cannot connect, each at most once
+    request_attempts: int = Field(default=2, ge=1)
+    # Prefer a backend that has the model loaded, unless it runs this many more requests than the least loaded one
+    model_affinity: bool = True
+    affinity_max_extra_in_flight: int = Field(default=1, ge=0)
+    # Latest request latencies kept per backend for its percentiles
+    latency_window: int = Field(default=256, ge=1)
+
+    @staticmethod
+    def load_from_path(file_path: str | Path) -> "OllamaPoolConfigs":
+        """Load Ollama backend pool configurations from a TOML file."""
+        configs: OllamaPoolConfigs = OllamaPoolConfigs.model_validate(
+            load_toml(Path(file_path)),
+        )
+        return configs
@@ -0,0 +1,120 @@
+"""Compare one Ollama backend with a pool of them, using fake_ollama.py servers.
+
+Starts ``--backends`` fake servers, then sends ``--requests`` chat calls through
+``PooledChatOllama``, ``--concurrency`` at a time, first to a pool of one backend and
+then to a pool of all of them. With ``--kill_one`` the first server is killed halfway
+through the second run, to see the pool eject it and retry on the others. Prints one
+JSON line per run with throughput, latency percentiles, failed calls and the stats of
+every backend.
+
+    uv run ./pool_benchmark.py --backends 3 --requests 60 --concurrency 6 --kill_one
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+
+from ollama_pool import OllamaPool, PooledChatOllama  # noqa: E402
+from ollama_pool_configs import BackendConfigs, OllamaPoolConfigs  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+MODEL = "qwen2.5:7b"
+
+
+def start_backends(count: int, base_port: int, latency_ms: float, load_ms: float) -> list[subprocess.Popen]:
+    """Start ``count`` fake Ollama servers and wait until they answer."""
+    processes = [
+        subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                str(HERE / "fake_ollama.py"),
+                f"--port={base_port + index}",
+                f"--latency_ms={latency_ms}",
+                f"--load_ms={load_ms}",
+            ],
+        )
+        for index in range(count)
+    ]
+    deadline = time.monotonic() + 30
+    for index in range(count):
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{base_port + index}/api/ps", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+    return processes
+
+
+def run(configs: OllamaPoolConfigs, requests: int, concurrency: int, kill: subprocess.Popen | None) -> dict:
+    """Send ``requests`` chat calls through a pool of ``configs`` and return the results."""
+    pool = OllamaPool(configs)
+    pool.start()
+    chat = PooledChatOllama(pool=pool, model=configs.model)
+
+    def call(index: int) -> float | None:
+        if kill is not None and index == requests // 2:
+            kill.kill()
+        started = time.perf_counter()
+        try:
+            chat.invoke(f"question {index}")
+        except Exception:  # noqa: BLE001
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(call, range(requests)))
+    elapsed = time.perf_counter() - started
+    stats = pool.stats()
+    pool.close()
+
+    done = sorted(latency for latency in latencies if latency is not None)
+    return {
+        "backends": len(configs.backends),
+        "requests_per_s": round(len(done) / elapsed, 2),
+        "p50_ms": round(done[len(done) // 2], 1) if done else None,
+        "p95_ms": round(done[int((len(done) - 1) * 0.95)], 1) if done else None,
+        "failed": latencies.count(None),
+        "per_backend": stats["backends"],
+    }
+
+
+def main() -> None:
+    """Run one backend, then all of them, and print the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--latency_ms", type=float, default=200.0)
+    parser.add_argument("--load_ms", type=float, default=500.0)
+    parser.add_argument("--base_port", type=int, default=11501)
+    parser.add_argument("--kill_one", action="store_true", help="Kill the first server halfway through the pool run")
+    args = parser.parse_args()
+
+    processes = start_backends(args.backends, args.base_port, args.latency_ms, args.load_ms)
+    backends = [BackendConfigs(url=f"http://127.0.0.1:{args.base_port + i}") for i in range(args.backends)]
+    try:
+        for run_backends in [backends[:1], backends]:
+            configs = OllamaPoolConfigs(model=MODEL, backends=run_backends, health_interval_s=0.5)
+            kill = processes[0] if args.kill_one and len(run_backends) > 1 else None
+            print(json.dumps(run(configs, args.requests, args.concurrency, kill)))  # noqa: T201
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Search and report on the turns and tool calls in the conversation store.
+
+    uv run ./query_history.py search "screenshot OR camera"
+    uv run ./query_history.py search --tools "timeout"
+    uv run ./query_history.py slow --since 1d --limit 10
+    uv run ./query_history.py tools --since 7d
+
+``search`` takes FTS5 query syntax: words, "quoted phrases", prefix*, AND, OR and NOT.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+
+from conversation_store import connect, search, slow_turns, tool_usage  # noqa: E402
+from store_configs import StoreConfigs  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+RELATIVE_TIME = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> float:
+    """Unix time of an ISO date and time, or of a time relative to now such as ``15m``, ``2h`` or ``7d``."""
+    if match := RELATIVE_TIME.match(value.strip()):
+        return time.time() - float(match[1]) * SECONDS[match[2]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main() -> None:
+    """Run the report named on the command line and print one JSON line per row."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_file_path", default=str(HERE / "store_config.toml"))
+    parser.add_argument("--database", help="Database to query, defaults to database_path of the config")
+    reports = parser.add_subparsers(dest="report", required=True)
+    search_parser = reports.add_parser("search", help="Best matches among prompts and answers")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--tools", action="store_true", help="Search tool arguments and results instead")
+    search_parser.add_argument("--limit", type=int, default=20)
+    slow_parser = reports.add_parser("slow", help="Slowest turns")
+    slow_parser.add_argument("--since", type=parse_time, default=0.0, help="ISO time or age such as 30m, 2h, 1d")
+    slow_parser.add_argument("--limit", type=int, default=20)
+    tools_parser = reports.add_parser("tools", help="Calls, failures and latency per tool")
+    tools_parser.add_argument("--since", type=parse_time, default=0.0, help="ISO time or age such as 30m, 2h, 1d")
+    args = parser.parse_args()
+
+    configs = StoreConfigs.load_from_path(args.config_file_path)
+    database = Path(args.database) if args.database else HERE / configs.database_path
+    if not database.exists():
+        parser.error(f"no conversation store at {database}")
+    connection = connect(database, read_only=True)
+
+    started = time.perf_counter()
+    try:
+        if args.report == "search":
+            rows = search(connection, args.query, args.limit, tools=args.tools)
+        elif args.report == "slow":
+            rows = slow_turns(connection, args.since, args.limit)
+        else:
+            rows = tool_usage(connection, args.since)
+    except sqlite3.OperationalError as e:
+        parser.error(f"query failed: {e!s}")
+    for row in rows:
+        sys.stdout.write(json.dumps(row) + "\n")
+    sys.stderr.write(f"{len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Run the LLM, browser and hardware services in one process, on one event loop.
+
+The browser and hardware apps are mounted into the LLM app, so their routes stay
+reachable over HTTP under ``/browser_service`` and ``/hardware_service`` (for the UI
+and for image links), and the tools call their route handlers directly through an
+``InProcessTransport`` instead of sending HTTP requests over localhost.
+
+Start it from this directory instead of the three separate services:
+
+    uv run ./single_process.py --port 8000
+"""
+
+import argparse
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI
+from transport import InProcessTransport, MountedApp, load_service_module
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+# Service name in config.yaml: directory, module, the module's app attribute and the mount path
+SERVICES = {
+    "browser_service": ("browser_control", "browser", "APP", "/browser_service"),
+    "hardware_service": ("HardwareApplication", "hardware", "app", "/hardware_service"),
+}
+
+
+def load_apps(services: list[str]) -> dict[str, MountedApp]:
+    """Import the apps of ``services``, see ``SERVICES``."""
+    apps = {}
+    for service in services:
+        directory, module, attribute, prefix = SERVICES[service]
+        apps[service] = MountedApp(getattr(load_service_module(REPO_DIR / directory, module), attribute), prefix)
+    return apps
+
+
+@asynccontextmanager
+async def run_apps(apps: dict[str, MountedApp], transport: InProcessTransport) -> AsyncIterator[None]:
+    """Run the startup and shutdown of every app, a mounted app's own lifespan is not run by its parent."""
+    transport.bind(asyncio.get_running_loop())
+    async with AsyncExitStack() as stack:
+        for mounted in apps.values():
+            await stack.enter_async_context(mounted.app.router.lifespan_context(mounted.app))
+        yield
+
+
+def build_app(host: str, port: int, services: list[str]) -> FastAPI:
+    """Return the LLM app with the apps of ``services`` mounted and the tools switched to in-process calls."""
+    # The LLM app and the tools are imported first, the services then set aside their module names
+    import llm  # noqa: PLC0415
+    import tools  # noqa: PLC0415
+
+    apps = load_apps(services)
+    transport = InProcessTransport(apps, f"http://{host}:{port}")
+    tools.use_transport(transport)
+    for mounted in apps.values():
+        llm.app.mount(mounted.prefix, mounted.app)
+
+    # The LLM app's own startup and shutdown run around the mounted apps'
+    llm_lifespan = llm.app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        async with llm_lifespan(app), run_apps(apps, transport):
+            yield
+
+    llm.app.router.lifespan_context = lifespan
+    return llm.app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--services", nargs="+", default=list(SERVICES), choices=list(SERVICES))
+    args = parser.parse_args()
+
+    uvicorn.run(build_app(args.host, args.port, args.services), host=args.host, port=args.port)
@@ -0,0 +1,116 @@
+"""Measure the conversation store: request-path cost, write throughput and report latency.
+
+Submits ``--turns`` synthetic turns, each with a few tool calls, to a fresh database,
+then runs every report of query_history.py against it. Prints one JSON line for the
+writes and one per report.
+
+    uv run ./store_benchmark.py --turns 1000000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+parent_dir = Path(__file__).resolve().parent.parent
+sys.path.append(str(parent_dir))
+
+from conversation_store import ConversationStore, ToolCallRecord, TurnRecord, connect, search, slow_turns, tool_usage  # noqa: E402
+from store_configs import StoreConfigs  # noqa: E402
+
+TOOLS = ["show_ram", "show_cpu", "show_disk", "search", "read_page", "screenshot", "open_camera", "add"]
+WORDS = [
+    "cpu", "memory", "disk", "weather", "paris", "python", "camera",
+    "screenshot", "price", "news", "score", "process", "battery",
+]  # fmt: skip
+FAILURE_RATE = 0.02
+
+
+def synthetic_turn(rng: random.Random, index: int, started_at: float) -> TurnRecord:
+    """Build a turn with one to three tool calls and a skewed duration."""
+    calls = [
+        ToolCallRecord(
+            tool=tool,
+            arguments=json.dumps({"query": " ".join(rng.choices(WORDS, k=3))}),
+            result=json.dumps({"result": " ".join(rng.choices(WORDS, k=30))}),
+            started_at=started_at,
+            duration_ms=rng.lognormvariate(3, 1),
+            failed=rng.random() < FAILURE_RATE,
+        )
+        for tool in rng.choices(TOOLS, k=rng.randint(1, 3))
+    ]
+    return TurnRecord(
+        session_id=f"session-{index % 5000}",
+        started_at=started_at,
+        prompt=" ".join(rng.choices(WORDS, k=8)),
+        answer=" ".join(rng.choices(WORDS, k=60)),
+        duration_ms=rng.lognormvariate(7, 0.6),
+        llm_calls=len(calls) + 1,
+        llm_ms=rng.lognormvariate(6.5, 0.5),
+        prompt_tokens=rng.randint(200, 2000),
+        completion_tokens=rng.randint(20, 300),
+        tool_calls=calls,
+    )
+
+
+def main() -> None:
+    """Fill a temporary store and time the writes and the reports."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200_000)
+    parser.add_argument("--batch_size", type=int, default=256)
+    args = parser.parse_args()
+    rng = random.Random(7)  # noqa: S311
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = Path(scratch, "conversations.db")
+        # Large enough that nothing is dropped, so the write rate is the writer's own
+        configs = StoreConfigs(batch_size=args.batch_size, queue_capacity=args.turns)
+        store = ConversationStore(configs, path)
+        now = time.time()
+        records = [synthetic_turn(rng, index, now - (args.turns - index)) for index in range(args.turns)]
+
+        submit_us = []
+        started = time.perf_counter()
+        for record in records:
+            submit_started = time.perf_counter()
+            store.submit(record)
+            submit_us.append((time.perf_counter() - submit_started) * 1e6)
+        store.flush(timeout=3600)
+        elapsed = time.perf_counter() - started
+        store.close()
+        print(  # noqa: T201
+            json.dumps(
+                {
+                    "turns": args.turns,
+                    "turns_per_s": round(args.turns / elapsed),
+                    "submit_p50_us": round(statistics.median(submit_us), 2),
+                    "submit_p99_us": round(sorted(submit_us)[int(len(submit_us) * 0.99)], 2),
+                    "database_mb": round(sum(p.stat().st_size for p in Path(scratch).iterdir()) / 1e6, 1),
+                    **store.stats(),
+                },
+            ),
+        )
+
+        connection = connect(path, read_only=True)
+        reports = {
+            "search": lambda: search(connection, "paris AND weather", 20),
+            "search_tools": lambda: search(connection, '"camera price"', 20, tools=True),
+            "slow_last_hour": lambda: slow_turns(connection, now - 3600, 20),
+            "slow_all": lambda: slow_turns(connection, 0.0, 20),
+            "tools_last_hour": lambda: tool_usage(connection, now - 3600),
+            "tools_all": lambda: tool_usage(connection, 0.0),
+        }
+        for name, report in reports.items():
+            started = time.perf_counter()
+            rows = report()
+            print(  # noqa: T201
+                json.dumps({"report": name, "rows": len(rows), "ms": round((time.perf_counter() - started) * 1000, 1)}),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Conversation store configurations."""
+
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from unified_logging.config_types import load_toml
+
+
+class StoreConfigs(BaseModel):
+    """Conversation store configurations."""
+
+    model_config = ConfigDict(extra="forbid")
+    # SQLite database of the turns and tool calls, relative to tool_use; empty disables the store
+    database_path: str = "data/conversations.db"
+    # Turns written per transaction, and how long the writer waits for a batch to fill
+    batch_size: int = Field(default=256, ge=1)
+    flush_interval_ms: int = Field(default=500, ge=1)
+    # Turns waiting to be written, the oldest are dropped beyond this
+    queue_capacity: int = Field(default=10000, ge=1)
+    # Answers, tool arguments and tool results are cut to this many characters
+    max_text_chars: int = Field(default=20000, ge=100)
+
+    @staticmethod
+    def load_from_path(file_path: str | Path) -> "StoreConfigs":
+        """Load conversation store configurations from a TOML file."""
+        configs: StoreConfigs = StoreConfigs.model_validate(
+            load_toml(Path(file_path)),
+        )
+        return configs
@@ -4,35 +4,40 @@ import sys
 from pathlib import Path
 
 import httpx
-import yaml
 from langchain_core.tools import tool
 from loguru import logger
 from models import Numbers
+from transport import HttpTransport, Transport
 
 parent_dir = Path(__file__).resolve().parent.parent
 sys.path.append(str(parent_dir))
 
+from serving.sockets import base_url, load_network_config, socket_path  # noqa: E402
 from unified_logging.config_types import LoggingConfigs  # noqa: E402
 from unified_logging.logging_client import setup_network_logger_client  # noqa: E402
 
-LOGGING_CONFIG_PATH = Path("..", "unified_logging/logging_config.toml")
+LOGGING_CONFIG_PATH = parent_dir / "unified_logging" / "logging_config.toml"
 if LOGGING_CONFIG_PATH.exists():
     logging_configs = LoggingConfigs.load_from_path(str(LOGGING_CONFIG_PATH))
     setup_network_logger_client(logging_configs, logger)
     logger.info("Tools service started with unified logging")
 
 
-config_path = Path("../config.yaml")
-with config_path.open() as file:
-    content = file.read()
-    NETWORK_CONFIG = yaml.safe_load(content)
+NETWORK_CONFIG = load_network_config()
+SERVICE_URLS = {service: base_url(NETWORK_CONFIG[service]) for service in ("browser_service", "hardware_service")}
+# Services with a Unix domain socket in config.yaml are reached over it, see serving.sockets
+SERVICE_SOCKETS = {
+    service: path for service in SERVICE_URLS if (path := socket_path(NETWORK_CONFIG[service])) is not None
+}
 
-BROWSER_URL = (
-    "http://" + NETWORK_CONFIG["browser_service"]["host"] + ":" + str(NETWORK_CONFIG["browser_service"]["port"])
-)
-HARDWARE_URL = (
-    "http://" + NETWORK_CONFIG["hardware_service"]["host"] + ":" + str(NETWORK_CONFIG["hardware_service"]["port"])
-)
+# Services run as their own processes unless single_process.py swaps in an InProcessTransport
+TRANSPORT: Transport = HttpTransport(SERVICE_URLS, SERVICE_SOCKETS)
+
+
+def use_transport(transport: Transport) -> None:
+    """Send every tool request through ``transport`` from now on."""
+    global TRANSPORT  # noqa: PLW0603
+    TRANSPORT = transport
 
 
 @tool
@@ -51,24 +56,25 @@ def open_new_window() -> None:
 
     """
     logger.info("Executing open_new_window tool")
-    response = httpx.get(url=BROWSER_URL + "/browser/open_new_window")
+    response = TRANSPORT.get("browser_service", "/browser/open_new_window")
     result = response.json()
-    logger.info(f"open_new_window response: {result}")
+    logger.debug("open_new_window response: {}", result)
     return result
 
 
 @tool
-def search(query: str) -> dict:
+def search(query: str, max_results: int = 3) -> dict:
     """Tool will Search the internet using a browser with the provided query.
 
     This tool performs a web search in a browser window.
     Use this tool when you don't know about the topic.
-    The search results will include titles and URLs of top matches.
+    The search results will include titles, URLs and snippets of top matches.
 
     Args:
     ----
         query: A JSON object containing a 'query' field with the search term
               Example: query = {"query": "weather forecast"}
+        max_results: How many results to return, between 1 and 20 (default 3)
 
     Examples:
     --------
@@ -77,18 +83,57 @@ def search(query: str) -> dict:
 
     Returns:
     -------
-        JSON object with search results including titles and URLs
+        JSON object with search results including titles, URLs and snippets
 
     """
-    logger.info(f"Executing search tool with query: {query}")
+    logger.info("Executing search tool with query: {}", query)
     try:
-        response = httpx.post(
-            url=BROWSER_URL + "/browser/search",
-            json={"query": query},
+        response = TRANSPORT.post(
+            "browser_service",
+            "/browser/search",
+            json={"query": query, "max_results": max_results},
             timeout=10.0,  # Set explicit timeout
         )
-        logger.info(f"search response: {response.json()}")
-        return response.json()
+        result = response.json()
+    except httpx.ReadTimeout:
+        logger.error("Browser service not responding. Is it running?")
+        return {"error": "Browser service not responding. Is it running?"}
+    except httpx.ConnectError:
+        logger.error("Could not connect to browser service. Make sure it's running.")
+        return {"error": "Could not connect to browser service. Make sure it's running."}
+
+    logger.debug("search response: {}", result)
+    return result
+
+
+@tool
+def search_batch(queries: list[str], max_results: int = 3) -> dict:
+    """Tool searches the internet for several queries at once.
+
+    Use this tool instead of calling search repeatedly when you need to look up
+    more than one thing, for example to compare topics or research several
+    aspects of a question. All queries run in parallel, which is much faster
+    than searching one after another.
+
+    Args:
+        queries: The search terms, between 1 and 20
+                 Example: ["weather in Paris", "weather in London"]
+        max_results: How many results to return per query, between 1 and 20 (default 3)
+
+    Returns:
+        JSON object with one entry per query, in the same order, each with titles,
+        URLs and snippets of the top matches
+
+    """
+    logger.info("Executing search_batch tool with queries: {}", queries)
+    try:
+        response = TRANSPORT.post(
+            "browser_service",
+            "/browser/search_batch",
+            json={"queries": queries, "max_results": max_results},
+            timeout=60.0,
+        )
+        result = response.json()
     except httpx.ReadTimeout:
         logger.error("Browser service not responding. Is it running?")
         return {"error": "Browser service not responding. Is it running?"}
@@ -96,6 +141,58 @@ def search(query: str) -> dict:
         logger.error("Could not connect to browser service. Make sure it's running.")
         return {"error": "Could not connect to browser service. Make sure it's running."}
 
+    logger.debug("search_batch response: {}", result)
+    return result
+
+
+@tool
+def read_page(url: str, question: str = "", token_budget: int = 1500) -> dict:
+    """Tool reads the main text of a web page.
+
+    Use this tool after search when the titles and snippets are not enough to
+    answer, to read what a result page actually says. Navigation, ads, scripts
+    and other boilerplate are removed. When the page is long, only the parts
+    most relevant to the question are returned.
+
+    Args:
+        url: The http or https address of the page, for example a URL from search results
+        question: What you want to find out on the page, used to pick the relevant parts
+        token_budget: Roughly how many tokens of text to return, between 50 and 20000 (default 1500)
+
+    Example usage:
+    read_page(url="https://en.wikipedia.org/wiki/Paris", question="population of Paris")
+
+    Returns:
+        JSON object with the page title, the selected text and whether the text was truncated
+
+    """
+    logger.info("Executing read_page tool for: {}", url)
+    try:
+        response = TRANSPORT.post(
+            "browser_service",
+            "/browser/read",
+            json={"url": url, "question": question or None, "token_budget": token_budget},
+            timeout=60.0,
+        )
+        result = response.json()
+    except httpx.ReadTimeout:
+        logger.error("Browser service not responding. Is it running?")
+        return {"error": "Browser service not responding. Is it running?"}
+    except httpx.ConnectError:
+        logger.error("Could not connect to browser service. Make sure it's running.")
+        return {"error": "Could not connect to browser service. Make sure it's running."}
+
+    logger.debug("read_page response: {}", result)
+    if "text" not in result:
+        return result
+    # Chunk indices and timings are of no use to the model
+    return {
+        "url": result["url"],
+        "title": result["title"],
+        "text": result["text"],
+        "truncated": result["truncated"],
+    }
+
 
 @tool
 def close_browser() -> dict:
@@ -113,9 +210,9 @@ def close_browser() -> dict:
 
     """
     logger.info("Executing close_browser tool")
-    response = httpx.get(url=BROWSER_URL + "/browser/close_browser")
+    response = TRANSPORT.get("browser_service", "/browser/close_browser")
     result = response.json()
-    logger.info(f"close_browser response: {result}")
+    logger.debug("close_browser response: {}", result)
     return result
 
 
@@ -125,7 +222,8 @@ def screenshot() -> dict:
 
     This tool captures everything currently visible on the computer screen
     and returns image data that can be displayed or saved.
-    No parameters are needed.
+    No parameters are needed. If the screen has not changed since the previous
+    screenshot, the previous image is returned with "unchanged" set to true.
 
     Example usage:
     screenshot() - Takes a screenshot of the current screen
@@ -136,8 +234,9 @@ def screenshot() -> dict:
     """
     logger.info("Executing screenshot tool")
     try:
-        response = httpx.get(HARDWARE_URL + "/screenshot", timeout=10.0)
-        logger.info(f"screenshot response: {response.json()}")
+        response = TRANSPORT.get("hardware_service", "/screenshot", timeout=10.0)
+        # Only parsed here when debug records are sent, the error paths below may not be JSON
+        logger.opt(lazy=True).debug("screenshot response: {}", response.json)
 
         # Check if the response was successful
         correct_code = 200
@@ -152,9 +251,10 @@ def screenshot() -> dict:
                 # Fix the URL construction
                 return {
                     "success": True,
-                    "message": "Screenshot captured successfully",
+                    "message": result.get("message", "Screenshot captured successfully"),
+                    "unchanged": result.get("unchanged", False),
                     "image_path": result["image_path"],
-                    "image_url": f"{HARDWARE_URL}/images/{filename}",
+                    "image_url": f"{TRANSPORT.public_url('hardware_service')}/images/{filename}",
                 }
             if "image_data" in result:
                 # Make sure image_data is already base64-encoded from the server
@@ -177,7 +277,7 @@ def screenshot() -> dict:
                 "details": response.text,
             }
     except Exception as e:  # noqa: BLE001
-        logger.error(f"Unknown error in screenshot tool: {e!s}")
+        logger.error("Unknown error in screenshot tool: {!s}", e)
         return {"success": False, "error": f"Unknown error: {e!s}"}
 
 
@@ -186,7 +286,9 @@ def open_camera() -> dict:
     """Tool opens the camera and takes a photo.
 
     This tool activates the computer's camera, captures a single photo,
-    and returns the image data. No parameters are needed.
+    and returns the image data. No parameters are needed. If the view has not
+    changed since the previous photo, the previous image is returned with
+    "unchanged" set to true.
 
     Example usage:
     open_camera() - Takes a photo with the camera
@@ -198,8 +300,9 @@ def open_camera() -> dict:
     logger.info("Executing open_camera tool")
     ok = 200
     try:
-        response = httpx.get(HARDWARE_URL + "/capture", timeout=15.0)
-        logger.info(f"open_camera response: {response.json()}")
+        response = TRANSPORT.get("hardware_service", "/capture", timeout=15.0)
+        # Only parsed here when debug records are sent, the error paths below may not be JSON
+        logger.opt(lazy=True).debug("open_camera response: {}", response.json)
 
         # Check if the response was successful
         if response.status_code == ok:
@@ -213,9 +316,10 @@ def open_camera() -> dict:
                 # Fix the URL construction
                 return {
                     "success": True,
-                    "message": "Camera photo captured successfully",
+                    "message": result.get("message", "Camera photo captured successfully"),
+                    "unchanged": result.get("unchanged", False),
                     "image_path": result["image_path"],
-                    "image_url": f"{HARDWARE_URL}/images/{filename}",
+                    "image_url": f"{TRANSPORT.public_url('hardware_service')}/images/{filename}",
                 }
             if "image_data" in result:
                 # Make sure image_data is already base64-encoded from the server
@@ -232,7 +336,7 @@ def open_camera() -> dict:
             }
 
     except (httpx.ReadTimeout, httpx.ConnectError) as e:
-        logger.error(f"Unknown error in open_camera: {e!s}")
+        logger.error("Unknown error in open_camera: {!s}", e)
         return {"success": False, "error": f"Unknown error: {e!s}"}
 
     return {
@@ -258,9 +362,9 @@ def show_ram() -> dict:
 
     """
     logger.info("Executing show_ram tool")
-    response = httpx.get(HARDWARE_URL + "/ram")
+    response = TRANSPORT.get("hardware_service", "/ram")
     result = response.json()
-    logger.info(f"show_ram response: {result}")
+    logger.debug("show_ram response: {}", result)
     return result
 
 
@@ -280,9 +384,9 @@ def show_disk() -> dict:
 
     """
     logger.info("Executing show_disk tool")
-    response = httpx.get(HARDWARE_URL + "/disk")
+    response = TRANSPORT.get("hardware_service", "/disk")
     result = response.json()
-    logger.info(f"show_disk response: {result}")
+    logger.debug("show_disk response: {}", result)
     return result
 
 
@@ -302,12 +406,71 @@ def show_cpu() -> dict:
 
     """
     logger.info("Executing show_cpu tool")
-    response1 = httpx.get(HARDWARE_URL + "/cpuinfo")
+    response1 = TRANSPORT.get("hardware_service", "/cpuinfo")
     result1 = response1.json()
-    logger.info(f"show_cpu response: {result1}")
+    logger.debug("show_cpu response: {}", result1)
     return {"hardware description": result1}
 
 
+@tool
+def show_metrics_history(window_minutes: float = 10, resolution_seconds: float = 60) -> dict:
+    """Tool shows how CPU, RAM and disk usage changed over a recent time window.
+
+    Use this tool for questions about the past, like "what was my CPU usage over
+    the last 10 minutes?". The window is split into buckets of resolution_seconds,
+    and every bucket reports the min, mean, max and 95th percentile (p95) of
+    cpu_percent, cpu_user_percent, cpu_system_percent, ram_percent,
+    ram_used_bytes and disk_used_bytes. History covers at most the last 6 hours.
+
+    Args:
+        window_minutes: How many minutes back to look, for example 10
+        resolution_seconds: Width of each bucket in seconds, for example 60
+
+    Example usage:
+    show_metrics_history(window_minutes=30, resolution_seconds=300) - 5-minute summaries of the last half hour
+
+    Returns:
+        JSON object with bucket start times (unix seconds), sample counts and per-metric aggregates
+
+    """
+    logger.info("Executing show_metrics_history tool: window={}min resolution={}s", window_minutes, resolution_seconds)
+    response = TRANSPORT.get(
+        "hardware_service",
+        "/metrics/history",
+        params={"window": window_minutes * 60, "resolution": resolution_seconds},
+    )
+    result = response.json()
+    logger.debug("show_metrics_history response: {}", result)
+    return result
+
+
+@tool
+def show_top_processes(sort_by: str = "cpu", limit: int = 10) -> dict:
+    """Tool shows the processes using the most CPU or memory right now.
+
+    Use this tool for questions like "what is eating my CPU?" or "which programs
+    use the most RAM?". CPU usage is given per core like in top, so a process
+    keeping two cores busy shows 200%.
+
+    Args:
+        sort_by: "cpu" to rank by CPU usage or "rss" to rank by memory (resident set size)
+        limit: How many processes to return, between 1 and 100
+
+    Example usage:
+    show_top_processes(sort_by="rss", limit=5) - The 5 processes using the most memory
+
+    Returns:
+        JSON object with the process count and, for each top process, its pid, name,
+        user, CPU percent and memory usage
+
+    """
+    logger.info("Executing show_top_processes tool: sort_by={} limit={}", sort_by, limit)
+    response = TRANSPORT.get("hardware_service", "/processes/top", params={"n": limit, "sort": sort_by})
+    result = response.json()
+    logger.debug("show_top_processes response: {}", result)
+    return result
+
+
 @tool
 def show_hardware_info() -> dict:
     """Tool shows comprehensive system hardware information.
@@ -325,28 +488,10 @@ def show_hardware_info() -> dict:
     """
     logger.info("Executing show_hardware_info tool")
 
-    # Get CPU information
-    response_cpu = httpx.get(HARDWARE_URL + "/cpuinfo")
-    cpu_info = response_cpu.json()
-    logger.info(f"CPU info: {cpu_info}")
-
-    # Get RAM information
-    response_ram = httpx.get(HARDWARE_URL + "/ram")
-    ram_info = response_ram.json()
-    logger.info(f"RAM info: {ram_info}")
-
-    # Get Disk information
-    response_disk = httpx.get(HARDWARE_URL + "/disk")
-    disk_info = response_disk.json()
-    logger.info(f"Disk info: {disk_info}")
-
-    # Combine all hardware information into one dictionary
-    combined_info = {
-        "cpu": cpu_info,
-        "ram": ram_info,
-        "disk": disk_info,
-    }
-    logger.info(f"show_hardware_info result: {combined_info}")
+    # CPU, RAM and disk all come from the same sample in one round trip
+    response = TRANSPORT.get("hardware_service", "/system", params={"fields": "cpu,ram,disk"})
+    combined_info = response.json()
+    logger.debug("show_hardware_info result: {}", combined_info)
 
     return combined_info
 
@@ -369,9 +514,9 @@ def add(numbers: Numbers) -> float:
         The sum of the two numbers (a + b)
 
     """
-    logger.info(f"Executing add tool with numbers: {numbers}")
+    logger.info("Executing add tool with numbers: {}", numbers)
     result = numbers.a + numbers.b
-    logger.info(f"add result: {result}")
+    logger.debug("add result: {}", result)
     return result
 
 
@@ -393,20 +538,24 @@ def multiply(numbers: Numbers) -> float:
         The product of the two numbers (a * b)
 
     """
-    logger.info(f"Executing multiply tool with numbers: {numbers}")
+    logger.info("Executing multiply tool with numbers: {}", numbers)
     result = numbers.a * numbers.b
-    logger.info(f"multiply result: {result}")
+    logger.debug("multiply result: {}", result)
     return result
 
 
 TOOLS = [
     open_new_window,
     search,
+    search_batch,
+    read_page,
     close_browser,
     screenshot,
     open_camera,
     show_ram,
     show_disk,
     show_cpu,
+    show_metrics_history,
+    show_top_processes,
     # show_hardware_info,
 ]
@@ -0,0 +1,312 @@
+"""How tools reach the browser and hardware services.
+
+``HttpTransport`` sends requests over HTTP to services running as their own processes.
+``InProcessTransport`` calls the route handlers of apps loaded into the same process
+directly: no sockets, no HTTP parsing, no middleware, and no JSON for handlers that
+return plain objects. Both answer with something shaped like ``httpx.Response``
+(``status_code``, ``json()`` and ``text``) and raise ``httpx.ReadTimeout`` on timeouts,
+so the tools handle either the same way.
+"""
+
+import asyncio
+import importlib
+import inspect
+import sys
+from collections.abc import Callable
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from types import ModuleType
+from typing import Any, get_type_hints
+
+import httpx
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.routing import APIRoute
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response, StreamingResponse
+
+# httpx's default, which the tools relied on before
+DEFAULT_TIMEOUT_S = 5.0
+
+
+class Transport:
+    """Send a request to a service, named as in config.yaml, such as ``hardware_service``."""
+
+    def get(
+        self,
+        service: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> "httpx.Response | DirectResponse":
+        """Send a GET request with query ``params``."""
+        return self.request("GET", service, path, params=params, timeout=timeout)
+
+    def post(
+        self,
+        service: str,
+        path: str,
+        json: dict[str, Any] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> "httpx.Response | DirectResponse":
+        """Send a POST request with ``json`` as the body."""
+        return self.request("POST", service, path, json=json, timeout=timeout)
+
+    def request(  # noqa: PLR0913
+        self,
+        method: str,
+        service: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> "httpx.Response | DirectResponse":
+        """Send a request, implemented by every transport."""
+        raise NotImplementedError
+
+    def public_url(self, service: str) -> str:
+        """URL under which clients outside the process reach ``service``, for links such as image URLs."""
+        raise NotImplementedError
+
+
+class HttpTransport(Transport):
+    """Reach every service over HTTP, reusing pooled connections per service.
+
+    Services listed in ``socket_paths`` are reached over their Unix domain socket,
+    the others over TCP. Links keep the TCP ``base_urls`` either way.
+    """
+
+    def __init__(self, base_urls: dict[str, str], socket_paths: dict[str, Path] | None = None) -> None:
+        """Create a client per service, ``base_urls`` maps service names to URLs like ``http://localhost:8003``."""
+        self.base_urls = base_urls
+        socket_paths = socket_paths or {}
+        self.clients = {
+            service: httpx.Client(
+                base_url=url,
+                transport=httpx.HTTPTransport(uds=str(socket_paths[service])) if service in socket_paths else None,
+            )
+            for service, url in base_urls.items()
+        }
+
+    def request(  # noqa: PLR0913
+        self,
+        method: str,
+        service: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> httpx.Response:
+        """Send the request to the service and return its response."""
+        return self.clients[service].request(method, path, params=params, json=json, timeout=timeout)
+
+    def public_url(self, service: str) -> str:
+        """Return the base URL of the service."""
+        return self.base_urls[service]
+
+    def close(self) -> None:
+        """Close the connection pools."""
+        for client in self.clients.values():
+            client.close()
+
+
+@dataclass
+class DirectResponse:
+    """Result of a route handler called in process, with the parts of ``httpx.Response`` the tools use."""
+
+    status_code: int
+    payload: Any = None
+    body: bytes = b""
+
+    def json(self) -> Any:  # noqa: ANN401
+        """Return the payload, parsed from the body only if the handler returned a serialized response."""
+        if self.payload is None and self.body:
+            self.payload = orjson.loads(self.body)
+        return self.payload
+
+    @property
+    def text(self) -> str:
+        """Return the body as text."""
+        if self.body:
+            return self.body.decode("utf8", errors="replace")
+        return orjson.dumps(self.payload).decode() if self.payload is not None else ""
+
+
+@dataclass
+class MountedApp:
+    """A service app loaded into this process and the path it is mounted under."""
+
+    app: FastAPI
+    prefix: str
+
+
+class InProcessTransport(Transport):
+    """Call the route handlers of apps running in this process.
+
+    Async handlers run on ``loop``, the event loop serving the apps, and sync handlers
+    run in the calling thread, like FastAPI runs them in its thread pool. Tools are
+    called from worker threads, never from the loop itself.
+    """
+
+    def __init__(self, apps: dict[str, MountedApp], public_base_url: str) -> None:
+        """Index the routes of ``apps``, keyed by service name; ``bind`` sets the loop before the first request."""
+        self.apps = apps
+        self.public_base_url = public_base_url.rstrip("/")
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.routes: dict[tuple[str, str, str], APIRoute] = {
+            (service, method, route.path): route
+            for service, mounted in apps.items()
+            for route in mounted.app.routes
+            if isinstance(route, APIRoute)
+            for method in route.methods
+        }
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Run async handlers on ``loop`` from now on."""
+        self.loop = loop
+
+    def request(  # noqa: PLR0913
+        self,
+        method: str,
+        service: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: dict[str, Any] | None = None,
+        timeout: float = DEFAULT_TIMEOUT_S,
+    ) -> DirectResponse:
+        """Call the handler of ``path`` with ``params`` and ``json`` as its arguments.
+
+        Handler errors other than ``HTTPException`` become a 500 response, as over HTTP.
+
+        Raises:
+            httpx.ReadTimeout: An async handler did not finish within ``timeout`` seconds.
+            RuntimeError: No event loop was bound, or the request was made from the loop's own thread.
+
+        """
+        route = self.routes.get((service, method, path))
+        if route is None:
+            return DirectResponse(status_code=404, payload={"detail": "Not Found"})
+        try:
+            arguments = handler_arguments(route.endpoint, params or {}, json)
+        except (TypeError, ValueError) as error:
+            return DirectResponse(status_code=422, payload={"detail": str(error)})
+
+        is_async = inspect.iscoroutinefunction(route.endpoint)
+        if is_async:
+            self._check_loop()
+        try:
+            if is_async:
+                result = self._run_on_loop(route.endpoint(**arguments), timeout)
+            else:
+                result = route.endpoint(**arguments)
+        except HTTPException as error:
+            return DirectResponse(status_code=error.status_code, payload={"detail": error.detail})
+        except httpx.ReadTimeout:
+            raise
+        except Exception:  # noqa: BLE001
+            # What uvicorn answers when a handler raises, with the traceback logged the same way
+            logger.exception(f"Exception in in-process handler of {method} {path}")
+            return DirectResponse(status_code=500, body=b"Internal Server Error")
+        return direct_response(result)
+
+    def _check_loop(self) -> None:
+        if self.loop is None:
+            msg = "InProcessTransport has no event loop, call bind() from the app's startup"
+            raise RuntimeError(msg)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            msg = "InProcessTransport cannot wait for the event loop from the loop's own thread"
+            raise RuntimeError(msg)
+
+    def _run_on_loop(self, coroutine: Any, timeout: float) -> Any:  # noqa: ANN401
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError as error:
+            future.cancel()
+            msg = f"In-process request did not finish within {timeout} s"
+            raise httpx.ReadTimeout(msg) from error
+
+    def public_url(self, service: str) -> str:
+        """URL of the service as mounted in this process's app."""
+        return self.public_base_url + self.apps[service].prefix
+
+
+@cache
+def parameter_adapters(endpoint: Callable) -> dict[str, tuple[bool, TypeAdapter | None]]:
+    """Build the validator of every parameter of ``endpoint`` and tell whether it takes the body, once per handler."""
+    hints = get_type_hints(endpoint)
+    adapters: dict[str, tuple[bool, TypeAdapter | None]] = {}
+    for name in inspect.signature(endpoint).parameters:
+        hint = hints.get(name)
+        is_body = inspect.isclass(hint) and issubclass(hint, BaseModel)
+        adapters[name] = (is_body, TypeAdapter(hint) if hint is not None else None)
+    return adapters
+
+
+def handler_arguments(endpoint: Callable, params: dict[str, Any], body: dict[str, Any] | None) -> dict[str, Any]:
+    """Arguments for ``endpoint``: the body validated into its pydantic model parameter, the rest from ``params``.
+
+    Query parameters are validated against their annotations the way FastAPI does, so
+    ``"5"`` becomes ``5`` for an ``int`` and ``"true"`` becomes ``True`` for a ``bool``.
+
+    Raises:
+        TypeError: ``params`` names a parameter ``endpoint`` does not have.
+        ValueError: The body or a parameter does not validate against its annotation.
+
+    """
+    arguments: dict[str, Any] = {}
+    for name, (is_body, adapter) in parameter_adapters(endpoint).items():
+        if is_body:
+            arguments[name] = adapter.validate_python(body or {})
+        elif name in params:
+            arguments[name] = adapter.validate_python(params[name]) if adapter is not None else params[name]
+    unknown = set(params) - set(arguments)
+    if unknown:
+        msg = f"Unknown parameters {sorted(unknown)} for {endpoint.__name__}"
+        raise TypeError(msg)
+    return arguments
+
+
+def direct_response(result: Any) -> DirectResponse:  # noqa: ANN401
+    """Wrap what a handler returned: plain objects are passed on as they are, responses keep their body."""
+    if isinstance(result, StreamingResponse):
+        return DirectResponse(status_code=501, payload={"detail": "Streaming responses need the HTTP transport"})
+    if isinstance(result, Response):
+        return DirectResponse(status_code=result.status_code, body=bytes(result.body))
+    if isinstance(result, BaseModel):
+        return DirectResponse(status_code=200, payload=result.model_dump())
+    return DirectResponse(status_code=200, payload=result)
+
+
+def load_service_module(directory: Path, module: str) -> ModuleType:
+    """Import ``module`` of a service directory that imports its sibling modules by their bare names.
+
+    Services have modules of the same name (``models``), so sibling modules already
+    imported from another directory are set aside while the service is imported, and
+    put back afterwards. The service keeps the objects it imported, and its directory
+    stays on the path, at the end, for the imports it makes later.
+    """
+    directory = directory.resolve()
+    siblings = {path.stem for path in directory.glob("*.py")}
+    set_aside = {
+        name: sys.modules.pop(name)
+        for name in list(sys.modules)
+        if name in siblings and Path(getattr(sys.modules[name], "__file__", "") or "").parent != directory
+    }
+    sys.path.insert(0, str(directory))
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(str(directory))
+        sys.path.append(str(directory))
+        sys.modules.update(set_aside)
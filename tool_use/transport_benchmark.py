@@ -0,0 +1,98 @@
+"""Compare tool latency over HTTP with the in-process transport of single_process.py.
+
+``http`` times the tools against the services already running as their own processes
+(see the JustFile ``run`` recipe). ``in_process`` loads the service apps into this
+process, runs their startup on an event loop thread and times the same tools calling
+the route handlers directly. Prints one JSON line per mode and tool with p50, p95 and
+p99 in milliseconds.
+
+    uv run ./transport_benchmark.py --mode both --rounds 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import tools
+from single_process import SERVICES, load_apps, run_apps
+from transport import InProcessTransport
+
+# Tools that do not change anything on the machine
+HARDWARE_TOOLS = ["show_ram", "show_disk", "show_cpu", "show_hardware_info", "show_top_processes"]
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """p50, p95 and p99 of ``values`` in milliseconds."""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+    return {"p50": round(statistics.median(ordered) * 1000, 2), "p95": at(0.95), "p99": at(0.99)}
+
+
+@contextmanager
+def in_process(services: list[str]) -> Iterator[None]:
+    """Route the tools to the service apps run on an event loop in a background thread."""
+    apps = load_apps(services)
+    transport = InProcessTransport(apps, "http://127.0.0.1:8000")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    lifespan = run_apps(apps, transport)
+    asyncio.run_coroutine_threadsafe(lifespan.__aenter__(), loop).result()
+    previous = tools.TRANSPORT
+    tools.use_transport(transport)
+    try:
+        yield
+    finally:
+        tools.use_transport(previous)
+        asyncio.run_coroutine_threadsafe(lifespan.__aexit__(None, None, None), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def time_tools(mode: str, calls: dict[str, dict], rounds: int) -> None:
+    """Call every tool of ``calls`` with its arguments ``rounds`` times and print its percentiles."""
+    for name, arguments in calls.items():
+        tool = getattr(tools, name)
+        tool.invoke(arguments)  # Warm up connections and caches
+        durations = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            tool.invoke(arguments)
+            durations.append(time.perf_counter() - started)
+        print(json.dumps({"mode": mode, "tool": name, "rounds": rounds, **percentiles(durations)}))  # noqa: T201
+
+
+def main() -> None:
+    """Time the tools in the requested modes."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["in_process", "http", "both"], default="both")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--browser", action="store_true", help="Also time search, which opens a real browser")
+    args = parser.parse_args()
+
+    calls: dict[str, dict] = {name: {} for name in HARDWARE_TOOLS}
+    services = ["hardware_service"]
+    if args.browser:
+        calls["search"] = {"query": "python asyncio"}
+        services = list(SERVICES)
+
+    if args.mode in {"http", "both"}:
+        time_tools("http", calls, args.rounds)
+    if args.mode in {"in_process", "both"}:
+        with in_process(services):
+            time_tools("in_process", calls, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
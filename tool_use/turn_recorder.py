@@ -0,0 +1,136 @@
+"""LangChain callback timing the model and tool calls of one agent run."""
+
+import json
+import time
+from typing import Any
+from uuid import UUID
+
+from conversation_store import ToolCallRecord, TurnRecord
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, ToolMessage
+from langchain_core.outputs import LLMResult
+
+# Ollama reports its durations in nanoseconds
+NS_PER_MS = 1e6
+
+
+def as_text(value: Any) -> str:  # noqa: ANN401
+    """Tool input or output as text, JSON for anything but strings."""
+    if isinstance(value, ToolMessage):
+        value = value.content
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+class TurnRecorder(BaseCallbackHandler):
+    """Collect the timings of the model calls and the tool calls of a run, passed to it as a callback."""
+
+    def __init__(self) -> None:
+        """Start with no calls recorded."""
+        self.tool_calls: list[ToolCallRecord] = []
+        self.model: str | None = None
+        self.llm_calls = 0
+        self.llm_ms = 0.0
+        self.llm_load_ms = 0.0
+        self.llm_prompt_eval_ms = 0.0
+        self.llm_eval_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Start of every call still running, with the tool name and arguments for tool calls
+        self._llm_started: dict[UUID, float] = {}
+        self._tool_started: dict[UUID, tuple[float, float, str, str]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],  # noqa: ARG002
+        messages: list[list[BaseMessage]],  # noqa: ARG002
+        *,
+        run_id: UUID,
+        **kwargs: Any,  # noqa: ARG002, ANN401
+    ) -> None:
+        """Note when a chat model call starts."""
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],  # noqa: ARG002
+        prompts: list[str],  # noqa: ARG002
+        *,
+        run_id: UUID,
+        **kwargs: Any,  # noqa: ARG002, ANN401
+    ) -> None:
+        """Note when a completion model call starts."""
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002, ANN401
+        """Add the wall time, the Ollama timings and the token counts of a model call."""
+        started = self._llm_started.pop(run_id, None)
+        self.llm_calls += 1
+        if started is not None:
+            self.llm_ms += (time.perf_counter() - started) * 1000
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = getattr(message, "response_metadata", None) or generation.generation_info or {}
+                self.model = metadata.get("model") or metadata.get("model_name") or self.model
+                self.llm_load_ms += (metadata.get("load_duration") or 0) / NS_PER_MS
+                self.llm_prompt_eval_ms += (metadata.get("prompt_eval_duration") or 0) / NS_PER_MS
+                self.llm_eval_ms += (metadata.get("eval_duration") or 0) / NS_PER_MS
+                usage = getattr(message, "usage_metadata", None) or {}
+                self.prompt_tokens += usage.get("input_tokens") or metadata.get("prompt_eval_count") or 0
+                self.completion_tokens += usage.get("output_tokens") or metadata.get("eval_count") or 0
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002, ANN401
+        """Count a failed model call with its wall time."""
+        started = self._llm_started.pop(run_id, None)
+        self.llm_calls += 1
+        if started is not None:
+            self.llm_ms += (time.perf_counter() - started) * 1000
+
+    def on_tool_start(
+        self,
+        serialized: dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        inputs: dict[str, Any] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Note the tool, its arguments and when it starts."""
+        name = serialized.get("name") or kwargs.get("name") or "unknown"
+        arguments = as_text(inputs) if inputs is not None else input_str
+        self._tool_started[run_id] = (time.time(), time.perf_counter(), name, arguments)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002, ANN401
+        """Record a finished tool call."""
+        self._finish_tool(run_id, as_text(output), failed=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:  # noqa: ARG002, ANN401
+        """Record a failed tool call with the error as its result."""
+        self._finish_tool(run_id, f"{type(error).__name__}: {error}", failed=True)
+
+    def _finish_tool(self, run_id: UUID, result: str, *, failed: bool) -> None:
+        started = self._tool_started.pop(run_id, None)
+        if started is None:
+            return
+        started_at, started_perf, name, arguments = started
+        duration_ms = (time.perf_counter() - started_perf) * 1000
+        self.tool_calls.append(ToolCallRecord(name, arguments, result, started_at, duration_ms, failed=failed))
+
+    def turn_record(self, session_id: str, prompt: str, answer: str, started_at: float, **fields: Any) -> TurnRecord:  # noqa: ANN401
+        """Build the record of the turn from what was collected, ``fields`` sets the other TurnRecord fields."""
+        return TurnRecord(
+            session_id=session_id,
+            started_at=started_at,
+            prompt=prompt,
+            answer=answer,
+            model=self.model,
+            llm_calls=self.llm_calls,
+            llm_ms=round(self.llm_ms, 3),
+            llm_load_ms=round(self.llm_load_ms, 3),
+            llm_prompt_eval_ms=round(self.llm_prompt_eval_ms, 3),
+            llm_eval_ms=round(self.llm_eval_ms, 3),
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            tool_calls=self.tool_calls,
+            **fields,
+        )
@@ -0,0 +1,166 @@
+"""Flood the logging server from several client processes and report its throughput.
+
+Starts a logging server with a temporary configuration and log file, lets every
+client process publish its messages as fast as it can, and then follows the server
+counters until everything that arrived has been written.
+
+    uv run ./benchmark.py --clients 4 --messages 100000 --size 200
+
+With ``--rotation "5 MB"`` the log rotates during the run; compare the queue lag and the
+slowest write with ``--compression_workers 0``, which compresses in the writer thread.
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+import zmq
+from config_types import LoggingConfigs
+from records import RECORD_TOPIC
+
+HERE = Path(__file__).resolve().parent
+# PUB sockets drop what they send before the connection is up, so clients wait this long first
+CONNECT_DELAY_S = 0.5
+# The run is over once the written counter has not moved for this long
+SETTLE_S = 2.0
+
+
+def flood(port: int, messages: int, size: int, client: int, transport: str) -> None:
+    """Send ``messages`` INFO records with a message of ``size`` bytes to the server on ``port``."""
+    socket = zmq.Context().socket(zmq.PUSH if transport == "push" else zmq.PUB)
+    socket.setsockopt(zmq.SNDHWM, 0)
+    socket.connect(f"tcp://127.0.0.1:{port}")
+    time.sleep(CONNECT_DELAY_S)
+    record = {
+        "service": f"client{client}",
+        "level": "INFO",
+        "file": "benchmark.py",
+        "function": "flood",
+        "line": 0,
+        "message": "x" * size,
+    }
+    for _ in range(messages):
+        socket.send_multipart([RECORD_TOPIC, orjson.dumps(record | {"ts": time.time()})])
+    socket.close(linger=10_000)
+
+
+def server_stats(port: int, timeout_ms: int = 1000) -> dict | None:
+    """Ask the server on stats ``port`` for its counters, None if it does not answer."""
+    socket = zmq.Context.instance().socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.RCVTIMEO, timeout_ms)
+    socket.connect(f"tcp://127.0.0.1:{port}")
+    try:
+        socket.send(b"stats")
+        return json.loads(socket.recv())
+    except zmq.Again:
+        return None
+    finally:
+        socket.close()
+
+
+def write_config(path: Path, configs: LoggingConfigs) -> None:
+    """Write ``configs`` as TOML, every value is a string, number or boolean, None is left out."""
+    lines = [f"{key} = {json.dumps(value)}" for key, value in configs.model_dump().items() if value is not None]
+    path.write_text("\n".join(lines) + "\n", encoding="utf8")
+
+
+def main() -> None:
+    """Run the benchmark and print the final server counters with the throughput."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=100_000, help="Messages per client")
+    parser.add_argument("--size", type=int, default=200, help="Characters per message")
+    parser.add_argument("--port", type=int, default=19999)
+    parser.add_argument("--stats_port", type=int, default=19998)
+    parser.add_argument("--transport", default="push", choices=["push", "pub"])
+    parser.add_argument("--overflow_policy", default="drop_oldest")
+    parser.add_argument("--queue_capacity", type=int, default=100_000)
+    parser.add_argument("--rotation", default=None, help="Log rotation, such as '5 MB' to rotate during the run")
+    parser.add_argument("--compression", default="gz", choices=["zip", "gz", "zstd", ""])
+    parser.add_argument("--compression_level", type=int, default=None)
+    parser.add_argument("--compression_workers", type=int, default=1, help="0 compresses in the writer thread")
+    parser.add_argument("--shard_by", default="none", choices=["none", "service", "level", "service_level"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        configs = LoggingConfigs(
+            log_server_port=args.port,
+            stats_port=args.stats_port,
+            log_file_name=str(Path(scratch, "benchmark.log")),
+            transport=args.transport,
+            overflow_policy=args.overflow_policy,
+            queue_capacity=args.queue_capacity,
+            log_rotation=args.rotation,
+            log_compression=args.compression,
+            log_compression_level=args.compression_level,
+            compression_workers=args.compression_workers,
+            shard_by=args.shard_by,
+            stats_interval_s=0,
+        )
+        config_path = Path(scratch, "logging_config.toml")
+        write_config(config_path, configs)
+        server = subprocess.Popen(  # noqa: S603
+            [sys.executable, "start_logging_server.py", "--config_file_path", str(config_path)],
+            cwd=HERE,
+        )
+        try:
+            while server_stats(args.stats_port) is None:
+                time.sleep(0.2)
+
+            clients = [
+                multiprocessing.Process(
+                    target=flood,
+                    args=(args.port, args.messages, args.size, client, args.transport),
+                )
+                for client in range(args.clients)
+            ]
+            started = time.monotonic()
+            for client in clients:
+                client.start()
+            # Sample the queue lag while the clients send, it grows whenever the writer stalls
+            lags = []
+            while any(client.is_alive() for client in clients):
+                if sample := server_stats(args.stats_port):
+                    lags.append(sample["lag_ms"])
+                time.sleep(0.05)
+
+            # Follow the server until it has written everything it received
+            stats, last_change, progress = {}, time.monotonic(), None
+            while time.monotonic() - last_change < SETTLE_S or stats.get("queued"):
+                stats = server_stats(args.stats_port) or stats
+                if (stats.get("received"), stats.get("written")) != progress:
+                    progress, last_change = (stats.get("received"), stats.get("written")), time.monotonic()
+                time.sleep(0.1)
+            elapsed = last_change - started - CONNECT_DELAY_S
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    sent = args.clients * args.messages
+    result = {
+        "sent": sent,
+        "received": stats.get("received"),
+        "written": stats.get("written"),
+        "dropped": stats.get("dropped"),
+        "lost_in_transport": sent - stats.get("received", 0),
+        "largest_batch": stats.get("largest_batch"),
+        "rotations": stats.get("rotations"),
+        "slowest_write_ms": stats.get("slowest_write_ms"),
+        "lag_ms_p50": round(statistics.median(lags), 1) if lags else None,
+        "lag_ms_max": max(lags, default=None),
+        "elapsed_s": round(elapsed, 2),
+        "written_per_s": round(stats.get("written", 0) / elapsed) if elapsed > 0 else 0,
+    }
+    print(json.dumps(result))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
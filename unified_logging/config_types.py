@@ -5,7 +5,7 @@ import tomllib
 from pathlib import Path
 from typing import Literal
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 def load_toml(file_name: Path) -> dict:
@@ -14,25 +14,78 @@ def load_toml(file_name: Path) -> dict:
         return tomllib.load(file_obj)
 
 
+LogLevel = Literal[
+    "TRACE",
+    "DEBUG",
+    "INFO",
+    "SUCCESS",
+    "WARNING",
+    "ERROR",
+    "CRITICAL",
+]
+
+
 class LoggingConfigs(BaseModel):
     """Logging configurations."""
 
     model_config = ConfigDict(extra="forbid")
-    min_log_level: Literal[
-        "TRACE",
-        "DEBUG",
-        "INFO",
-        "SUCCESS",
-        "WARNING",
-        "ERROR",
-        "CRITICAL",
-    ] = "DEBUG"
+    min_log_level: LogLevel = "DEBUG"
     log_server_port: int = 9999
+    # Address the server binds and the clients connect to
+    log_server_host: str = "127.0.0.1"
+    # push (PUSH/PULL) spools records on disk while the server is down and replays them,
+    # pub (PUB/SUB) drops whatever is sent while no server is connected
+    transport: Literal["push", "pub"] = "push"
     server_log_format: str = "[{level}] | {message}"
-    client_log_format: str = "{time:YYYY-MM-DD HH:mm:ss} | {file}: {line} | {message}"
-    log_rotation: str = "00:00"
-    log_file_name: str = "logs/logs.txt"
-    log_compression: str = "zip"
+    log_rotation: str | None = "00:00"
+    log_file_name: str = "logs/logs.jsonl"
+    # zip, gz or zstd (needs the zstandard package, the fastest of the three), empty disables compression
+    log_compression: Literal["zip", "gz", "zstd", ""] = "gz"
+    # Compression level of the codec, None for its default; low levels compress much faster
+    log_compression_level: int | None = Field(default=None, ge=0, le=22)
+    # Worker processes compressing rotated files, 0 compresses them in the writer thread
+    compression_workers: int = Field(default=1, ge=0)
+    # none writes one file, service/level/service_level write one file per service, level or both
+    # into directories next to log_file_name, such as logs/browser/log.jsonl
+    shard_by: Literal["none", "service", "level", "service_level"] = "none"
+    # jsonl writes one JSON record per line with a block index for query_logs.py, text uses server_log_format
+    record_format: Literal["jsonl", "text"] = "jsonl"
+    # Messages each client socket queues while the server is not keeping up, beyond that they are dropped
+    send_hwm: int = Field(default=100_000, ge=0)
+    # Records each client queues in memory before its sender thread delivers them, beyond that the oldest are dropped
+    client_queue_capacity: int = Field(default=10_000, ge=1)
+    # Directory of the client spools, one file per service, empty disables spooling
+    spool_dir: str = "logs/spool"
+    # Size of each spool file, records arriving while it is full are dropped
+    spool_max_mb: float = Field(default=64.0, gt=0)
+    # Levels overriding min_log_level for the records of one route (bound as ``route`` by the service)
+    # or of one tool (the function logging in tool_use/tools.py), such as {"/cpu" = "WARNING"}
+    route_levels: dict[str, LogLevel] = Field(default_factory=dict)
+    tool_levels: dict[str, LogLevel] = Field(default_factory=dict)
+    # Records per second each call site may send below WARNING, 0 disables the limit;
+    # the next record sent from a limited site carries how many were suppressed
+    rate_limit_per_site: float = Field(default=0.0, ge=0)
+    rate_limit_burst: int = Field(default=20, ge=1)
+    # Longest message sent, longer ones are cut with a note of how much was cut, 0 disables it
+    max_message_chars: int = Field(default=4000, ge=0)
+    # Extend exception traces beyond the catching frame, and show variable values in them (slow, may leak data)
+    backtrace: bool = True
+    diagnose: bool = False
+    # Messages the server socket buffers before zmq starts dropping them
+    receive_hwm: int = Field(default=100_000, ge=0)
+    # Most messages drained from the socket, or written to the file, in one batch
+    batch_size: int = Field(default=1000, ge=1)
+    # Messages waiting to be written, and what happens when that many are waiting:
+    # drop_newest discards incoming messages, drop_oldest discards the oldest waiting ones,
+    # block stops reading from the socket so messages queue up in zmq (and are dropped there at the HWM)
+    queue_capacity: int = Field(default=100_000, ge=1)
+    overflow_policy: Literal["drop_newest", "drop_oldest", "block"] = "drop_oldest"
+    # Longest a received message waits before it is written
+    flush_interval_ms: int = Field(default=200, ge=1)
+    # Port of the REP socket answering with the ingestion counters as JSON, 0 disables it
+    stats_port: int = 9998
+    # How often the counters are written to the log file, 0 disables it
+    stats_interval_s: float = Field(default=60.0, ge=0)
 
     @staticmethod
     def load_from_path(file_path: str) -> "LoggingConfigs":
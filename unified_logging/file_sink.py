@@ -0,0 +1,255 @@
+"""Log file sink that writes whole batches of lines at once, with rotation and compression.
+
+loguru's file sink formats and writes every message on its own. The logging server
+receives messages in batches, so this sink takes a list of formatted lines and writes
+them with a single ``write`` call and one flush per batch. With ``indexed`` set, every
+batch is one block of the file, described by one entry in the block index.
+
+Rotated files can be compressed by a worker process, and ``ShardedSink`` splits the
+output into one such file per service and/or level.
+"""
+
+import gzip
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import Executor, Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import orjson
+from loguru import logger
+from records import block_summary, index_path
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+COMPRESSION_SUFFIXES = {"zip": ".zip", "gz": ".gz", "zstd": ".zst"}
+COPY_CHUNK = 1024 * 1024
+# Shard directories by shard_by setting, relative to the directory of the log file
+SHARD_LAYOUTS = {"none": "", "service": "{service}", "level": "{level}", "service_level": "{service}/{level}"}
+ROTATION_TIME = re.compile(r"^(\d{1,2}):(\d{2})$")
+ROTATION_SIZE = re.compile(r"^(\d+(?:\.\d+)?)\s*(B|KB|MB|GB)$", re.IGNORECASE)
+SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def parse_rotation(rotation: str | None) -> tuple[tuple[int, int] | None, int | None]:
+    """Parse a rotation setting into a daily (hour, minute) or a size in bytes.
+
+    Supports the two forms used by loguru that matter here: a time of day such as
+    ``"00:00"`` and a size such as ``"100 MB"``.
+
+    Raises:
+        ValueError: The rotation is in neither form.
+
+    """
+    if not rotation:
+        return None, None
+    if match := ROTATION_TIME.match(rotation.strip()):
+        return (int(match[1]), int(match[2])), None
+    if match := ROTATION_SIZE.match(rotation.strip()):
+        return None, int(float(match[1]) * SIZE_UNITS[match[2].upper()])
+    msg = f"Unsupported log rotation {rotation!r}, use a time of day like '00:00' or a size like '100 MB'"
+    raise ValueError(msg)
+
+
+def next_rotation_time(at: tuple[int, int], now: datetime) -> float:
+    """Unix time of the next ``at`` (hour, minute) after ``now``."""
+    candidate = now.replace(hour=at[0], minute=at[1], second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+
+def compress(path: Path, compression: str, level: int | None = None) -> Path:
+    """Compress ``path`` into a zip, gz or zst file next to it, remove the original and return the new path.
+
+    The block index of ``path`` is moved along, its offsets stay those of the
+    uncompressed data. ``level`` is the codec's compression level, None for its default.
+
+    Raises:
+        ValueError: The compression is not one of zip, gz and zstd.
+
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        msg = f"Unsupported log compression {compression!r}, use one of {', '.join(COMPRESSION_SUFFIXES)}"
+        raise ValueError(msg)
+    target = path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+    # Written under a hidden name first, so readers never see a partial file
+    partial = path.with_name(f".{target.name}.partial")
+    if compression == "zip":
+        with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+            archive.write(path, arcname=path.name)
+    elif compression == "gz":
+        gz_level = 9 if level is None else level
+        with path.open("rb") as source, gzip.open(partial, "wb", compresslevel=gz_level) as destination:
+            shutil.copyfileobj(source, destination, COPY_CHUNK)
+    else:
+        import zstandard  # noqa: PLC0415 # only needed for this codec
+
+        with path.open("rb") as source, partial.open("wb") as destination:
+            zstandard.ZstdCompressor(level=3 if level is None else level).copy_stream(source, destination)
+    partial.rename(target)
+    if index_path(path).exists():
+        index_path(path).rename(index_path(target))
+    path.unlink()
+    return target
+
+
+class FileSink:
+    """Append lines to a log file in batches, rotating it by time of day or by size.
+
+    With an ``executor``, rotated files are compressed by it, so a rotation only costs
+    the writer a rename; without one they are compressed before ``write_lines`` returns.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: str | Path,
+        rotation: str | None = None,
+        compression: str | None = None,
+        *,
+        compression_level: int | None = None,
+        indexed: bool = False,
+        executor: Executor | None = None,
+    ) -> None:
+        """Open ``path`` (and its block index if ``indexed``) for appending, creating the directory if needed."""
+        self.path = Path(path)
+        self.compression = compression or None
+        self.compression_level = compression_level
+        self.indexed = indexed
+        self.executor = executor
+        self.rotate_at, self.max_bytes = parse_rotation(rotation)
+        if self.compression is not None and self.compression not in COMPRESSION_SUFFIXES:
+            msg = f"Unsupported log compression {compression!r}, use one of {', '.join(COMPRESSION_SUFFIXES)}"
+            raise ValueError(msg)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open()
+        self._next_rotation = next_rotation_time(self.rotate_at, datetime.now()) if self.rotate_at else None  # noqa: DTZ005
+        self.rotations = 0
+
+    def _open(self) -> None:
+        self._file = self.path.open("ab", buffering=1024 * 1024)
+        self._size = self.path.stat().st_size
+        self._index = index_path(self.path).open("ab") if self.indexed else None
+
+    def write_lines(self, lines: list[bytes], summary: dict | None = None) -> int:
+        """Write ``lines`` with one call, each followed by a newline, and return the bytes written.
+
+        ``summary`` describes the lines as one block in the index, see ``records.block_summary``.
+        """
+        if not lines:
+            return 0
+        data = b"\n".join(lines) + b"\n"
+        if self._due(len(data)):
+            self.rotate()
+        offset = self._size
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        if self._index is not None and summary is not None:
+            # The block is flushed before its index entry, so an entry never points past the data
+            self._index.write(orjson.dumps({"offset": offset, "length": len(data)} | summary) + b"\n")
+            self._index.flush()
+        return len(data)
+
+    def _due(self, incoming: int) -> bool:
+        if self._next_rotation is not None and time.time() >= self._next_rotation:
+            return True
+        return self.max_bytes is not None and self._size > 0 and self._size + incoming > self.max_bytes
+
+    def rotate(self) -> Path:
+        """Move the current file and its index aside under a timestamped name, and start a new one.
+
+        Returns the rotated path, before compression when that runs on the executor.
+        """
+        self._close_files()
+        stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")  # noqa: DTZ005
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        self.path.rename(rotated)
+        if index_path(self.path).exists():
+            index_path(self.path).rename(index_path(rotated))
+        self._open()
+        if self.rotate_at:
+            self._next_rotation = next_rotation_time(self.rotate_at, datetime.now())  # noqa: DTZ005
+        self.rotations += 1
+        if self.compression and self.executor is not None:
+            future = self.executor.submit(compress, rotated, self.compression, self.compression_level)
+            future.add_done_callback(_report_compression)
+        elif self.compression:
+            rotated = compress(rotated, self.compression, self.compression_level)
+        return rotated
+
+    def _close_files(self) -> None:
+        self._file.close()
+        if self._index is not None:
+            self._index.close()
+
+    def close(self) -> None:
+        """Flush and close the file and its index."""
+        self._close_files()
+
+
+def _report_compression(future: Future) -> None:
+    if future.exception() is not None:
+        logger.opt(exception=future.exception()).error("Compressing a rotated log file failed")
+
+
+class ShardedSink:
+    """Route each record to the file sink of its shard, one log file per service, level or both.
+
+    Shards live in directories next to the log file, ``logs/browser/log.jsonl`` for the
+    browser service with ``shard_by = "service"``, each with its own rotation and index.
+    """
+
+    def __init__(self, path: str | Path, shard_by: str, **sink_options: Any) -> None:  # noqa: ANN401
+        """Create the sinks lazily, each with ``sink_options`` (see ``FileSink``)."""
+        self.path = Path(path)
+        self.layout = SHARD_LAYOUTS[shard_by]
+        self.sink_options = sink_options
+        self.sinks: dict[str, FileSink] = {}
+
+    def shard(self, record: dict) -> str:
+        """Shard directory of ``record``, empty for the log file itself."""
+        if not self.layout:
+            return ""
+        return self.layout.format(
+            service=_safe_name(record.get("service", "unknown")),
+            level=_safe_name(record.get("level", "INFO")),
+        )
+
+    def write_records(self, records: list[dict], lines: list[bytes], *, summarize: bool) -> int:
+        """Write every line to the shard of its record, one batch per shard, and return the bytes written."""
+        if not self.layout:
+            return self._sink("").write_lines(lines, block_summary(records) if summarize else None)
+        grouped: dict[str, tuple[list[dict], list[bytes]]] = {}
+        for record, line in zip(records, lines, strict=True):
+            shard_records, shard_lines = grouped.setdefault(self.shard(record), ([], []))
+            shard_records.append(record)
+            shard_lines.append(line)
+        return sum(
+            self._sink(shard).write_lines(shard_lines, block_summary(shard_records) if summarize else None)
+            for shard, (shard_records, shard_lines) in grouped.items()
+        )
+
+    def _sink(self, shard: str) -> FileSink:
+        sink = self.sinks.get(shard)
+        if sink is None:
+            path = self.path.parent / shard / self.path.name if shard else self.path
+            sink = self.sinks[shard] = FileSink(path, **self.sink_options)
+        return sink
+
+    @property
+    def rotations(self) -> int:
+        """Rotations of every shard."""
+        return sum(sink.rotations for sink in self.sinks.values())
+
+    def close(self) -> None:
+        """Close every shard."""
+        for sink in self.sinks.values():
+            sink.close()
+
+
+def _safe_name(value: str) -> str:
+    # Service names come from the clients, keep them to one harmless path component
+    return SAFE_NAME.sub("_", str(value)).strip("._") or "unknown"
@@ -0,0 +1,91 @@
+"""Loguru filter deciding which records a service sends to the logging server.
+
+Applies the per-route and per-tool levels of the logging configuration on top of
+``min_log_level``, samples records bound with ``logger.bind(sample=0.01)``, and limits
+how many records each call site sends per second. Warnings and errors are never
+sampled or limited.
+
+Loguru formats a message before any filter runs, so hot paths should still pass their
+values as arguments (``logger.debug("response: {}", result)``) rather than f-strings:
+below the lowest configured level loguru then returns before formatting anything.
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from unified_logging.records import LEVELS
+
+if TYPE_CHECKING:
+    from loguru import Record
+
+    from unified_logging.config_types import LoggingConfigs
+
+# Module of the agent's tools, imported by its bare name from tool_use
+TOOLS_MODULE = "tools"
+
+
+class LogFilter:
+    """Decide per record whether it is sent, see the module docstring."""
+
+    def __init__(self, logging_configs: "LoggingConfigs") -> None:
+        """Read the levels and limits from ``logging_configs``."""
+        self.default_level = LEVELS[logging_configs.min_log_level]
+        self.route_levels = {route: LEVELS[level] for route, level in logging_configs.route_levels.items()}
+        self.tool_levels = {tool: LEVELS[level] for tool, level in logging_configs.tool_levels.items()}
+        self.rate = logging_configs.rate_limit_per_site
+        self.burst = logging_configs.rate_limit_burst
+        # Per call site: tokens left and when they were last refilled, records counted for sampling,
+        # and records suppressed since the last one that was sent
+        self._buckets: dict[tuple[str, int], tuple[float, float]] = {}
+        self._sampled: dict[tuple[str, int], int] = {}
+        self._suppressed: dict[tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def lowest_level(self) -> int:
+        """Lowest level any record can pass at, the level the loguru sink has to be added with."""
+        return min([self.default_level, *self.route_levels.values(), *self.tool_levels.values()])
+
+    def __call__(self, record: "Record") -> bool:
+        """Return whether ``record`` is sent, adding ``suppressed`` to its extra after rate limiting."""
+        level = record["level"].no
+        extra = record["extra"]
+        threshold = self.default_level
+        if "route" in extra:
+            threshold = self.route_levels.get(extra["route"], threshold)
+        # Tools log from the function implementing them, in tool_use/tools.py; services have functions of the same names
+        if record["name"] == TOOLS_MODULE:
+            threshold = self.tool_levels.get(record["function"], threshold)
+        if level < threshold:
+            return False
+        if level >= LEVELS["WARNING"] or ("sample" not in extra and not self.rate):
+            return True
+
+        site = (record["name"] or "", record["line"])
+        with self._lock:
+            if "sample" in extra and not self._keep_sample(site, extra["sample"]):
+                return False
+            if self.rate and not self._take_token(site):
+                self._suppressed[site] = self._suppressed.get(site, 0) + 1
+                return False
+            if site in self._suppressed:
+                extra["suppressed"] = self._suppressed.pop(site)
+        return True
+
+    def _keep_sample(self, site: tuple[str, int], rate: float) -> bool:
+        # Every n-th record of the site, starting with the first, is cheaper and steadier than random draws
+        every = max(1, round(1 / rate)) if rate > 0 else 0
+        count = self._sampled.get(site, 0)
+        self._sampled[site] = count + 1
+        return every > 0 and count % every == 0
+
+    def _take_token(self, site: tuple[str, int]) -> bool:
+        now = time.monotonic()
+        tokens, refilled = self._buckets.get(site, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - refilled) * self.rate)
+        if tokens < 1:
+            self._buckets[site] = (tokens, now)
+            return False
+        self._buckets[site] = (tokens - 1, now)
+        return True
@@ -0,0 +1,134 @@
+"""Measure what logging costs a service per request.
+
+Simulates the logging of one hardware request answered through a tool (the request
+line, the tool call and the tool's response payload) in several styles, sends it to
+a logging server started with a temporary configuration, and reports the wall time
+the request path spends logging and the CPU time of the whole process, which includes
+the client's sender thread.
+
+    uv run ./log_overhead.py --requests 20000 --payload_kb 16
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmark import server_stats, write_config
+from config_types import LoggingConfigs
+from loguru import logger
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from unified_logging.logging_client import setup_network_logger_client
+
+HERE = Path(__file__).resolve().parent
+
+
+def eager(payload: dict) -> None:
+    """Log a request the way the services did: f-strings at INFO, the whole payload included."""
+    logger.info(f"Processing request: GET http://127.0.0.1:8000/cpuinfo?{len(payload)}")
+    logger.info("Executing show_cpu tool")
+    logger.info(f"show_cpu response: {payload}")
+    logger.info(f"Response status: {200}")
+
+
+def lazy(payload: dict) -> None:
+    """Log a request with deferred formatting, the request line and the payload at DEBUG."""
+    with logger.contextualize(route="/cpuinfo"):
+        logger.info("Executing show_cpu tool")
+        logger.debug("show_cpu response: {}", payload)
+        logger.debug("{} {} -> {} in {:.1f} ms", "GET", "/cpuinfo", 200, 1.0)
+
+
+def sampled(payload: dict) -> None:
+    """Log the payload of one request in a hundred."""
+    logger.info("Executing show_cpu tool")
+    logger.bind(sample=0.01).info("show_cpu response: {}", payload)
+
+
+# Name, request function, and the settings that differ from the defaults
+SCENARIOS: list[tuple[str, Callable[[dict], None], dict]] = [
+    ("eager_info", eager, {"min_log_level": "INFO", "max_message_chars": 0}),
+    ("eager_truncated", eager, {"min_log_level": "INFO", "max_message_chars": 500}),
+    ("eager_rate_limited", eager, {"min_log_level": "INFO", "rate_limit_per_site": 100.0}),
+    ("lazy_info", lazy, {"min_log_level": "INFO"}),
+    ("lazy_debug_route", lazy, {"min_log_level": "INFO", "route_levels": {"/cpuinfo": "DEBUG"}}),
+    ("sampled", sampled, {"min_log_level": "INFO"}),
+]
+
+
+def run_scenario(
+    name: str,
+    log_request: Callable[[dict], None],
+    configs: LoggingConfigs,
+    *,
+    requests: int,
+    payload: dict,
+) -> dict:
+    """Log ``requests`` requests with ``log_request`` under ``configs`` and return the timings."""
+    client = setup_network_logger_client(configs, logger, service=name)
+    started, cpu_started = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        log_request(payload)
+    wall = time.perf_counter() - started
+    # Let the sender thread finish its share before reading the CPU time
+    while client.stats()["queued"]:
+        time.sleep(0.01)
+    cpu = time.process_time() - cpu_started
+    client.close()
+    logger.remove()
+    stats = client.stats()
+    return {
+        "scenario": name,
+        "wall_us_per_request": round(wall / requests * 1e6, 1),
+        "cpu_us_per_request": round(cpu / requests * 1e6, 1),
+        "records_sent": stats["sent"],
+        "records_dropped": stats["dropped_queue"] + stats["dropped_spool"],
+    }
+
+
+def main() -> None:
+    """Start a logging server, run every scenario against it and print one JSON line per scenario."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--payload_kb", type=float, default=16, help="Size of the logged tool response")
+    parser.add_argument("--port", type=int, default=19989)
+    parser.add_argument("--stats_port", type=int, default=19988)
+    args = parser.parse_args()
+    # Roughly the shape of /cpuinfo: many short string fields
+    payload = {f"field_{index}": "x" * 64 for index in range(max(1, int(args.payload_kb * 1024 / 80)))}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        base = LoggingConfigs(
+            log_server_port=args.port,
+            stats_port=args.stats_port,
+            log_file_name=str(Path(scratch, "overhead.jsonl")),
+            log_rotation=None,
+            spool_dir="",
+            stats_interval_s=0,
+        )
+        config_path = Path(scratch, "logging_config.toml")
+        write_config(config_path, base)
+        server = subprocess.Popen(  # noqa: S603
+            [sys.executable, "start_logging_server.py", "--config_file_path", str(config_path)],
+            cwd=HERE,
+        )
+        try:
+            while server_stats(args.stats_port) is None:
+                time.sleep(0.2)
+            for name, log_request, settings in SCENARIOS:
+                configs = base.model_copy(update=settings)
+                result = run_scenario(name, log_request, configs, requests=args.requests, payload=payload)
+                print(json.dumps(result))  # noqa: T201
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
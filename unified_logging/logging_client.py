@@ -9,31 +9,200 @@ from __future__ import (
     annotations,  # Do not remove !! as it is needed for loguru.Message
 )
 
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+import orjson
 import zmq
-from zmq.log.handlers import PUBHandler
+
+from unified_logging.log_filters import LogFilter
+from unified_logging.records import RECORD_TOPIC, loguru_record, plain_record, truncate
+from unified_logging.spool import DiskSpool
 
 if TYPE_CHECKING:
     from config_types import LoggingConfigs
-    from loguru import Logger
+    from loguru import Logger, Message
+
+# How often spooled records are retried while the server does not take them
+RETRY_INTERVAL_S = 0.5
+# How long closing waits for the queued records to reach the server
+CLOSE_LINGER_MS = 2000
+
+
+@dataclass
+class ClientCounters:
+    """Record counters of one logging client."""
+
+    emitted: int = 0
+    sent: int = 0
+    spooled: int = 0
+    replayed: int = 0
+    dropped_queue: int = 0  # the in-memory queue was full
+    dropped_spool: int = 0  # the server was unreachable and the spool full or disabled
+
+
+class LogClient:
+    """Send log records to the logging server from a background thread.
+
+    ``emit`` only appends to a bounded in-memory queue, so logging never waits on the
+    network. The sender thread delivers the queue with non-blocking sends; with the push
+    transport a record the server cannot take is written to the disk spool instead,
+    and the spool is replayed, in order, once the server takes records again.
+    """
+
+    def __init__(self, logging_configs: LoggingConfigs, service: str) -> None:
+        """Connect to the logging server and start the sender thread."""
+        self.configs = logging_configs
+        self.service = service
+        self.counters = ClientCounters()
+        self._queue: deque[bytes] = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+
+        # One context per process, shared by every socket of it
+        self._socket = zmq.Context.instance().socket(zmq.PUSH if logging_configs.transport == "push" else zmq.PUB)
+        # Messages queued while the server is not keeping up, beyond this sends fail (push) or drop (pub)
+        self._socket.setsockopt(zmq.SNDHWM, logging_configs.send_hwm)
+        if logging_configs.transport == "push":
+            # Only queue on a completed connection, so sends fail while the server is down
+            self._socket.setsockopt(zmq.IMMEDIATE, 1)
+        self._socket.connect(f"tcp://{logging_configs.log_server_host}:{logging_configs.log_server_port}")
+
+        self.spool = None
+        if logging_configs.transport == "push" and logging_configs.spool_dir:
+            spool_path = Path(logging_configs.spool_dir, f"{service}.spool")
+            self.spool = DiskSpool(spool_path, int(logging_configs.spool_max_mb * 1024 * 1024))
+
+        self._thread = threading.Thread(target=self._run, name="log-client", daemon=True)
+        self._thread.start()
+
+    def emit(self, payload: bytes) -> None:
+        """Queue one serialized record, dropping the oldest queued one when the queue is full."""
+        with self._condition:
+            self.counters.emitted += 1
+            if len(self._queue) >= self.configs.client_queue_capacity:
+                self._queue.popleft()
+                self.counters.dropped_queue += 1
+            self._queue.append(payload)
+            self._condition.notify()
+
+    def sink(self, message: Message) -> None:
+        """Loguru sink turning every message into a structured record."""
+        record = loguru_record(message.record, self.service, message)
+        record["message"] = truncate(record["message"], self.configs.max_message_chars)
+        self.emit(orjson.dumps(record))
+
+    def _run(self) -> None:
+        next_stats = time.monotonic() + self.configs.stats_interval_s
+        reported = None
+        while True:
+            with self._condition:
+                if not self._queue and not self._closing:
+                    self._condition.wait(RETRY_INTERVAL_S if self.spool else self.configs.stats_interval_s or None)
+                batch = list(self._queue)
+                self._queue.clear()
+                closing = self._closing
+            self._replay()
+            for payload in batch:
+                self._deliver(payload)
+            if self.configs.stats_interval_s and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + self.configs.stats_interval_s
+                # Idle clients do not repeat the same counters
+                if reported != self.counters:
+                    reported = ClientCounters(**asdict(self.counters))
+                    self._deliver(orjson.dumps(self._stats_record()))
+            if closing:
+                return
+
+    def _send(self, payload: bytes) -> bool:
+        try:
+            self._socket.send_multipart([RECORD_TOPIC, payload], zmq.NOBLOCK)
+        except zmq.Again:
+            return False
+        return True
+
+    def _deliver(self, payload: bytes) -> None:
+        # Records go behind the spooled ones until the spool is replayed, to keep their order
+        if not self.spool and self._send(payload):
+            self.counters.sent += 1
+        elif self.spool is not None and self.spool.append(payload):
+            self.counters.spooled += 1
+        else:
+            self.counters.dropped_spool += 1
+
+    def _replay(self) -> None:
+        while self.spool and (payload := self.spool.peek()) is not None:
+            if not self._send(payload):
+                return
+            self.spool.pop()
+            self.counters.replayed += 1
+
+    def _stats_record(self) -> dict:
+        record = plain_record("INFO", f"Log client stats: {self.stats()}", self.service)
+        record["file"] = Path(__file__).name
+        return record
+
+    def stats(self) -> dict[str, int]:
+        """Counters, queue depth and spool size of the client."""
+        return asdict(self.counters) | {
+            "queued": len(self._queue),
+            "spool_bytes": self.spool.pending_bytes if self.spool is not None else 0,
+        }
+
+    def close(self) -> None:
+        """Deliver or spool what is queued, then close the socket and the spool."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self._socket.close(linger=CLOSE_LINGER_MS)
+        if self.spool is not None:
+            self.spool.close()
+
+
+# Client of the sink added last in this process
+_ACTIVE_CLIENT: LogClient | None = None
 
 
 # Copied from https://loguru.readthedocs.io/en/stable/resources/recipes.html#sending-and-receiving-log-messages-across-network-or-processes
-def setup_network_logger_client(logging_configs: LoggingConfigs, logger: Logger) -> None:
-    """To Setup the network logger client."""
-    zmq_socket = zmq.Context().socket(zmq.PUB)
+def setup_network_logger_client(
+    logging_configs: LoggingConfigs,
+    logger: Logger,
+    service: str | None = None,
+) -> LogClient:
+    """To Setup the network logger client.
 
-    zmq_socket.connect(f"tcp://127.0.0.1:{logging_configs.log_server_port}")
-    handler = PUBHandler(zmq_socket)
+    Every message is sent as a structured record (see ``unified_logging.records``) tagged
+    with ``service``, by default the name of the script that was started. ``LogFilter``
+    decides which records are sent. The returned client exposes the send, spool and drop
+    counters through ``stats``.
+    """
+    global _ACTIVE_CLIENT  # noqa: PLW0603
+    service = service or Path(sys.argv[0]).stem or "unknown"
 
     # remove the previous settings so that it does not print in stderr and only to file
     logger.remove()
+    # Modules of one process set up logging one after another (llm.py and tools.py, or every
+    # service under single_process.py), only the last client keeps a sink and its spool file
+    if _ACTIVE_CLIENT is not None:
+        _ACTIVE_CLIENT.close()
+    client = _ACTIVE_CLIENT = LogClient(logging_configs, service)
+    atexit.register(client.close)
+
+    log_filter = LogFilter(logging_configs)
     logger.add(
-        handler,
-        format=logging_configs.client_log_format,
-        enqueue=True,
-        level=logging_configs.min_log_level,
-        backtrace=True,  # Detailed error traces
-        diagnose=True,  # Enable exception diagnostics
+        client.sink,
+        format="{message}",  # the record carries every other field
+        # Below this loguru returns before formatting, the filter applies the per-route and per-tool levels
+        level=log_filter.lowest_level,
+        filter=log_filter,
+        backtrace=logging_configs.backtrace,
+        diagnose=logging_configs.diagnose,
     )
+    return client
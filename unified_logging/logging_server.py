@@ -2,16 +2,44 @@
 
 The server receives log info from various other processes,
 logging them into a single file.
+
+Clients send structured records (see ``records``), which are written as JSON lines
+with a block index next to the file, or as text in ``server_log_format``. They connect
+with PUSH sockets to the server's PULL socket, or with PUB to SUB for the pub transport.
+
+Messages are drained from the socket in batches with non-blocking receives and handed
+to a writer thread through a bounded queue, which writes each batch to the log file
+with a single call. When the queue is full the configured overflow policy decides
+what is dropped, and every drop is counted. Output can be sharded into one file per
+service and/or level, and rotated files are compressed by worker processes so that
+rotation does not stall the writer.
 """
 
 # GiG
 
 import argparse
+import json
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import orjson
 import zmq
 from config_types import LoggingConfigs
+from file_sink import ShardedSink
 from loguru import logger
+from records import LEVELS, RECORD_TOPIC, loguru_record, plain_record
+
+if TYPE_CHECKING:
+    from loguru import Message
 
 # This file implements a logging server that runs in a port
 # and that recieves log info from various other processes
@@ -20,9 +48,302 @@ from loguru import logger
 
 # Copied from https://loguru.readthedocs.io/en/stable/resources/recipes.html#sending-and-receiving-log-messages-across-network-or-processes
 
+# Fields a text server_log_format can use that plain text records do not have
+TEXT_DEFAULTS = {"service": "unknown", "file": "", "function": "", "line": 0, "pid": 0, "trace_id": ""}
+# How long one poll waits for messages before checking whether the server was stopped
+POLL_INTERVAL_MS = 100
+
+
+def format_text(log_format: str, record: dict) -> bytes:
+    """Format ``record`` as one text line in ``log_format``."""
+    fields = TEXT_DEFAULTS | record | {"time": datetime.fromtimestamp(record["ts"])}  # noqa: DTZ006
+    return log_format.format_map(fields).encode()
+
+
+@dataclass
+class IngestCounters:
+    """Message counters of the logging server."""
+
+    received: int = 0
+    written: int = 0
+    filtered: int = 0  # below min_log_level
+    malformed: int = 0
+    write_failed: int = 0  # lost in a batch the sink could not write
+    batches: int = 0
+    largest_batch: int = 0
+    bytes_written: int = 0
+    slowest_write_ms: float = 0.0  # longest single batch write, rotations included
+
+
+class IngestQueue:
+    """Bounded queue of received messages between the receiving and the writing thread."""
+
+    def __init__(self, capacity: int, policy: str) -> None:
+        """Create an empty queue holding at most ``capacity`` messages."""
+        self.capacity = capacity
+        self.policy = policy
+        self._entries: deque[tuple[float, str, dict]] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        # Messages discarded by the overflow policy
+        self.dropped = 0
+
+    def put_many(self, entries: list[tuple[float, str, dict]], *, may_block: bool = True) -> int:
+        """Queue ``entries`` of (received time, level, record) and return how many messages were dropped.
+
+        With ``may_block`` false, the block policy drops incoming messages instead of waiting.
+        """
+        dropped = 0
+        with self._condition:
+            for entry in entries:
+                if len(self._entries) >= self.capacity:
+                    if self.policy == "drop_newest" or (self.policy == "block" and not may_block):
+                        dropped += 1
+                        continue
+                    if self.policy == "drop_oldest":
+                        self._entries.popleft()
+                        dropped += 1
+                    else:
+                        # Block until the writer makes room, so the socket is not read meanwhile;
+                        # wake the writer first, it may be waiting for the entries queued so far
+                        self._condition.notify_all()
+                        self._condition.wait_for(lambda: len(self._entries) < self.capacity or self._closed)
+                self._entries.append(entry)
+            self.dropped += dropped
+            self._condition.notify_all()
+        return dropped
+
+    def take(self, max_items: int, timeout: float) -> list[tuple[float, str, dict]]:
+        """Remove and return up to ``max_items`` entries, waiting at most ``timeout`` seconds for the first one."""
+        with self._condition:
+            if not self._entries and not self._closed:
+                self._condition.wait(timeout)
+            count = min(max_items, len(self._entries))
+            taken = [self._entries.popleft() for _ in range(count)]
+            if taken:
+                self._condition.notify_all()
+            return taken
+
+    def close(self) -> None:
+        """Wake up every waiting thread, the remaining entries can still be taken."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def oldest_age(self) -> float:
+        """Seconds the oldest waiting message has been queued."""
+        with self._condition:
+            return time.monotonic() - self._entries[0][0] if self._entries else 0.0
+
+    def __len__(self) -> int:
+        """Messages waiting to be written."""
+        return len(self._entries)
+
+
+class LoggingServer:
+    """Receive log messages from every service and write them to one file in batches."""
+
+    def __init__(self, logging_configs: LoggingConfigs, sink: ShardedSink | None = None) -> None:
+        """Create the server, call ``run`` to start receiving."""
+        self.configs = logging_configs
+        # Rotated files are compressed in worker processes, off the writer thread
+        self.compressor = None
+        if logging_configs.log_compression and logging_configs.compression_workers:
+            # Spawned, so that the workers do not inherit the server's sockets
+            self.compressor = ProcessPoolExecutor(
+                max_workers=logging_configs.compression_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        self.sink = sink or ShardedSink(
+            logging_configs.log_file_name,
+            logging_configs.shard_by,
+            rotation=logging_configs.log_rotation,
+            compression=logging_configs.log_compression,
+            compression_level=logging_configs.log_compression_level,
+            indexed=logging_configs.record_format == "jsonl",
+            executor=self.compressor,
+        )
+        self.queue = IngestQueue(logging_configs.queue_capacity, logging_configs.overflow_policy)
+        self.counters = IngestCounters()
+        # Records of routes and tools with a lower level than min_log_level are kept too
+        self.min_level = min(
+            LEVELS[level]
+            for level in [
+                logging_configs.min_log_level,
+                *logging_configs.route_levels.values(),
+                *logging_configs.tool_levels.values(),
+            ]
+        )
+        self._started = time.monotonic()
+        self._write_lag = 0.0
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+
+    def log_own(self, message: "Message") -> None:
+        """Loguru sink that queues the server's own messages next to the received ones."""
+        record = loguru_record(message.record, "logging_server", message)
+        entry = (time.monotonic(), record["level"], record)
+        # The writer thread logs too, so waiting for room here could wait on itself
+        self.queue.put_many([entry], may_block=False)
+
+    def run(self) -> None:
+        """Receive messages until ``stop`` is called, writing them from a background thread."""
+        context = zmq.Context.instance()
+        receiver = context.socket(zmq.PULL if self.configs.transport == "push" else zmq.SUB)
+        receiver.setsockopt(zmq.RCVHWM, self.configs.receive_hwm)
+        receiver.bind(f"tcp://{self.configs.log_server_host}:{self.configs.log_server_port}")
+        if self.configs.transport == "pub":
+            receiver.subscribe("")
+
+        poller = zmq.Poller()
+        poller.register(receiver, zmq.POLLIN)
+        stats = None
+        if self.configs.stats_port:
+            stats = context.socket(zmq.REP)
+            stats.bind(f"tcp://127.0.0.1:{self.configs.stats_port}")
+            poller.register(stats, zmq.POLLIN)
 
-def set_logging_configs(logging_configs: LoggingConfigs) -> None:
-    """Configure the logger with the provided logging configurations.
+        self._writer.start()
+        try:
+            while not self._stopped.is_set():
+                events = dict(poller.poll(POLL_INTERVAL_MS))
+                if receiver in events:
+                    self._drain(receiver)
+                if stats is not None and stats in events:
+                    stats.recv()
+                    stats.send_string(json.dumps(self.stats()))
+        finally:
+            self._stopped.set()
+            self.queue.close()
+            self._writer.join()
+            receiver.close(linger=0)
+            if stats is not None:
+                stats.close(linger=0)
+            self.sink.close()
+            if self.compressor is not None:
+                # Let the rotated files being compressed finish
+                self.compressor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        """Stop receiving, the messages already queued are still written."""
+        self._stopped.set()
+
+    def _drain(self, receiver: zmq.Socket) -> None:
+        batch = []
+        counters = self.counters
+        for _ in range(self.configs.batch_size):
+            try:
+                frames = receiver.recv_multipart(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            counters.received += 1
+            if len(frames) != 2:  # noqa: PLR2004
+                counters.malformed += 1
+                continue
+            if frames[0] == RECORD_TOPIC:
+                try:
+                    record = orjson.loads(frames[1])
+                    level, _ = record["level"], float(record["ts"])
+                except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                    counters.malformed += 1
+                    continue
+                if not isinstance(level, str) or "message" not in record:
+                    counters.malformed += 1
+                    continue
+            else:
+                # Plain text from a client that does not send records, such as a bare PUBHandler
+                level = frames[0].decode("utf8", errors="replace").strip()
+                record = plain_record(level, frames[1].decode("utf8", errors="replace").strip())
+            if LEVELS.get(level, LEVELS["INFO"]) < self.min_level:
+                counters.filtered += 1
+                continue
+            batch.append((time.monotonic(), level, record))
+        if batch:
+            self.queue.put_many(batch)
+
+    def _write_loop(self) -> None:
+        counters = self.counters
+        log_format = self.configs.server_log_format
+        timeout = self.configs.flush_interval_ms / 1000
+        next_stats = time.monotonic() + self.configs.stats_interval_s
+        # Only the first failure of a run of failed writes is logged, its record would fail too
+        failing = False
+        while True:
+            entries = self.queue.take(self.configs.batch_size, timeout)
+            if not entries:
+                if self._stopped.is_set():
+                    return
+                continue
+            write_started = time.perf_counter()
+            records, lines = self._format([record for _, _, record in entries], log_format)
+            if not records:
+                continue
+            try:
+                counters.bytes_written += self.sink.write_records(
+                    records,
+                    lines,
+                    summarize=self.configs.record_format == "jsonl",
+                )
+            except Exception as e:  # noqa: BLE001
+                # Keep writing later batches, a full disk or a bad shard must not stop the server
+                counters.write_failed += len(records)
+                if not failing:
+                    # Also on stderr, the log file may be what cannot be written
+                    message = f"Logging server could not write {len(records)} records: {e!r}"
+                    sys.stderr.write(message + "\n")
+                    logger.error(message)
+                failing = True
+                continue
+            if failing:
+                logger.info("Logging server writes again")
+                failing = False
+            write_ms = (time.perf_counter() - write_started) * 1000
+            counters.slowest_write_ms = max(counters.slowest_write_ms, round(write_ms, 1))
+            counters.written += len(records)
+            counters.batches += 1
+            counters.largest_batch = max(counters.largest_batch, len(records))
+            self._write_lag = time.monotonic() - entries[-1][0]
+
+            if self.configs.stats_interval_s and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + self.configs.stats_interval_s
+                logger.info(f"Logging server stats: {self.stats()}")
+
+    def _format(self, records: list[dict], log_format: str) -> tuple[list[dict], list[bytes]]:
+        """Lines of the records in the record format, leaving out and counting records that do not format."""
+        kept, lines = [], []
+        for record in records:
+            try:
+                if self.configs.record_format == "jsonl":
+                    line = orjson.dumps(record)
+                else:
+                    line = format_text(log_format, record)
+            except (orjson.JSONEncodeError, KeyError, IndexError, TypeError, ValueError):
+                self.counters.malformed += 1
+                continue
+            kept.append(record)
+            lines.append(line)
+        return kept, lines
+
+    def stats(self) -> dict[str, float | int]:
+        """Counters, queue depth and lag of the server."""
+        uptime = time.monotonic() - self._started
+        return asdict(self.counters) | {
+            "dropped": self.queue.dropped,
+            "queued": len(self.queue),
+            "queue_capacity": self.queue.capacity,
+            "lag_ms": round(self.queue.oldest_age() * 1000, 1),
+            "write_lag_ms": round(self._write_lag * 1000, 1),
+            "written_per_s": round(self.counters.written / uptime, 1) if uptime else 0.0,
+            "rotations": self.sink.rotations,
+            "uptime_s": round(uptime, 1),
+        }
+
+
+def set_logging_configs(logging_configs: LoggingConfigs) -> None:  # noqa: ARG001
+    """Configure the logger of the server process.
+
+    The server writes the log file itself, see ``LoggingServer``, which also routes
+    the server's own messages into it.
 
     Args:
         logging_configs (LoggingConfigs): The logging configurations to use.
@@ -31,37 +352,27 @@ def set_logging_configs(logging_configs: LoggingConfigs) -> None:
     # remove the previous settings so that it does not print in stderr and only to file
     logger.remove()
 
-    # Add shared file logger
-    logger.add(
-        logging_configs.log_file_name,
-        rotation=logging_configs.log_rotation,  # Rotate at 00:00
-        compression=logging_configs.log_compression,  # Compress rotated files
-        format=logging_configs.server_log_format,
-        level=logging_configs.min_log_level,
-        enqueue=True,  # Thread-safe logging
-        backtrace=True,  # Detailed error traces
-        diagnose=True,  # Enable exception diagnostics
-    )
-
 
 def start_logging_server(logging_configs: LoggingConfigs) -> None:
     """Start the logging server."""
-    socket = zmq.Context().socket(zmq.SUB)
-    socket.bind(f"tcp://127.0.0.1:{logging_configs.log_server_port}")
-    socket.subscribe("")
-
-    while True:
-        try:
-            ret_val = socket.recv_multipart()
-            log_level_name, message = ret_val
-
-            log_level_name = log_level_name.decode("utf8").strip()
-            message = message.decode("utf8").strip()
-
-            logger.log(log_level_name, message)
-
-        except Exception:  # noqa: BLE001
-            logger.exception("Got an exception when logging: ")
+    server = LoggingServer(logging_configs)
+    logger.add(
+        server.log_own,
+        format="{message}",
+        level=logging_configs.min_log_level,
+        backtrace=logging_configs.backtrace,
+        diagnose=logging_configs.diagnose,
+    )
+    logger.info(
+        f"Logging server listening on {logging_configs.log_server_host}:{logging_configs.log_server_port} "
+        f"({logging_configs.transport}, stats on port {logging_configs.stats_port or 'disabled'}).",
+    )
+    # Stop like on Ctrl+C, so queued messages are written and compressions finish
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        server.stop()
 
 
 if __name__ == "__main__":
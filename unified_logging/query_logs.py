@@ -0,0 +1,214 @@
+"""Query the structured log files through their block index.
+
+Reads the ``.idx`` index of the current and every rotated log file, and only reads
+the blocks whose time range, services and levels can match the query. Files without
+an index are scanned in full.
+
+    uv run ./query_logs.py --service browser --level WARNING --since 2h --grep timeout
+    uv run ./query_logs.py --trace_id 4f1c --since "2025-05-01 10:00" --until "2025-05-01 11:00"
+"""
+
+import argparse
+import gzip
+import re
+import sys
+import time
+import zipfile
+from collections.abc import Iterator
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO
+
+import orjson
+from config_types import LoggingConfigs
+from records import LEVELS, read_index
+
+HERE = Path(__file__).resolve().parent
+RELATIVE_TIME = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> float:
+    """Unix time of an ISO date and time, or of a time relative to now such as ``15m``, ``2h`` or ``7d``."""
+    if match := RELATIVE_TIME.match(value.strip()):
+        return time.time() - float(match[1]) * SECONDS[match[2]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+@dataclass
+class LogQuery:
+    """Conditions a record has to meet, None means any."""
+
+    services: set[str] | None = None
+    min_level: int = 0
+    since: float | None = None
+    until: float | None = None
+    trace_id: str | None = None
+    grep: str | None = None
+    levels: set[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Resolve the minimum level to the level names at or above it."""
+        self.levels = {name for name, number in LEVELS.items() if number >= self.min_level}
+
+    def block_matches(self, block: dict) -> bool:
+        """Return whether a block, described by its index entry, can contain a matching record."""
+        if self.since is not None and block["t_max"] < self.since:
+            return False
+        if self.until is not None and block["t_min"] > self.until:
+            return False
+        if self.services is not None and self.services.isdisjoint(block["services"]):
+            return False
+        # Unknown level names are kept, the record check decides
+        return not self.levels.isdisjoint(block["levels"]) or any(level not in LEVELS for level in block["levels"])
+
+    def record_matches(self, record: dict) -> bool:
+        """Return whether ``record`` meets every condition."""
+        ts = record.get("ts", 0.0)
+        return (
+            (self.since is None or ts >= self.since)
+            and (self.until is None or ts <= self.until)
+            and (self.services is None or record.get("service") in self.services)
+            and LEVELS.get(record.get("level", ""), LEVELS["INFO"]) >= self.min_level
+            and (self.trace_id is None or record.get("trace_id") == self.trace_id)
+            and (self.grep is None or self.grep in record.get("message", ""))
+        )
+
+
+@dataclass
+class ScanStats:
+    """How much of the logs a query had to read."""
+
+    files: int = 0
+    blocks_total: int = 0
+    blocks_read: int = 0
+    bytes_read: int = 0
+    unindexed_files: int = 0
+
+
+def log_files(log_path: Path) -> list[Path]:
+    """Rotated log files of ``log_path`` and of its shards from oldest to newest, each followed by the current one."""
+    files = []
+    # Shards are directories next to the log file holding a file of the same name, see ShardedSink
+    for directory in [log_path.parent, *sorted(path for path in log_path.parent.rglob("*") if path.is_dir())]:
+        current = directory / log_path.name
+        rotated = [
+            path
+            for path in directory.glob(f"{log_path.stem}.*{log_path.suffix}*")
+            if path != current and not path.name.endswith(".idx")
+        ]
+        # Rotated names carry a sortable timestamp
+        files += sorted(rotated) + ([current] if current.exists() else [])
+    return files
+
+
+def open_log(path: Path, stack: ExitStack) -> IO[bytes]:
+    """Open a plain, gz, zip or zst log file for reading as one seekable, uncompressed stream.
+
+    Compressed streams seek by decompressing up to the offset, which is cheap as long
+    as blocks are read in file order.
+    """
+    if path.suffix == ".gz":
+        return stack.enter_context(gzip.open(path, "rb"))
+    if path.suffix == ".zst":
+        import zstandard  # noqa: PLC0415 # only needed for this codec
+
+        return stack.enter_context(zstandard.ZstdDecompressor().stream_reader(stack.enter_context(path.open("rb"))))
+    if path.suffix == ".zip":
+        archive = stack.enter_context(zipfile.ZipFile(path))
+        return stack.enter_context(archive.open(archive.namelist()[0]))
+    return stack.enter_context(path.open("rb"))
+
+
+def query_file(path: Path, query: LogQuery, stats: ScanStats) -> Iterator[dict]:
+    """Yield the records of ``path`` matching ``query``, reading only the blocks the index allows."""
+    index = read_index(path)
+    stats.files += 1
+    with ExitStack() as stack:
+        log = open_log(path, stack)
+        if not index:
+            stats.unindexed_files += 1
+            chunks: Iterator[bytes] = iter(log)
+        else:
+            stats.blocks_total += len(index)
+
+            def blocks() -> Iterator[bytes]:
+                for block in index:
+                    if query.block_matches(block):
+                        stats.blocks_read += 1
+                        log.seek(block["offset"])
+                        yield log.read(block["length"])
+
+            chunks = blocks()
+
+        for chunk in chunks:
+            stats.bytes_read += len(chunk)
+            for line in chunk.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                if query.record_matches(record):
+                    yield record
+
+
+def format_record(record: dict) -> str:
+    """One readable line for ``record``."""
+    stamp = datetime.fromtimestamp(record.get("ts", 0.0)).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]  # noqa: DTZ006
+    location = f"{record.get('file', '')}:{record.get('function', '')}:{record.get('line', '')}"
+    text = f"{stamp} | {record.get('level', '')} | {record.get('service', '')} | {location} | {record.get('message')}"
+    if "exception" in record:
+        text += "\n" + record["exception"].rstrip()
+    return text
+
+
+def main() -> None:
+    """Print the records matching the query given on the command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_file_path", default=str(HERE / "logging_config.toml"))
+    parser.add_argument("--log_file", help="Log file to query, defaults to log_file_name of the config")
+    parser.add_argument("--service", action="append", help="Service to include, can be repeated")
+    parser.add_argument("--level", default="TRACE", choices=list(LEVELS), help="Minimum level")
+    parser.add_argument("--since", type=parse_time, help="ISO time or age such as 30m, 2h, 1d")
+    parser.add_argument("--until", type=parse_time)
+    parser.add_argument("--trace_id")
+    parser.add_argument("--grep", help="Substring the message has to contain")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many records, 0 for all")
+    parser.add_argument("--json", action="store_true", help="Print the records as JSON lines")
+    args = parser.parse_args()
+
+    log_file = args.log_file
+    if log_file is None:
+        # log_file_name is relative to the logging server, which runs from this directory
+        log_file = HERE / LoggingConfigs.load_from_path(args.config_file_path).log_file_name
+    query = LogQuery(
+        services=set(args.service) if args.service else None,
+        min_level=LEVELS[args.level],
+        since=args.since,
+        until=args.until,
+        trace_id=args.trace_id,
+        grep=args.grep,
+    )
+
+    stats = ScanStats()
+    shown = 0
+    for path in log_files(Path(log_file)):
+        for record in query_file(path, query, stats):
+            sys.stdout.write((orjson.dumps(record).decode() if args.json else format_record(record)) + "\n")
+            shown += 1
+            if args.limit and shown >= args.limit:
+                break
+        if args.limit and shown >= args.limit:
+            break
+    sys.stderr.write(
+        f"{shown} records from {stats.files} files, read {stats.blocks_read} of {stats.blocks_total} indexed blocks "
+        f"({stats.bytes_read} bytes), {stats.unindexed_files} files without an index\n",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Structured log records and the block index written next to every log file.
+
+Clients send every message as one JSON record with the service, level, timestamp,
+source location and an optional trace id. The server writes records as JSON lines
+in blocks, one block per batch, and appends one index entry per block to
+``<log file>.idx``: its byte range in the uncompressed file, the record count, the
+time range, and the services and levels it contains. A query reads the index first
+and only seeks into the blocks that can match.
+"""
+
+import time
+import traceback
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import orjson
+
+if TYPE_CHECKING:
+    from loguru import Record
+
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+# First frame of a message carrying a JSON record, plain text messages carry the level name instead
+RECORD_TOPIC = b"record"
+
+
+def loguru_record(record: "Record", service: str, text: str = "") -> dict:
+    """Structured record of a loguru record, the trace id is taken from ``logger.bind(trace_id=...)``.
+
+    ``text`` is the message as formatted by the sink with ``format="{message}"``. With
+    ``enqueue=True`` loguru drops the traceback object, so the exception is taken from
+    the text it was formatted into instead.
+    """
+    structured = {
+        "ts": record["time"].timestamp(),
+        "service": service,
+        "level": record["level"].name,
+        "file": record["file"].name,
+        "function": record["function"],
+        "line": record["line"],
+        "pid": record["process"].id,
+        "message": record["message"],
+    }
+    extra = record["extra"]
+    for key in ("trace_id", "route"):
+        if extra.get(key) is not None:
+            structured[key] = str(extra[key])
+    if "suppressed" in extra:
+        # Records of the same call site dropped by the rate limit since the last one sent
+        structured["suppressed"] = extra["suppressed"]
+    if record["exception"] is not None:
+        exception = text[len(record["message"]) :].strip("\n")
+        if not exception and record["exception"].traceback is not None:
+            exception = "".join(traceback.format_exception(*record["exception"]))
+        structured["exception"] = exception
+    return structured
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cut ``text`` to ``limit`` characters with a note of how many were cut, 0 keeps it whole."""
+    if not limit or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+def plain_record(level: str, message: str, service: str = "unknown") -> dict:
+    """Record of a plain text message from a client that does not send structured records."""
+    return {"ts": time.time(), "service": service, "level": level, "message": message}
+
+
+def block_summary(records: list[dict]) -> dict:
+    """Index fields of a block of ``records``: count, time range, services and levels."""
+    stamps = [record["ts"] for record in records]
+    return {
+        "count": len(records),
+        "t_min": min(stamps),
+        "t_max": max(stamps),
+        "services": sorted({record.get("service", "unknown") for record in records}),
+        "levels": sorted({record["level"] for record in records}),
+    }
+
+
+def index_path(log_path: Path) -> Path:
+    """Path of the block index of ``log_path``."""
+    return log_path.with_name(log_path.name + ".idx")
+
+
+def read_index(log_path: Path) -> list[dict]:
+    """Block entries of the index of ``log_path``, empty if it has none."""
+    path = index_path(log_path)
+    if not path.exists():
+        return []
+    with path.open("rb") as index:
+        return [orjson.loads(line) for line in index if line.strip()]
@@ -0,0 +1,104 @@
+"""Memory-mapped disk spool for log records the server could not take yet.
+
+The spool is one file of fixed size: a header with the read and write offsets,
+followed by length prefixed records. Records are appended at the write offset and
+replayed from the read offset, so whatever was spooled before a crash or restart is
+replayed by the next process that opens the same file. Consumed space is reclaimed
+by moving the remaining records to the front once the end of the file is reached.
+"""
+
+import mmap
+import struct
+from pathlib import Path
+
+HEADER = struct.Struct("<QQ")  # read offset, write offset, both relative to the data area
+LENGTH = struct.Struct("<I")
+
+
+class DiskSpool:
+    """First in, first out queue of byte records in a memory-mapped file of ``capacity`` bytes."""
+
+    def __init__(self, path: str | Path, capacity: int) -> None:
+        """Open the spool at ``path``, creating it if needed, and keep the records already in it.
+
+        Raises:
+            ValueError: ``capacity`` leaves no room for records.
+
+        """
+        if capacity <= HEADER.size + LENGTH.size:
+            msg = f"Spool capacity of {capacity} bytes is too small"
+            raise ValueError(msg)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a+b") as file:
+            if file.seek(0, 2) != capacity:
+                # A new file, or one made for another capacity, which cannot be reused as is
+                file.truncate(0)
+                file.truncate(capacity)
+        self._file = self.path.open("r+b")
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+        self._data_size = capacity - HEADER.size
+        self._read, self._write = HEADER.unpack_from(self._map, 0)
+        if not 0 <= self._read <= self._write <= self._data_size:
+            self._read = self._write = 0
+            self._save_offsets()
+
+    def append(self, record: bytes) -> bool:
+        """Add ``record`` at the end, False if the spool is full."""
+        needed = LENGTH.size + len(record)
+        if self._write + needed > self._data_size:
+            self._compact()
+            if self._write + needed > self._data_size:
+                return False
+        start = HEADER.size + self._write
+        LENGTH.pack_into(self._map, start, len(record))
+        self._map[start + LENGTH.size : start + needed] = record
+        self._write += needed
+        self._save_offsets()
+        return True
+
+    def peek(self) -> bytes | None:
+        """Return the oldest record, None if the spool is empty."""
+        if self._read == self._write:
+            return None
+        start = HEADER.size + self._read
+        (length,) = LENGTH.unpack_from(self._map, start)
+        return self._map[start + LENGTH.size : start + LENGTH.size + length]
+
+    def pop(self) -> None:
+        """Remove the oldest record, once it was delivered."""
+        if self._read == self._write:
+            return
+        (length,) = LENGTH.unpack_from(self._map, HEADER.size + self._read)
+        self._read += LENGTH.size + length
+        if self._read == self._write:
+            self._read = self._write = 0
+        self._save_offsets()
+
+    def _compact(self) -> None:
+        if self._read == 0:
+            return
+        pending = self._write - self._read
+        self._map.move(HEADER.size, HEADER.size + self._read, pending)
+        self._read, self._write = 0, pending
+        self._save_offsets()
+
+    def _save_offsets(self) -> None:
+        HEADER.pack_into(self._map, 0, self._read, self._write)
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes of records waiting to be replayed, length prefixes included."""
+        return self._write - self._read
+
+    def __bool__(self) -> bool:
+        """Whether any record is waiting."""
+        return self._read != self._write
+
+    def close(self) -> None:
+        """Write the spool back to disk and close it, closing it again does nothing."""
+        if self._file.closed:
+            return
+        self._map.flush()
+        self._map.close()
+        self._file.close()